@@ -13,15 +13,23 @@ Usage:
 
     # To log an event (non-blocking)
     enqueue_event('page_view', user_id=1, user_type='admin', metadata={'path': '/dashboard'})
+
+Events that do not fit into the queue, or are still queued at shutdown, are
+appended to journal segments in config.ANALYTICS_SPILL_DIR. The worker
+replays them on startup and whenever the queue runs empty.
 """
 
 import queue
 import threading
 import json
+import os
+import signal
 import sys
 import time
 import atexit
-from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import config
 
 # Thread-safe queue for events
 # maxsize=1000 prevents memory issues if disk becomes very slow
@@ -43,7 +51,8 @@ def enqueue_event(event_type, user_id=None, user_type=None, metadata=None):
         metadata: Dictionary or JSON string of additional data
 
     Returns:
-        True if event was queued, False if queue is full
+        True if event was queued (or journaled to disk because the queue
+        is full), False if it had to be dropped
     """
     try:
         # Convert metadata to JSON string if it's a dict
@@ -52,17 +61,282 @@ def enqueue_event(event_type, user_id=None, user_type=None, metadata=None):
         else:
             metadata_json = metadata
 
-        event_queue.put_nowait({
+        event = {
+            # Stamped here (UTC, like CURRENT_TIMESTAMP) so the rollup day
+            # matches the stored timestamp regardless of queueing delay
+            'timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+            'enqueued_at': time.monotonic(),
             'event_type': event_type,
             'user_id': user_id,
             'user_type': user_type,
             'metadata': metadata_json
-        })
+        }
+        event_queue.put_nowait(event)
         return True
     except queue.Full:
-        # Queue is full - drop event and log warning
-        print(f"WARNING: Analytics queue full, dropping event: {event_type}", file=sys.stderr)
+        # Queue is full - journal the event to disk instead of dropping it
+        return spill_event(event)
+
+
+# ============ Spill Journal ============
+#
+# Append-only segment files (one JSON event per line). enqueue_event only
+# appends and flushes to the OS; the worker fsyncs in batches (sync_spill)
+# and closes the segment before replaying it, so appends never wait on
+# the disk or on the database.
+
+_spill_lock = threading.Lock()
+_spill_file = None      # Segment currently being appended to
+_spill_unsynced = 0     # Lines appended since the last fsync
+
+REPLAY_BACKOFF_MAX = 60  # Seconds between replay attempts while they keep failing
+
+
+def spill_event(event):
+    """
+    Append an event to the current journal segment.
+
+    Returns:
+        True if the event was journaled, False if it had to be dropped
+    """
+    global _spill_file, _spill_unsynced
+
+    record = {k: v for k, v in event.items() if k != 'enqueued_at'}
+    try:
+        with _spill_lock:
+            if _spill_file is None:
+                os.makedirs(config.ANALYTICS_SPILL_DIR, exist_ok=True)
+                name = f"segment-{time.time_ns()}-{os.getpid()}.jsonl"
+                _spill_file = open(os.path.join(config.ANALYTICS_SPILL_DIR, name), 'a', encoding='utf-8')
+            _spill_file.write(json.dumps(record) + '\n')
+            _spill_file.flush()
+            _spill_unsynced += 1
+        return True
+    except OSError as e:
+        print(f"WARNING: Analytics spill failed, dropping event {event['event_type']}: {e}", file=sys.stderr)
+        return False
+
+
+def sync_spill(close=False):
+    """
+    Fsync the current journal segment if anything was appended since the
+    last sync. With close=True the segment is also closed, so the next
+    spill starts a new one and this one can be replayed.
+
+    Only the handle is taken under the lock; the fsync itself runs outside
+    it so spill_event never waits on the disk.
+    """
+    global _spill_file, _spill_unsynced
+
+    with _spill_lock:
+        if _spill_file is None:
+            return
+        unsynced = _spill_unsynced
+        _spill_unsynced = 0
+        try:
+            if close:
+                f, fd = _spill_file, _spill_file.fileno()
+                _spill_file = None
+            elif unsynced:
+                f, fd = None, os.dup(_spill_file.fileno())
+            else:
+                return
+        except OSError as e:
+            print(f"WARNING: Analytics spill sync failed: {e}", file=sys.stderr)
+            return
+
+    try:
+        if unsynced:
+            os.fsync(fd)
+    except OSError as e:
+        print(f"WARNING: Analytics spill sync failed: {e}", file=sys.stderr)
+    finally:
+        if f is not None:
+            f.close()
+        else:
+            os.close(fd)
+
+
+def _segment_pid(name):
+    """Pid of the process that wrote a segment ('segment-<ns>-<pid>.jsonl')."""
+    try:
+        return int(name[:-len('.jsonl')].rsplit('-', 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def _pid_running(pid):
+    """Whether another process with this pid is still running."""
+    if os.name == 'nt':
+        # os.kill(pid, 0) would send CTRL_C_EVENT there - assume it runs
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
         return False
+    except OSError:
+        pass  # Exists but belongs to someone else
+    return True
+
+
+def _closed_segments():
+    """
+    Paths of journal segments that are no longer being appended to, oldest
+    first: this process's segments except the open one, and segments of
+    processes that no longer run. The latter are first renamed to this
+    process's pid, so two processes never replay the same segment.
+    """
+    try:
+        names = sorted(n for n in os.listdir(config.ANALYTICS_SPILL_DIR)
+                       if n.startswith('segment-') and n.endswith('.jsonl'))
+    except FileNotFoundError:
+        return []
+    with _spill_lock:
+        current = _spill_file.name if _spill_file is not None else None
+
+    pid = os.getpid()
+    paths = []
+    for name in names:
+        path = os.path.join(config.ANALYTICS_SPILL_DIR, name)
+        owner = _segment_pid(name)
+        if owner == pid:
+            if path != current:
+                paths.append(path)
+        elif owner is not None and not _pid_running(owner):
+            claimed = os.path.join(config.ANALYTICS_SPILL_DIR,
+                                   f"{name[:-len('.jsonl')].rsplit('-', 1)[0]}-{pid}.jsonl")
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue  # Another process claimed it first
+            paths.append(claimed)
+    return paths
+
+
+def _read_segment(path):
+    """Read the events of a journal segment, skipping torn or malformed lines."""
+    events = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if (not isinstance(event, dict) or not isinstance(event.get('event_type'), str)
+                    or not isinstance(event.get('timestamp'), str)):
+                continue
+            events.append({
+                'timestamp': event['timestamp'],
+                'enqueued_at': time.monotonic(),
+                'event_type': event['event_type'],
+                'user_id': event.get('user_id'),
+                'user_type': event.get('user_type'),
+                'metadata': event.get('metadata'),
+            })
+    return events
+
+
+def _set_aside(path, reason):
+    """Rename a segment that cannot be replayed to *.bad so later ones still are."""
+    print(f"ERROR: Analytics journal segment {os.path.basename(path)} cannot be replayed, "
+          f"moved aside as .bad: {reason}", file=sys.stderr)
+    try:
+        os.replace(path, path + '.bad')
+    except OSError as e:
+        print(f"WARNING: Could not move analytics journal segment aside: {e}", file=sys.stderr)
+
+
+def replay_spill(write_batch, retry_errors=()):
+    """
+    Write all closed journal segments to the database and delete them.
+
+    Each segment is written in one transaction and deleted right after it
+    committed, so a failure part-way leaves the segment untouched for a
+    later retry instead of writing part of it twice. A segment that cannot
+    be read or written for any other reason is renamed to *.bad and the
+    remaining segments are replayed.
+
+    Args:
+        write_batch: Callable writing a list of events in one transaction
+        retry_errors: Exception types that mean "try again later" (e.g. a
+                      locked database); they stop the replay and propagate
+
+    Returns:
+        Number of events replayed
+    """
+    replayed = 0
+    for path in _closed_segments():
+        try:
+            events = _read_segment(path)
+        except (OSError, ValueError) as e:
+            _set_aside(path, e)
+            continue
+        if events:
+            try:
+                write_batch(events)
+            except retry_errors:
+                raise
+            except Exception as e:
+                _set_aside(path, e)
+                continue
+        os.remove(path)
+        replayed += len(events)
+    return replayed
+
+
+# Worker counters (read with get_worker_stats)
+_stats_lock = threading.Lock()
+_stats = {
+    'events_written': 0,
+    'batches_written': 0,
+    'events_failed': 0,
+    'batches_failed': 0,
+    'last_batch_size': 0,
+    'write_ms_total': 0.0,
+    'write_ms_max': 0.0,
+    'latency_ms_max': 0.0,
+}
+
+
+def _record_batch(size, write_ms, latency_ms, ok):
+    """Update the worker counters after a batch write."""
+    with _stats_lock:
+        if ok:
+            _stats['events_written'] += size
+            _stats['batches_written'] += 1
+        else:
+            _stats['events_failed'] += size
+            _stats['batches_failed'] += 1
+        _stats['last_batch_size'] = size
+        _stats['write_ms_total'] += write_ms
+        _stats['write_ms_max'] = max(_stats['write_ms_max'], write_ms)
+        _stats['latency_ms_max'] = max(_stats['latency_ms_max'], latency_ms)
+
+
+def _collect_batch(max_size, max_wait):
+    """
+    Collect up to max_size events, waiting at most max_wait seconds after
+    the first one arrives.
+
+    Returns:
+        List of events (empty if nothing arrived within the poll interval)
+    """
+    try:
+        # Wait for first event (with timeout so we can check worker_running)
+        events = [event_queue.get(timeout=0.5)]
+    except queue.Empty:
+        return []
+
+    deadline = time.monotonic() + max_wait
+    while len(events) < max_size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            events.append(event_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return events
 
 
 def background_worker():
@@ -70,94 +344,136 @@ def background_worker():
     Background worker thread that continuously processes queued events.
 
     This thread runs in a loop, collecting events from the queue and writing
-    them to the database in batches for efficiency.
+    them to the database in batches: a batch is written once it holds
+    ANALYTICS_BATCH_SIZE events or ANALYTICS_BATCH_MAX_WAIT_MS after its
+    first event, whichever comes first. Each batch also updates the per-day
+    rollup tables in the same transaction. The worker keeps one connection
+    open for its lifetime and only reconnects after a database error.
+
+    Journaled (spilled) events are replayed on startup and whenever the
+    queue runs empty; batches that fail to write are journaled for retry.
+    The analytics WAL is checkpointed every ANALYTICS_CHECKPOINT_INTERVAL
+    seconds.
     """
     # Import here to avoid circular imports
-    import config
-    import sqlite3
-    import os
+    import models
+
+    def open_connection():
+        # The worker only writes analytics tables, so it talks to the
+        # analytics database directly and checkpoints its WAL on its own
+        # schedule (see below) instead of on commit
+        conn = models.get_analytics_db()
+        conn.execute("PRAGMA wal_autocheckpoint=0")
+        return conn
+
+    def write_batch(conn, events):
+        conn.executemany('''
+            INSERT INTO analytics_events (timestamp, event_type, user_id, user_type, metadata)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [
+            (e['timestamp'], e['event_type'], e['user_id'], e['user_type'], e['metadata'])
+            for e in events
+        ])
+        models.update_analytics_rollups(conn, events)
+        conn.commit()
 
-    # Determine if using SQLCipher
-    SQLCIPHER_KEY = os.environ.get('SQLCIPHER_KEY')
-    USE_SQLCIPHER = False
+    print("Analytics worker thread started", file=sys.stderr)
 
-    if SQLCIPHER_KEY:
-        try:
-            from sqlcipher3 import dbapi2 as sqlite3
-            USE_SQLCIPHER = True
-        except ImportError:
-            import sqlite3
-    else:
-        import sqlite3
+    conn = None
 
-    # Database connection context manager (local to worker thread)
-    @contextmanager
-    def db_connection():
-        conn = sqlite3.connect(config.DATABASE, timeout=20)
+    def flush(events):
+        """Write a batch, reconnecting if needed; returns True on success."""
+        nonlocal conn
         try:
-            if USE_SQLCIPHER and SQLCIPHER_KEY:
-                safe_key = SQLCIPHER_KEY.replace('"', '""')
-                conn.execute(f'PRAGMA key = "{safe_key}"')
+            if conn is None:
+                conn = open_connection()
+            write_batch(conn, events)
+            return True
+        except Exception:
+            # Drop the connection so the next batch starts from a clean one
+            if conn is not None:
+                try:
+                    conn.rollback()
+                    conn.close()
+                except Exception:
+                    pass
+                conn = None
+            raise
 
-            # Use the same optimizations as main connection
-            conn.execute("PRAGMA journal_mode=WAL")
-            conn.execute("PRAGMA synchronous=NORMAL")
+    # After a failed replay, wait before the next attempt (doubling up to
+    # REPLAY_BACKOFF_MAX seconds) instead of retrying on every idle tick
+    replay_backoff = 0
+    next_replay = 0.0
 
-            yield conn
-            conn.commit()
+    def replay():
+        nonlocal replay_backoff, next_replay
+        if time.monotonic() < next_replay:
+            return
+        try:
+            replayed = replay_spill(flush, retry_errors=(models.sqlite3.OperationalError,))
+            if replayed:
+                print(f"Analytics worker replayed {replayed} journaled events", file=sys.stderr)
+            replay_backoff = 0
         except Exception as e:
-            conn.rollback()
-            print(f"ERROR: Analytics worker database error: {e}", file=sys.stderr)
-            raise
-        finally:
-            conn.close()
-
-    print("Analytics worker thread started", file=sys.stderr)
+            replay_backoff = min(max(replay_backoff * 2, 1), REPLAY_BACKOFF_MAX)
+            next_replay = time.monotonic() + replay_backoff
+            print(f"ERROR: Failed to replay analytics journal (retry in {replay_backoff}s): {e}",
+                  file=sys.stderr)
+
+    last_checkpoint = time.monotonic()
+
+    def checkpoint():
+        nonlocal last_checkpoint
+        if conn is None or time.monotonic() - last_checkpoint < config.ANALYTICS_CHECKPOINT_INTERVAL:
+            return
+        last_checkpoint = time.monotonic()
+        try:
+            # PASSIVE never blocks readers or writers of the analytics database
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        except Exception as e:
+            print(f"WARNING: Analytics checkpoint failed: {e}", file=sys.stderr)
 
-    while worker_running:
-        events = []
+    # Events journaled by a previous run (queue overflow, shutdown, crash)
+    replay()
 
+    while worker_running or not event_queue.empty():
         try:
-            # Wait for first event (with timeout so we can check worker_running)
-            try:
-                first_event = event_queue.get(timeout=0.5)
-                events.append(first_event)
-            except queue.Empty:
+            # While stopping, write whatever is left without waiting
+            max_wait = config.ANALYTICS_BATCH_MAX_WAIT_MS / 1000 if worker_running else 0
+            events = _collect_batch(config.ANALYTICS_BATCH_SIZE, max_wait)
+            if not events:
+                # Idle: move anything that overflowed into the database
+                sync_spill(close=True)
+                replay()
+                checkpoint()
                 continue  # Loop back and check if we should keep running
 
-            # Try to collect up to 9 more events (total 10) without blocking
-            for _ in range(9):
-                try:
-                    events.append(event_queue.get_nowait())
-                except queue.Empty:
-                    break
-
-            # Write batch to database
-            if events:
-                try:
-                    with db_connection() as conn:
-                        conn.executemany('''
-                            INSERT INTO analytics_events (event_type, user_id, user_type, metadata)
-                            VALUES (?, ?, ?, ?)
-                        ''', [
-                            (e['event_type'], e['user_id'], e['user_type'], e['metadata'])
-                            for e in events
-                        ])
-
-                    # Mark all events as processed
-                    for _ in events:
-                        event_queue.task_done()
-
-                except Exception as e:
-                    print(f"ERROR: Failed to write analytics batch: {e}", file=sys.stderr)
-                    # Mark events as done even on failure to prevent queue.join() from hanging
-                    for _ in events:
-                        event_queue.task_done()
+            started = time.monotonic()
+            ok = False
+            try:
+                ok = flush(events)
+            except Exception as e:
+                print(f"ERROR: Failed to write analytics batch, journaling it: {e}", file=sys.stderr)
+                for event in events:
+                    spill_event(event)
+            finally:
+                finished = time.monotonic()
+                latency = max(finished - e['enqueued_at'] for e in events)
+                _record_batch(len(events), (finished - started) * 1000, latency * 1000, ok)
+                # Mark events as done even on failure to prevent queue.join() from hanging
+                for _ in events:
+                    event_queue.task_done()
+
+            # Batched fsync of events that overflowed meanwhile
+            sync_spill()
+            checkpoint()
 
         except Exception as e:
             print(f"ERROR: Analytics worker loop error: {e}", file=sys.stderr)
             time.sleep(1)  # Prevent tight loop on persistent errors
 
+    if conn is not None:
+        conn.close()
     print("Analytics worker thread stopped", file=sys.stderr)
 
 
@@ -177,8 +493,28 @@ def start_worker():
     worker_thread = threading.Thread(target=background_worker, daemon=True, name="AnalyticsWorker")
     worker_thread.start()
 
-    # Register cleanup on exit
+    # Register cleanup on exit. systemd stops the service with SIGTERM,
+    # which ends the process without running atexit, so handle it too.
     atexit.register(stop_worker)
+    _install_signal_handlers()
+
+
+def _install_signal_handlers():
+    """Journal queued events on SIGTERM/SIGINT, then stop as before."""
+    if threading.current_thread() is not threading.main_thread():
+        return  # Signal handlers can only be set from the main thread
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(signum)
+
+        def handler(signum, frame, previous=previous):
+            stop_worker()
+            if callable(previous):
+                previous(signum, frame)  # e.g. KeyboardInterrupt for SIGINT
+            else:
+                sys.exit(128 + signum)
+
+        signal.signal(signum, handler)
 
 
 def stop_worker(timeout=5):
@@ -198,14 +534,24 @@ def stop_worker(timeout=5):
     print(f"Stopping analytics worker, flushing queue... (max {timeout}s)", file=sys.stderr)
     worker_running = False
 
-    # Wait for queue to empty (or timeout)
-    start_time = time.time()
-    while not event_queue.empty() and (time.time() - start_time) < timeout:
-        time.sleep(0.1)
+    # The worker drains the queue before it exits - wait for it (or timeout)
+    if worker_thread is not None:
+        worker_thread.join(timeout)
+
+    # Journal whatever the worker did not get to; it is replayed on next start
+    remaining = 0
+    while True:
+        try:
+            event = event_queue.get_nowait()
+        except queue.Empty:
+            break
+        spill_event(event)
+        event_queue.task_done()
+        remaining += 1
+    sync_spill(close=True)
 
-    remaining = event_queue.qsize()
     if remaining > 0:
-        print(f"WARNING: {remaining} analytics events not written (timeout)", file=sys.stderr)
+        print(f"WARNING: {remaining} analytics events journaled to disk (timeout)", file=sys.stderr)
     else:
         print("Analytics queue flushed successfully", file=sys.stderr)
 
@@ -220,3 +566,21 @@ def get_queue_size():
     Useful for monitoring and debugging.
     """
     return event_queue.qsize()
+
+
+def get_worker_stats():
+    """
+    Get throughput and latency counters of the background worker.
+
+    Returns:
+        Dictionary with events/batches written and failed, the size of the
+        last batch, average and maximum write time per batch (ms), the
+        maximum time an event waited from enqueue to commit (ms), and the
+        current queue size
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    batches = stats['batches_written'] + stats['batches_failed']
+    stats['write_ms_avg'] = stats['write_ms_total'] / batches if batches else 0.0
+    stats['queue_size'] = event_queue.qsize()
+    return stats
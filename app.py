@@ -1,18 +1,23 @@
 import os
 import json
+import mimetypes
 import traceback
 from functools import wraps
 from datetime import date, datetime
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, send_from_directory, abort, Response
+from urllib.parse import quote
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, send_from_directory, abort, Response, g, make_response
 from flask_wtf.csrf import CSRFProtect
 from flask_compress import Compress
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 from markupsafe import Markup
-import markdown as md
 
 import config
 import models
-from utils import generate_username, generate_password, allowed_file, generate_credentials_pdf, generate_student_self_report_pdf
+import quiz_cache
+import markdown_render
+import password_hasher
+from utils import generate_username, generate_password, parse_roster, decode_upload, allowed_file, generate_credentials_pdf, generate_student_self_report_pdf
 
 app = Flask(__name__)
 app.secret_key = config.SECRET_KEY
@@ -38,10 +43,18 @@ compress = Compress(app)
 
 @app.template_filter('markdown')
 def markdown_filter(text):
-    """Convert markdown text to HTML."""
+    """Convert markdown text to HTML (cached, see markdown_render.py)."""
     if not text:
         return ''
-    html = md.markdown(text, extensions=['nl2br', 'fenced_code', 'tables', 'sane_lists'], tab_length=3)
+    return Markup(markdown_render.render(text))
+
+
+@app.template_filter('rendered_markdown')
+def rendered_markdown_filter(row, field):
+    """HTML of a Markdown field, preferring the <field>_html column rendered at save time."""
+    html = row.get(f'{field}_html')
+    if html is None:
+        return markdown_filter(row.get(field))
     return Markup(html)
 
 
@@ -67,6 +80,17 @@ def student_required(f):
     return decorated
 
 
+def read_write_request(f):
+    """Mark a GET view that also writes, so it does not pin a read snapshot.
+
+    GET requests normally read from one snapshot (see begin_database_scope),
+    which cannot be upgraded to a write once other connections have committed.
+    begin_database_scope reads the mark before any model call of the request.
+    """
+    f.read_write = True
+    return f
+
+
 # ============ Auth Routes ============
 
 @app.route('/')
@@ -84,8 +108,17 @@ def login():
         username = request.form['username']
         password = request.form['password']
 
-        # Try admin login
-        admin = models.verify_admin(username, password)
+        try:
+            admin = models.verify_admin(username, password)
+            student = None if admin else models.verify_student(username, password)
+        except password_hasher.Overloaded:
+            # Login storm: answer fast instead of tying up more worker threads
+            flash('Gerade melden sich sehr viele an. Bitte in ein paar Sekunden erneut versuchen.', 'warning')
+            response = make_response(render_template('login.html'), 503)
+            response.headers['Retry-After'] = str(config.PASSWORD_HASH_RETRY_AFTER)
+            return response
+
+        # Admin login
         if admin:
             session['admin_id'] = admin['id']
             session['admin_username'] = admin['username']
@@ -99,8 +132,7 @@ def login():
             flash('Willkommen zurück! 👋', 'success')
             return redirect(url_for('admin_dashboard'))
 
-        # Try student login
-        student = models.verify_student(username, password)
+        # Student login
         if student:
             session['student_id'] = student['id']
             session['student_name'] = f"{student['vorname']} {student['nachname']}"
@@ -131,22 +163,14 @@ def logout():
 @app.route('/admin')
 @admin_required
 def admin_dashboard():
-    klassen = models.get_all_klassen()
-    tasks = models.get_all_tasks()
-
-    # Filter classes for "Unterricht heute" based on schedule
-    today_weekday = datetime.today().weekday()  # 0=Monday, 6=Sunday
-    klassen_heute = []
-    for klasse in klassen:
-        schedule = models.get_class_schedule(klasse['id'])
-        if schedule and schedule['weekday'] == today_weekday:
-            klassen_heute.append(klasse)
+    # Classes with schedule, counts and today's lessons in one query
+    data = models.get_admin_dashboard_data(date.today())
 
     # Get page view logging setting
     log_page_views = models.get_bool_setting('log_page_views', default=True)
 
-    return render_template('admin/dashboard.html', klassen=klassen, tasks=tasks,
-                          klassen_heute=klassen_heute, log_page_views=log_page_views)
+    return render_template('admin/dashboard.html', klassen=data['klassen'], task_count=data['task_count'],
+                          klassen_heute=data['klassen_heute'], log_page_views=log_page_views)
 
 
 @app.route('/admin/settings', methods=['POST'])
@@ -156,9 +180,6 @@ def admin_update_settings():
     log_page_views = 'log_page_views' in request.form
     models.set_bool_setting('log_page_views', log_page_views)
 
-    # Update cached value
-    app.config['LOG_PAGE_VIEWS'] = log_page_views
-
     flash(f"Einstellung gespeichert: Seitenaufrufe protokollieren {'aktiviert' if log_page_views else 'deaktiviert'}",
           'success')
     return redirect(url_for('admin_dashboard'))
@@ -254,44 +275,41 @@ def admin_klasse_bericht(klasse_id):
 @app.route('/admin/klasse/<int:klasse_id>/schueler-hinzufuegen', methods=['POST'])
 @admin_required
 def admin_klasse_schueler_hinzufuegen(klasse_id):
-    batch_input = request.form['batch_input']
+    # Roster from the textarea or an uploaded CSV file (e.g. a whole grade)
+    roster_file = request.files.get('roster_file')
+    if roster_file and roster_file.filename:
+        roster = parse_roster(decode_upload(roster_file.read()))
+    else:
+        roster = parse_roster(request.form.get('batch_input', ''))
+
     existing_usernames = models.get_existing_usernames()
 
     # Collect created students for PDF
     created_students = []
 
-    for line in batch_input.strip().split('\n'):
-        line = line.strip()
-        if not line:
-            continue
-        parts = line.split(',')
-        if len(parts) >= 2:
-            nachname = parts[0].strip()
-            vorname = parts[1].strip()
-
-            username = generate_username(existing_usernames, vorname, nachname)
-            existing_usernames.add(username)
-            password = generate_password()
-
-            student_id = models.create_student(nachname, vorname, username, password)
-            models.add_student_to_klasse(student_id, klasse_id)
-
-            # Store for PDF generation
-            created_students.append({
-                'nachname': nachname,
-                'vorname': vorname,
-                'username': username,
-                'password': password
-            })
+    for nachname, vorname in roster:
+        username = generate_username(existing_usernames, vorname, nachname)
+        existing_usernames.add(username)
+
+        created_students.append({
+            'nachname': nachname,
+            'vorname': vorname,
+            'username': username,
+            'password': generate_password()
+        })
 
     if not created_students:
         flash('Keine Schüler hinzugefügt.', 'warning')
         return redirect(url_for('admin_klasse_detail', klasse_id=klasse_id))
 
-    # Generate PDF with credentials
+    # Generate PDF with credentials before inserting: the inserts join the
+    # request transaction, which holds the write lock until the response
     klasse = models.get_klasse(klasse_id)
     pdf_buffer = generate_credentials_pdf(created_students, klasse['name'])
 
+    # One transaction for all students, passwords hashed in parallel
+    models.create_students_in_klasse(klasse_id, created_students)
+
     # Return PDF as download
     return Response(
         pdf_buffer.getvalue(),
@@ -729,10 +747,10 @@ def download_material(material_id):
     if material['typ'] != 'datei':
         abort(404)
 
-    # Verify file exists before serving
-    filepath = os.path.join(config.UPLOAD_FOLDER, material['pfad'])
-    if not os.path.exists(filepath):
-        app.logger.error(f'File not found: {filepath}')
+    # Verify file exists (and stays inside the uploads directory) before serving
+    filepath = safe_join(config.UPLOAD_FOLDER, material['pfad'])
+    if filepath is None or not os.path.exists(filepath):
+        app.logger.error(f"File not found: {material['pfad']}")
         flash('Datei nicht gefunden.', 'danger')
         abort(404)
 
@@ -751,6 +769,17 @@ def download_material(material_id):
             }
         )
 
+        if config.UPLOAD_ACCEL_REDIRECT_PREFIX:
+            # nginx sends the file from its internal location, so no waitress
+            # thread is busy for the transfer
+            mimetype = mimetypes.guess_type(material['pfad'])[0] or 'application/octet-stream'
+            response = Response(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = (
+                config.UPLOAD_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + quote(material['pfad'])
+            )
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+
         # Serve the file from the protected uploads directory
         return send_from_directory(
             config.UPLOAD_FOLDER,
@@ -878,49 +907,24 @@ def admin_aufgaben_verwaltung_speichern():
     try:
         if context == 'class':
             # Save class-wide settings
-            for subtask_id_str, enabled in subtask_settings.items():
-                subtask_id = int(subtask_id_str)
-                models.set_subtask_visibility_for_class(klasse_id, subtask_id, enabled, admin_id)
-
-            return jsonify({'success': True, 'message': 'Einstellungen für die Klasse gespeichert.'})
+            result = models.save_subtask_visibility(subtask_settings, admin_id, klasse_id)
+            message = 'Einstellungen für die Klasse gespeichert.'
 
         elif context == 'student':
             # Save student-specific overrides (only when different from class default)
-            # First, get class visibility settings to compare
-            class_visibility = models.get_subtask_visibility_settings(klasse_id=klasse_id, task_id=task_id)
-
-            print(f"DEBUG SAVE: Received subtask_settings={subtask_settings}", flush=True)
-            print(f"DEBUG SAVE: class_visibility={class_visibility}", flush=True)
-
-            with models.db_session() as conn:
-                for subtask_id_str, enabled in subtask_settings.items():
-                    subtask_id = int(subtask_id_str)
-                    class_enabled = class_visibility.get(subtask_id, {}).get('enabled', False)
-
-                    if enabled == class_enabled:
-                        # Matches class default - remove any student override
-                        conn.execute('''
-                            DELETE FROM subtask_visibility
-                            WHERE student_id = ? AND subtask_id = ?
-                        ''', (student_id, subtask_id))
-                    else:
-                        # Differs from class default - create/update student override
-                        # Delete existing first
-                        conn.execute('''
-                            DELETE FROM subtask_visibility
-                            WHERE student_id = ? AND subtask_id = ?
-                        ''', (student_id, subtask_id))
-                        # Insert new override
-                        conn.execute('''
-                            INSERT INTO subtask_visibility (subtask_id, student_id, enabled, set_by_admin_id)
-                            VALUES (?, ?, ?, ?)
-                        ''', (subtask_id, student_id, 1 if enabled else 0, admin_id))
-
-            return jsonify({'success': True, 'message': 'Einstellungen für den Schüler gespeichert.'})
+            result = models.save_subtask_visibility(subtask_settings, admin_id, klasse_id, student_id=student_id)
+            message = 'Einstellungen für den Schüler gespeichert.'
 
         else:
             return jsonify({'success': False, 'message': 'Ungültiger Kontext.'}), 400
 
+        return jsonify({
+            'success': True,
+            'message': message,
+            'changed': result['changed'],
+            'visibility': result['visibility']
+        })
+
     except Exception as e:
         return jsonify({'success': False, 'message': f'Fehler beim Speichern: {str(e)}'}), 500
 
@@ -1031,15 +1035,15 @@ def admin_passwort():
 
 @app.route('/admin/errors')
 @admin_required
+@read_write_request
 def admin_errors():
     """View error logs with pagination and filtering."""
-    # Trigger cleanup of old logs (30 days)
-    deleted_count = models.cleanup_old_error_logs(days=30)
+    # Trigger cleanup of old logs (ERROR_LOG_RETENTION_DAYS, default 30)
+    deleted_count = models.cleanup_old_error_logs(days=config.ERROR_LOG_RETENTION_DAYS)
 
-    # Get pagination parameters
-    page = request.args.get('page', 1, type=int)
+    # Get pagination parameters (opaque keyset cursor)
+    cursor = request.args.get('cursor', None)
     per_page = 50
-    offset = (page - 1) * per_page
 
     # Get filter parameter
     level_filter = request.args.get('level', None)
@@ -1047,18 +1051,20 @@ def admin_errors():
         level_filter = None
 
     # Get logs and stats
-    logs = models.get_error_logs(limit=per_page, offset=offset, level_filter=level_filter)
-    total_count = models.get_error_log_count(level_filter=level_filter)
+    page = models.get_error_logs_page(limit=per_page, page_token=cursor, level_filter=level_filter)
     stats = models.get_error_log_stats()
 
-    # Calculate pagination info
-    total_pages = (total_count + per_page - 1) // per_page
+    # Total count comes from the per-level stats instead of another COUNT(*)
+    if level_filter:
+        total_count = stats['by_level'].get(level_filter, 0)
+    else:
+        total_count = sum(stats['by_level'].values())
 
     return render_template('admin/errors.html',
-                         logs=logs,
+                         logs=page['items'],
                          stats=stats,
-                         page=page,
-                         total_pages=total_pages,
+                         next_cursor=page['next_token'],
+                         prev_cursor=page['prev_token'],
                          total_count=total_count,
                          level_filter=level_filter,
                          deleted_count=deleted_count)
@@ -1077,10 +1083,11 @@ def admin_errors_clear():
 
 @app.route('/admin/analytics')
 @admin_required
+@read_write_request
 def admin_analytics():
     """View analytics overview."""
-    # Trigger cleanup of old analytics events (210 days)
-    deleted_count = models.cleanup_old_analytics_events(days=210)
+    # Trigger cleanup of old analytics events (ANALYTICS_RETENTION_DAYS, default 210)
+    deleted_count = models.cleanup_old_analytics_events(days=config.ANALYTICS_RETENTION_DAYS)
 
     # Get overview statistics
     stats = models.get_analytics_overview()
@@ -1099,33 +1106,31 @@ def admin_student_activity(student_id):
         flash('Schüler nicht gefunden.', 'danger')
         return redirect(url_for('admin_analytics'))
 
-    # Get pagination parameters
-    page = request.args.get('page', 1, type=int)
+    # Get pagination parameters (opaque keyset cursor)
+    cursor = request.args.get('cursor', None)
     per_page = 50
-    offset = (page - 1) * per_page
 
     # Get date range filters
     date_from = request.args.get('date_from', None)
     date_to = request.args.get('date_to', None)
 
     # Get activity log
-    events = models.get_analytics_events(
+    page = models.get_analytics_events_page(
         limit=per_page,
-        offset=offset,
+        page_token=cursor,
         user_id=student_id,
         user_type='student',
         date_from=date_from,
         date_to=date_to
     )
 
-    # Get total count for pagination
-    total_count = models.get_analytics_count(
+    # Approximate total from the daily rollups
+    total_count = models.estimate_analytics_count(
         user_id=student_id,
         user_type='student',
         date_from=date_from,
         date_to=date_to
     )
-    total_pages = (total_count + per_page - 1) // per_page
 
     # Get summary statistics
     summary = models.get_student_activity_summary(
@@ -1136,10 +1141,10 @@ def admin_student_activity(student_id):
 
     return render_template('admin/student_activity.html',
                          student=student,
-                         events=events,
+                         events=page['items'],
                          summary=summary,
-                         page=page,
-                         total_pages=total_pages,
+                         next_cursor=page['next_token'],
+                         prev_cursor=page['prev_token'],
                          total_count=total_count,
                          date_from=date_from,
                          date_to=date_to)
@@ -1160,6 +1165,7 @@ def admin_unterricht(klasse_id):
 
 @app.route('/admin/klasse/<int:klasse_id>/unterricht/<datum>')
 @admin_required
+@read_write_request
 def admin_unterricht_datum(klasse_id, datum):
     klasse = models.get_klasse(klasse_id)
     if not klasse:
@@ -1230,7 +1236,6 @@ def admin_unterricht_kommentar(unterricht_id):
 
     with models.db_session() as conn:
         conn.execute('UPDATE unterricht SET kommentar = ? WHERE id = ?', (kommentar, unterricht_id))
-        conn.commit()
 
     return jsonify({'status': 'ok'})
 
@@ -1242,29 +1247,11 @@ def admin_unterricht_kommentar(unterricht_id):
 def student_dashboard():
     student_id = session['student_id']
     student = models.get_student(student_id)
-    klassen = models.get_student_klassen(student_id)
 
-    # Get current task for each class
-    tasks_by_klasse = {}
-    for klasse in klassen:
-        task = models.get_student_task(student_id, klasse['id'])
-        if task:
-            # Get only VISIBLE subtasks for this student
-            visible_subtasks = models.get_visible_subtasks_for_student(
-                student_id, klasse['id'], task['task_id']
-            )
-            visible_subtask_ids = {s['id'] for s in visible_subtasks}
-
-            # Get progress for all subtasks
-            all_subtasks = models.get_student_subtask_progress(task['id'])
-
-            # Filter to show only visible subtasks with their progress
-            visible_with_progress = [s for s in all_subtasks if s['id'] in visible_subtask_ids]
-
-            task['subtasks'] = visible_with_progress
-            task['total_subtasks'] = len(visible_with_progress)
-            task['completed_subtasks'] = sum(1 for s in visible_with_progress if s['erledigt'])
-        tasks_by_klasse[klasse['id']] = task
+    # Classes, current tasks and visible subtask progress in a constant number of queries
+    dashboard = models.get_student_dashboard_data(student_id)
+    klassen = dashboard['klassen']
+    tasks_by_klasse = dashboard['tasks_by_klasse']
 
     return render_template('student/dashboard.html', student=student, klassen=klassen,
                            tasks_by_klasse=tasks_by_klasse)
@@ -1391,7 +1378,7 @@ def student_toggle_subtask(student_task_id, subtask_id):
         return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
 
     erledigt = request.json.get('erledigt', False)
-    models.toggle_student_subtask(student_task_id, subtask_id, erledigt)
+    task_complete = models.toggle_student_subtask(student_task_id, subtask_id, erledigt)
 
     # Log subtask completion
     if erledigt:
@@ -1405,9 +1392,8 @@ def student_toggle_subtask(student_task_id, subtask_id):
             }
         )
 
-    # Check if task should be auto-completed
-    if models.check_task_completion(student_task_id):
-        models.mark_task_complete(student_task_id)
+    # The toggle already marked the task complete if all visible subtasks are done
+    if task_complete:
         # Log task completion
         models.log_analytics_event(
             event_type='task_complete',
@@ -1445,21 +1431,24 @@ def student_quiz(student_task_id):
         flash('Dieses Thema hat kein Quiz.', 'warning')
         return redirect(url_for('student_dashboard'))
 
-    quiz = json.loads(task['quiz_json'])
+    try:
+        quiz = quiz_cache.get_quiz(task['task_id'], task['quiz_json'])
+    except ValueError:
+        flash('Das Quiz dieses Themas ist fehlerhaft.', 'danger')
+        return redirect(url_for('student_dashboard'))
 
     if request.method == 'POST':
         # Grade the quiz using the mapping from hidden fields
         punkte = 0
-        max_punkte = len(quiz['questions'])
+        max_punkte = quiz['question_count']
         antworten = {}
 
         # Get the question order mapping (shuffled index -> original index)
         question_order = json.loads(request.form.get('question_order', '[]'))
 
-        for shuffled_idx in range(len(quiz['questions'])):
+        for shuffled_idx in range(max_punkte):
             # Map shuffled question index to original
             original_q_idx = question_order[shuffled_idx] if question_order else shuffled_idx
-            question = quiz['questions'][original_q_idx]
 
             # Get answer mapping for this question (shuffled answer index -> original answer index)
             answer_map = json.loads(request.form.get(f'answer_map_{shuffled_idx}', '[]'))
@@ -1471,11 +1460,10 @@ def student_quiz(student_task_id):
             # Map submitted shuffled indices back to original indices
             submitted_original = [answer_map[i] for i in submitted_shuffled] if answer_map else submitted_shuffled
 
-            correct = question['correct']
             antworten[str(original_q_idx)] = submitted_original
 
             # Check if answer is correct (all correct options selected, no incorrect ones)
-            if set(submitted_original) == set(correct):
+            if set(submitted_original) == quiz['correct_sets'][original_q_idx]:
                 punkte += 1
 
         attempt_id, bestanden = models.save_quiz_attempt(
@@ -1496,9 +1484,8 @@ def student_quiz(student_task_id):
             }
         )
 
-        # Check task completion
+        # save_quiz_attempt() already marked the task complete if it is done
         if models.check_task_completion(student_task_id):
-            models.mark_task_complete(student_task_id)
             # Log task completion (if not already logged from subtask completion)
             models.log_analytics_event(
                 event_type='task_complete',
@@ -1507,18 +1494,6 @@ def student_quiz(student_task_id):
                 metadata={'student_task_id': student_task_id}
             )
 
-        # Transform quiz for display (JSON uses 'text'/'options', template expects 'question'/'answers')
-        display_quiz = {
-            'questions': [
-                {
-                    'question': q['text'],
-                    'answers': q['options'],
-                    'correct': q['correct']
-                }
-                for q in quiz['questions']
-            ]
-        }
-
         # Get previous quiz attempts for improvement tracking (UX Tier 1)
         all_attempts = models.get_quiz_attempts(student_task_id)
         previous_attempt = all_attempts[1] if len(all_attempts) > 1 else None
@@ -1526,7 +1501,7 @@ def student_quiz(student_task_id):
         return render_template('student/quiz_result.html',
                                student=student,
                                task=task,
-                               quiz=display_quiz,
+                               quiz=quiz['display'],
                                punkte=punkte,
                                max_punkte=max_punkte,
                                bestanden=bestanden,
@@ -1537,7 +1512,7 @@ def student_quiz(student_task_id):
     import random as quiz_random
 
     # Create shuffled question order (list of original indices in shuffled order)
-    question_order = list(range(len(quiz['questions'])))
+    question_order = list(range(quiz['question_count']))
     quiz_random.shuffle(question_order)
 
     # Build shuffled quiz with answer mappings
@@ -1665,6 +1640,7 @@ def handle_not_found(error):
 @app.errorhandler(500)
 def handle_internal_error(error):
     """Handle 500 Internal Server errors."""
+    models.rollback_request_scope()
     user_id, user_type = get_current_user_info()
     models.log_error(
         level='ERROR',
@@ -1687,6 +1663,7 @@ def handle_exception(error):
     if isinstance(error, Exception) and error.__class__.__name__ == 'NotFound':
         return handle_not_found(error)
 
+    models.rollback_request_scope()
     user_id, user_type = get_current_user_info()
     models.log_error(
         level='CRITICAL',
@@ -1702,6 +1679,35 @@ def handle_exception(error):
     return redirect(url_for('index'))
 
 
+# ============ Database Unit of Work ============
+
+@app.before_request
+def begin_database_scope():
+    """Share one connection and transaction across all model calls of a request.
+
+    The connection is only checked out on first use, so requests that never
+    touch the database (static files, redirects) cost nothing.
+    """
+    if config.DB_REQUEST_SCOPE:
+        view = app.view_functions.get(request.endpoint)
+        read_only = (request.method in ('GET', 'HEAD', 'OPTIONS')
+                     and not getattr(view, 'read_write', False))
+        models.begin_request_scope(read_only=read_only)
+
+
+@app.after_request
+def commit_database_scope(response):
+    """Commit before the response leaves, so a failed commit becomes a 500."""
+    models.end_request_scope()
+    return response
+
+
+@app.teardown_request
+def close_database_scope(error=None):
+    """Roll back whatever is still open (unhandled errors skip after_request)."""
+    models.rollback_request_scope()
+
+
 # ============ Analytics Middleware ============
 
 @app.before_request
@@ -1740,7 +1746,7 @@ def log_analytics():
         return  # Don't log unauthenticated requests
 
     # Log page view (if enabled)
-    if app.config.get('LOG_PAGE_VIEWS', True):
+    if models.get_bool_setting('log_page_views', default=True):
         models.log_analytics_event(
             event_type='page_view',
             user_id=user_id,
@@ -1760,17 +1766,18 @@ def init_app():
     os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)  # instance/uploads
     os.makedirs(os.path.join(os.path.dirname(config.UPLOAD_FOLDER), 'tmp'), exist_ok=True)  # instance/tmp
     os.makedirs(os.path.dirname(config.DATABASE), exist_ok=True)  # data/
-    models.init_db()
-    models.migrate_add_current_subtask()
+    # Only pending schema migrations run (see models.MIGRATIONS)
+    for migration in models.init_db():
+        print(f"Applied schema migration {migration}")
+    models.render_stored_markdown()
 
     # Start async analytics worker thread
     from analytics_queue import start_worker
     start_worker()
     print("Analytics worker thread started")
 
-    # Load app settings into config (cached for performance)
-    app.config['LOG_PAGE_VIEWS'] = models.get_bool_setting('log_page_views', default=True)
-    print(f"Page view logging: {'enabled' if app.config['LOG_PAGE_VIEWS'] else 'disabled'}")
+    # Settings are served from memory (see models.get_setting)
+    print(f"Page view logging: {'enabled' if models.get_bool_setting('log_page_views', default=True) else 'disabled'}")
 
     # Create default admin if not exists
     if models.create_admin('admin', 'admin'):
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Rebuild the per-day analytics rollup tables from analytics_events.
+
+The analytics worker keeps analytics_daily and analytics_user_daily up to
+date as it writes events. Run this once after deploying the rollup tables
+(to cover events recorded before), or whenever the rollups need repair.
+
+Usage:
+    python backfill_analytics_rollups.py
+
+    # For SQLCipher encrypted database:
+    SQLCIPHER_KEY=your_key python backfill_analytics_rollups.py
+
+Safe to run multiple times - the rollups are recomputed from scratch.
+"""
+
+import sys
+import models
+
+
+def backfill():
+    """Create the rollup tables if needed and recompute their contents."""
+    print("Ensuring rollup tables exist...")
+    models.init_db()
+
+    with models.db_session() as conn:
+        event_count = conn.execute("SELECT COUNT(*) FROM analytics_events").fetchone()[0]
+    print(f"Aggregating {event_count} analytics events...")
+
+    daily_rows, user_daily_rows = models.rebuild_analytics_rollups()
+    print(f"✓ analytics_daily: {daily_rows} rows")
+    print(f"✓ analytics_user_daily: {user_daily_rows} rows")
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(backfill())
+    except Exception as e:
+        print(f"ERROR: Backfill failed: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -21,11 +21,17 @@ Usage:
 
     # With SQLCipher (encrypted database)
     SQLCIPHER_KEY="your-key" python benchmark_app.py
+
+    # Compare SQLCipher profiles (key type, page size, KDF iterations,
+    # memory security) on temporary encrypted copies of the database
+    SQLCIPHER_KEY="your-key" python benchmark_app.py --cipher-profiles
 """
 
+import os
 import sys
 import time
 import argparse
+import tempfile
 from contextlib import contextmanager
 import statistics
 
@@ -260,6 +266,97 @@ Das ist ein [Link](https://example.com) und hier ist `inline code`.
     print(f"  Median: {statistics.median(times):.2f}ms")
 
 
+# Profiles compared by --cipher-profiles: (name, raw key, page size, kdf_iter, memory security)
+CIPHER_PROFILES = [
+    ('Passphrase, SQLCipher 4 defaults', False, 4096, 256000, True),
+    ('Passphrase, memory security off', False, 4096, 256000, False),
+    ('Passphrase, kdf_iter 64000', False, 4096, 64000, False),
+    ('Raw key', True, 4096, None, False),
+    ('Raw key, page size 8192', True, 8192, None, False),
+    ('Raw key, page size 16384', True, 16384, None, False),
+]
+
+# Representative reads: the student dashboard's task list and a full scan
+PROFILE_QUERIES = [
+    """SELECT st.*, t.name FROM student_task st JOIN task t ON t.id = st.task_id
+       WHERE st.student_id = (SELECT MIN(id) FROM student)""",
+    "SELECT COUNT(*), SUM(LENGTH(beschreibung)) FROM task",
+]
+
+
+def _open_profile_db(path, key, page_size, kdf_iter, memory_security, cache_size):
+    conn = models.sqlite3.connect(path)
+    models.key_connection(conn, key, page_size=page_size, kdf_iter=kdf_iter,
+                          memory_security=memory_security)
+    conn.execute(f"PRAGMA cache_size = {cache_size}")
+    return conn
+
+
+def _print_times(label, times):
+    print(f"  {label:<12} mean {statistics.mean(times):8.2f}ms   median {statistics.median(times):8.2f}ms")
+
+
+def benchmark_cipher_profiles(iterations=10):
+    """Compare SQLCipher profiles on temporary encrypted copies of the database.
+
+    For each profile, the database is exported with sqlcipher_export into a
+    copy using that profile, then measured:
+    - Open: connect + key + first read (what a new pooled connection costs)
+    - Cold query: the representative queries on a freshly opened connection
+    - Warm query: the same queries on an open connection (page cache filled)
+    """
+    import config
+
+    print("\n\n=== SQLCipher Profile Benchmarks ===")
+    if not models.USE_SQLCIPHER:
+        print("\n  Skipped: requires sqlcipher3-binary and SQLCIPHER_KEY")
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = models.sqlite3.connect(config.DATABASE)
+        models.key_connection(source)
+        passphrase = models.SQLCIPHER_KEY if not models.is_raw_key(models.SQLCIPHER_KEY) else 'benchmark'
+
+        for number, (name, raw, page_size, kdf_iter, memory_security) in enumerate(CIPHER_PROFILES, 1):
+            key = "x'" + os.urandom(32).hex() + "'" if raw else passphrase
+            path = os.path.join(tmpdir, f'profile{number}.db')
+            source.execute("ATTACH DATABASE ? AS profile KEY ?", (path, key))
+            source.execute(f"PRAGMA profile.cipher_page_size = {page_size}")
+            if kdf_iter:
+                source.execute(f"PRAGMA profile.kdf_iter = {kdf_iter}")
+            source.execute("SELECT sqlcipher_export('profile')")
+            source.execute("DETACH DATABASE profile")
+
+            settings = (path, key, page_size, kdf_iter, memory_security, config.SQLITE_CACHE_SIZE)
+            open_times, cold_times, warm_times = [], [], []
+            for i in range(iterations):
+                start = time.perf_counter()
+                conn = _open_profile_db(*settings)
+                conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                open_times.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                for query in PROFILE_QUERIES:
+                    conn.execute(query).fetchall()
+                cold_times.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                for query in PROFILE_QUERIES:
+                    conn.execute(query).fetchall()
+                warm_times.append((time.perf_counter() - start) * 1000)
+                conn.close()
+
+            print(f"\n{number}. {name} - {iterations} iterations:")
+            _print_times('Open:', open_times)
+            _print_times('Cold query:', cold_times)
+            _print_times('Warm query:', warm_times)
+
+        source.close()
+
+    print("\n  Page size and KDF iterations are stored in the database; switch with")
+    print("  migrate_to_sqlcipher.py --rekey. Memory security is a runtime setting.")
+
+
 def get_system_info():
     """Get system information for comparison."""
     import platform
@@ -283,6 +380,9 @@ def get_system_info():
         if models.USE_SQLCIPHER:
             print(f"Encryption:     Yes (SQLCipher)")
             print(f"SQLCipher pkg:  sqlcipher3-binary")
+            key_type = 'raw' if models.is_raw_key(models.SQLCIPHER_KEY) else f'passphrase, kdf_iter {config.SQLCIPHER_KDF_ITER}'
+            print(f"Cipher profile: {key_type} key, page size {config.SQLCIPHER_PAGE_SIZE}, "
+                  f"memory security {'on' if config.SQLCIPHER_MEMORY_SECURITY else 'off'}")
         else:
             sqlcipher_key_set = os.environ.get('SQLCIPHER_KEY') is not None
             if sqlcipher_key_set:
@@ -304,6 +404,8 @@ def main():
                         help='Only run database benchmarks')
     parser.add_argument('--render-only', action='store_true',
                         help='Only run rendering benchmarks')
+    parser.add_argument('--cipher-profiles', action='store_true',
+                        help='Only compare SQLCipher profiles (needs SQLCIPHER_KEY)')
 
     args = parser.parse_args()
 
@@ -313,12 +415,15 @@ def main():
 
     get_system_info()
 
-    if not args.render_only:
-        benchmark_database_queries(args.iterations)
+    if args.cipher_profiles:
+        benchmark_cipher_profiles(args.iterations)
+    else:
+        if not args.render_only:
+            benchmark_database_queries(args.iterations)
 
-    if not args.db_only:
-        benchmark_template_rendering(args.iterations)
-        benchmark_markdown_rendering(args.iterations)
+        if not args.db_only:
+            benchmark_template_rendering(args.iterations)
+            benchmark_markdown_rendering(args.iterations)
 
     print("\n" + "=" * 60)
     print("Benchmark Complete!")
@@ -12,6 +12,7 @@ import time
 import json
 import sys
 import os
+from datetime import datetime, timezone
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -32,17 +33,30 @@ def test_database_connection():
 
 
 def benchmark_db_write(iterations=100):
-    """Measure raw database INSERT + COMMIT time."""
+    """Measure raw database INSERT + COMMIT time.
+
+    Writes like the analytics worker does: the event and its per-day
+    rollups in one transaction, so the dashboard counts stay in step.
+    """
     times = []
 
     for i in range(iterations):
         start = time.perf_counter()
 
+        event = {
+            'timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+            'event_type': 'benchmark_test',
+            'user_id': 1,
+            'user_type': 'admin',
+            'metadata': json.dumps({'iteration': i}),
+        }
         with models.db_session() as conn:
             conn.execute('''
-                INSERT INTO analytics_events (event_type, user_id, user_type, metadata)
-                VALUES (?, ?, ?, ?)
-            ''', ('benchmark_test', 1, 'admin', json.dumps({'iteration': i})))
+                INSERT INTO analytics_events (timestamp, event_type, user_id, user_type, metadata)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (event['timestamp'], event['event_type'], event['user_id'],
+                  event['user_type'], event['metadata']))
+            models.update_analytics_rollups(conn, [event])
 
         elapsed = (time.perf_counter() - start) * 1000  # Convert to ms
         times.append(elapsed)
@@ -86,12 +100,14 @@ def print_stats(times, label):
 
 
 def cleanup_benchmark_data():
-    """Remove benchmark test entries from database."""
+    """Remove benchmark test entries (and their rollup counts) from database."""
     with models.db_session() as conn:
         result = conn.execute(
             "DELETE FROM analytics_events WHERE event_type = 'benchmark_test'"
         )
         deleted = result.rowcount
+        conn.execute("DELETE FROM analytics_daily WHERE event_type = 'benchmark_test'")
+        conn.execute("DELETE FROM analytics_user_daily WHERE event_type = 'benchmark_test'")
     print(f"\nCleaned up {deleted} benchmark entries from database")
 
 
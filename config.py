@@ -15,8 +15,62 @@ if not SECRET_KEY:
         SECRET_KEY = 'dev-secret-key-not-for-production'
         print("WARNING: Using insecure development SECRET_KEY. Set SECRET_KEY env var for production.", file=sys.stderr)
 DATABASE = os.path.join(BASE_DIR, 'data', 'mbi_tracker.db')
+# Analytics events, their rollups and the error log live in their own file
+# (attached to every connection as schema "analytics"), so logging never
+# competes with classroom writes for the main database's WAL and locks
+ANALYTICS_DATABASE = os.environ.get('ANALYTICS_DATABASE', os.path.join(BASE_DIR, 'data', 'analytics.db'))
+# The analytics worker checkpoints the analytics WAL itself at this interval
+ANALYTICS_CHECKPOINT_INTERVAL = int(os.environ.get('ANALYTICS_CHECKPOINT_INTERVAL', 60))
+# Retention of analytics events and error log entries (days)
+ANALYTICS_RETENTION_DAYS = int(os.environ.get('ANALYTICS_RETENTION_DAYS', 210))
+ERROR_LOG_RETENTION_DAYS = int(os.environ.get('ERROR_LOG_RETENTION_DAYS', 30))
+# Pooled per-thread connections are recycled after this many seconds
+DB_CONNECTION_MAX_AGE = int(os.environ.get('DB_CONNECTION_MAX_AGE', 3600))
+# One shared transaction per Flask request (set to 'false' to commit per model call)
+DB_REQUEST_SCOPE = os.environ.get('DB_REQUEST_SCOPE', 'true').lower() in ('true', '1', 'yes')
+# Analytics worker writes a batch once it holds this many events ...
+ANALYTICS_BATCH_SIZE = int(os.environ.get('ANALYTICS_BATCH_SIZE', 200))
+# ... or once the oldest event in the batch has waited this long
+ANALYTICS_BATCH_MAX_WAIT_MS = int(os.environ.get('ANALYTICS_BATCH_MAX_WAIT_MS', 1000))
+# Number of parsed quizzes kept in memory per process (see quiz_cache.py)
+QUIZ_CACHE_SIZE = int(os.environ.get('QUIZ_CACHE_SIZE', 256))
+# Number of rendered Markdown texts kept in memory per process (see markdown_render.py)
+MARKDOWN_CACHE_SIZE = int(os.environ.get('MARKDOWN_CACHE_SIZE', 2048))
+# Reference data cached by reference_cache.py is reloaded after this many seconds
+# even without a change through models.py
+REFERENCE_CACHE_TTL = int(os.environ.get('REFERENCE_CACHE_TTL', 300))
+# App settings are read from memory; changes by other processes show up within this many seconds
+SETTINGS_REFRESH_INTERVAL = int(os.environ.get('SETTINGS_REFRESH_INTERVAL', 5))
+# Password hashing pool (see password_hasher.py): concurrent hashes, logins that
+# may wait for a free worker, max seconds to wait, Retry-After of the 503
+# answer when the pool is full. Keep workers + queue below waitress' threads.
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', 4))
+PASSWORD_HASH_TIMEOUT = int(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+PASSWORD_HASH_RETRY_AFTER = int(os.environ.get('PASSWORD_HASH_RETRY_AFTER', 3))
+# Threads hashing passwords for bulk imports (one core is left for requests)
+PASSWORD_HASH_BULK_WORKERS = int(os.environ.get('PASSWORD_HASH_BULK_WORKERS', max(1, (os.cpu_count() or 2) - 1)))
+# SQLCipher profile, applied to every connection (see models.key_connection).
+# Page size and KDF iterations must match how the database was encrypted;
+# change them only together with migrate_to_sqlcipher.py --rekey. With a raw
+# key (SQLCIPHER_KEY="x'<64 hex digits>'") no PBKDF2 runs on connection open
+# and SQLCIPHER_KDF_ITER is ignored.
+SQLCIPHER_PAGE_SIZE = int(os.environ.get('SQLCIPHER_PAGE_SIZE', 4096))
+SQLCIPHER_KDF_ITER = int(os.environ.get('SQLCIPHER_KDF_ITER', 256000))
+# ON wipes and locks every allocation; OFF (SQLCipher >= 4.5 default) is much faster
+SQLCIPHER_MEMORY_SECURITY = os.environ.get('SQLCIPHER_MEMORY_SECURITY', 'OFF').upper() == 'ON'
+# Page cache per connection and database (negative: KiB). Cached pages are
+# already decrypted, so pooled connections rarely decrypt the same page twice.
+SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -8000))
 # Store uploads outside static/ to require authentication for access
 UPLOAD_FOLDER = os.path.join(BASE_DIR, 'instance', 'uploads')
+# Internal nginx location serving UPLOAD_FOLDER (e.g. '/protected-uploads/', see
+# deploy/nginx.conf). If set, material downloads are authorized and logged by
+# Flask but sent by nginx (X-Accel-Redirect); empty: Flask streams the file.
+UPLOAD_ACCEL_REDIRECT_PREFIX = os.environ.get('UPLOAD_ACCEL_REDIRECT_PREFIX', '')
+# Analytics events that do not fit into the in-memory queue (or are still
+# queued at shutdown) are journaled here and written on the next chance
+ANALYTICS_SPILL_DIR = os.path.join(BASE_DIR, 'instance', 'analytics_spill')
 MAX_CONTENT_LENGTH = 64 * 1024 * 1024  # 64 MB max upload
 
 # Allowed file extensions for uploads
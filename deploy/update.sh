@@ -261,78 +261,41 @@ main() {
     # 6. Run database migrations if needed
     log_step "Step 6/8: Checking Database Migrations"
 
-    # Check if any migration files changed in this deployment
-    MIGRATION_FILES_CHANGED=false
-    if git diff --name-only "$CURRENT_COMMIT" "$NEW_COMMIT" | grep -q "^migrate_.*\.py$"; then
-        MIGRATION_FILES_CHANGED=true
-        log_info "Migration files detected in deployment"
-    fi
-
-    # Check if any migration files exist in the repo
-    MIGRATION_COUNT=$(find "$APP_DIR" -maxdepth 1 -name "migrate_*.py" -type f | wc -l)
-
-    if [ "$MIGRATION_FILES_CHANGED" = true ] && [ "$MIGRATION_COUNT" -gt 0 ]; then
-        log_info "Running database migrations..."
-        echo ""
-        MIGRATIONS_RUN=true
-
-        # Load SQLCIPHER_KEY if it exists in .env (for encrypted databases)
-        # Note: .env is owned by root, only root can read it
-        SQLCIPHER_KEY=""
-        if [ -f "$APP_DIR/.env" ] && grep -q "^SQLCIPHER_KEY=" "$APP_DIR/.env"; then
-            # Extract the key value (we're running as root, so we can read it)
-            SQLCIPHER_KEY=$(grep "^SQLCIPHER_KEY=" "$APP_DIR/.env" | cut -d '=' -f2- | tr -d '"' | tr -d "'")
-            log_info "SQLCIPHER_KEY loaded from $APP_DIR/.env"
-        else
-            log_warn "No SQLCIPHER_KEY found in $APP_DIR/.env - database assumed unencrypted"
-        fi
-
-        # Run all migration scripts (they're idempotent)
-        MIGRATION_ERRORS=0
-        for migration in "$APP_DIR"/migrate_*.py; do
-            if [ -f "$migration" ]; then
-                MIGRATION_NAME=$(basename "$migration")
-                log_info "Executing: $MIGRATION_NAME"
-
-                # Run migration as lernmanager user, passing SQLCIPHER_KEY through sudo
-                # Note: sudo -E preserves environment, but for security we explicitly pass only the key
-                if [ -n "$SQLCIPHER_KEY" ]; then
-                    if sudo -u "$APP_USER" SQLCIPHER_KEY="$SQLCIPHER_KEY" "$APP_DIR/venv/bin/python" "$migration"; then
-                        log_info "✓ $MIGRATION_NAME completed"
-                    else
-                        log_error "✗ $MIGRATION_NAME failed"
-                        MIGRATION_ERRORS=$((MIGRATION_ERRORS + 1))
-                    fi
-                else
-                    # No encryption key, run without it
-                    if sudo -u "$APP_USER" "$APP_DIR/venv/bin/python" "$migration"; then
-                        log_info "✓ $MIGRATION_NAME completed"
-                    else
-                        log_error "✗ $MIGRATION_NAME failed"
-                        MIGRATION_ERRORS=$((MIGRATION_ERRORS + 1))
-                    fi
-                fi
-                echo ""
+    # Pending schema migrations (models.MIGRATIONS) are applied by migrate.py,
+    # which backs up the database first; on an up-to-date schema it only
+    # reads the version. The app would apply them on start as well.
+    MIGRATIONS_RUN=true
+
+    # Load SQLCIPHER_KEY and the cipher profile if they exist in .env (for encrypted databases)
+    # Note: .env is owned by root, only root can read it
+    MIGRATION_ENV=()
+    if [ -f "$APP_DIR/.env" ]; then
+        for VAR in SQLCIPHER_KEY SQLCIPHER_PAGE_SIZE SQLCIPHER_KDF_ITER; do
+            # Strip surrounding quotes only: a raw key looks like x'...'
+            VALUE=$(grep "^$VAR=" "$APP_DIR/.env" | cut -d '=' -f2- | sed -e 's/^"\(.*\)"$/\1/' -e "s/^'\(.*\)'$/\1/" || true)
+            if [ -n "$VALUE" ]; then
+                MIGRATION_ENV+=("$VAR=$VALUE")
             fi
         done
+    fi
+    if [ ${#MIGRATION_ENV[@]} -gt 0 ]; then
+        log_info "SQLCIPHER_KEY loaded from $APP_DIR/.env"
+    else
+        log_warn "No SQLCIPHER_KEY found in $APP_DIR/.env - database assumed unencrypted"
+    fi
 
-        # Clear SQLCIPHER_KEY for security
-        SQLCIPHER_KEY=""
-
-        if [ $MIGRATION_ERRORS -gt 0 ]; then
-            log_error "$MIGRATION_ERRORS migration(s) failed"
-            log_error "Check the output above for details"
-            log_error "You may need to run migrations manually"
-            # Don't exit - let deployment continue, but warn
-        else
-            log_info "All migrations completed successfully"
-        fi
-    elif [ "$MIGRATION_COUNT" -eq 0 ]; then
-        log_info "No migration files found"
+    # Run as lernmanager user, passing only the SQLCipher settings through sudo
+    if sudo -u "$APP_USER" "${MIGRATION_ENV[@]}" "$APP_DIR/venv/bin/python" "$APP_DIR/migrate.py"; then
+        log_info "Database schema is up to date"
     else
-        log_info "No new migrations in this deployment"
+        log_error "Schema migration failed (the failed step was rolled back)"
+        log_error "Check the output above; the service will retry on start"
+        # Don't exit - let deployment continue, but warn
     fi
 
+    # Clear the key for security
+    MIGRATION_ENV=()
+
     # 7. Restart service
     log_step "Step 7/8: Restarting Service"
     log_info "Restarting lernmanager service..."
@@ -318,6 +318,7 @@ Examples:
 
     # Initialize database if needed
     models.init_db()
+    models.render_stored_markdown()
 
     if args.list:
         list_tasks()
@@ -0,0 +1,105 @@
+"""
+Cached Markdown rendering for task content.
+
+Task descriptions, learning goals and subtasks are rendered on every student
+page but almost never change. render() keeps the HTML of recently rendered
+texts in an LRU cache keyed by a hash of the source, and converts cache
+misses with one configured Markdown instance per thread instead of building
+a new one per call.
+
+Usage:
+    import markdown_render
+
+    html = markdown_render.render(task['beschreibung'])
+
+Task and subtask content is additionally rendered once at save time into
+*_html columns (see models.create_task); the cache serves everything else.
+"""
+
+import threading
+from collections import OrderedDict
+from hashlib import sha256
+
+import markdown as md
+
+import config
+
+EXTENSIONS = ['nl2br', 'fenced_code', 'tables', 'sane_lists']
+TAB_LENGTH = 3
+# Stored *_html columns are re-rendered at startup when this changes
+# (models.render_stored_markdown), so bump it with EXTENSIONS or TAB_LENGTH
+RENDER_VERSION = 1
+
+_local = threading.local()
+_lock = threading.Lock()
+_cache = OrderedDict()  # sha256 of source -> HTML
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _converter():
+    """Get this thread's Markdown instance (Markdown objects are not thread-safe)."""
+    converter = getattr(_local, 'converter', None)
+    if converter is None:
+        converter = md.Markdown(extensions=EXTENSIONS, tab_length=TAB_LENGTH)
+        _local.converter = converter
+    return converter
+
+
+def convert(text):
+    """Convert Markdown to HTML without using the cache."""
+    converter = _converter()
+    try:
+        return converter.convert(text)
+    finally:
+        converter.reset()
+
+
+def render(text):
+    """Convert Markdown to HTML, using the cache.
+
+    Args:
+        text: Markdown source (None or '' renders as '')
+
+    Returns:
+        HTML string
+    """
+    if not text:
+        return ''
+
+    key = sha256(text.encode('utf-8')).digest()
+    with _lock:
+        html = _cache.get(key)
+        if html is not None:
+            _cache.move_to_end(key)
+            _stats['hits'] += 1
+            return html
+        _stats['misses'] += 1
+
+    html = convert(text)
+
+    with _lock:
+        _cache[key] = html
+        while len(_cache) > config.MARKDOWN_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return html
+
+
+def clear():
+    """Drop all cached HTML."""
+    with _lock:
+        _cache.clear()
+
+
+def get_cache_stats():
+    """Get cache statistics for monitoring.
+
+    Returns:
+        Dict with size, max_size, hits and misses
+    """
+    with _lock:
+        return {
+            'size': len(_cache),
+            'max_size': config.MARKDOWN_CACHE_SIZE,
+            'hits': _stats['hits'],
+            'misses': _stats['misses'],
+        }
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Apply pending database schema migrations (see MIGRATIONS in models.py).
+
+The app runs pending migrations on startup as well. Running this during
+deployment (deploy/update.sh does) backs up both databases first and shows
+errors before the service restarts.
+
+Usage:
+    python migrate.py            # Apply pending migrations
+    python migrate.py --status   # Only show the schema versions
+
+    # For SQLCipher encrypted database:
+    SQLCIPHER_KEY=your_key python migrate.py
+
+Replaces the former standalone migrate_*.py scripts; their changes are the
+first steps of models.MIGRATIONS and are skipped where already applied.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+from datetime import datetime
+
+import config
+import models
+
+
+def backup_databases():
+    """Copy both databases (after folding their WALs into them) next to the originals.
+
+    The analytics database is included because migrations also move rows
+    between the two files (migration 14).
+
+    Returns:
+        List of backup paths
+    """
+    with models.db_session() as conn:
+        conn.execute("PRAGMA main.wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA analytics.wal_checkpoint(TRUNCATE)")
+    suffix = f".backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    backup_paths = []
+    for path in (config.DATABASE, config.ANALYTICS_DATABASE):
+        if os.path.exists(path):
+            shutil.copy2(path, path + suffix)
+            backup_paths.append(path + suffix)
+    return backup_paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply pending Lernmanager schema migrations')
+    parser.add_argument('--status', action='store_true',
+                        help='Only show the schema versions')
+    args = parser.parse_args()
+
+    existed = os.path.exists(config.DATABASE)
+    main_version, analytics_version = models.get_schema_versions()
+    print(f"Main database:      {config.DATABASE} (version {main_version} of {models.SCHEMA_VERSION})")
+    print(f"Analytics database: {config.ANALYTICS_DATABASE} "
+          f"(version {analytics_version} of {models.ANALYTICS_SCHEMA_VERSION})")
+
+    pending = [f"{version}: {description}" for version, description, _ in models.MIGRATIONS
+               if version > main_version]
+    if args.status:
+        for migration in pending:
+            print(f"  pending {migration}")
+        return 0
+
+    if main_version == models.SCHEMA_VERSION and analytics_version == models.ANALYTICS_SCHEMA_VERSION:
+        print("Schema is up to date.")
+        return 0
+
+    if existed:
+        for backup_path in backup_databases():
+            print(f"Backup: {backup_path}")
+
+    try:
+        applied = models.init_db()
+    except Exception as e:
+        print(f"ERROR: Migration failed, the failed step was rolled back: {e}", file=sys.stderr)
+        return 1
+
+    for migration in applied:
+        print(f"  applied {migration}")
+    models.render_stored_markdown()
+    print("Schema is up to date.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
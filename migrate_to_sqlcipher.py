@@ -1,21 +1,37 @@
 #!/usr/bin/env python3
 """
-Migrate an existing unencrypted SQLite database to SQLCipher encrypted format.
+Migrate an existing unencrypted SQLite database to SQLCipher encrypted format,
+or re-key an encrypted database to a new key and cipher profile.
 
 Usage:
     SQLCIPHER_KEY=your_secret_key python migrate_to_sqlcipher.py
 
+    # Re-key (stop the app first): old key in SQLCIPHER_KEY, new key in
+    # SQLCIPHER_NEW_KEY (a raw key is generated if unset). The target profile
+    # is read from SQLCIPHER_PAGE_SIZE / SQLCIPHER_KDF_ITER (see config.py).
+    SQLCIPHER_KEY=old_key python migrate_to_sqlcipher.py --rekey
+    SQLCIPHER_KEY=old_key SQLCIPHER_PAGE_SIZE=8192 python migrate_to_sqlcipher.py --rekey --from-page-size 4096
+
 This will:
 1. Read from data/mbi_tracker.db (unencrypted)
 2. Create data/mbi_tracker_encrypted.db (encrypted)
 3. Copy all data
 4. Optionally replace the original (with backup)
 
+With --rekey, the main and the analytics database are each exported into a
+new file with the new key and profile (sqlcipher_export), the copy is
+verified (integrity check and row counts), the original is kept as
+*_before_rekey.db and the copy takes its place.
+
 Generate a secure key with:
     python3 -c "import secrets; print(secrets.token_hex(32))"
-"""
 
+Generate a raw key (no key derivation on connection open):
+    python3 -c "import secrets; print(\"x'\" + secrets.token_hex(32) + \"'\")"
+"""
+import argparse
 import os
+import secrets
 import sys
 import shutil
 
@@ -36,6 +52,7 @@ except ImportError:
 
 import sqlite3
 import config
+import models
 
 SOURCE_DB = config.DATABASE
 ENCRYPTED_DB = SOURCE_DB.replace('.db', '_encrypted.db')
@@ -77,8 +94,8 @@ def migrate():
 
     # Create encrypted database
     dest_conn = sqlcipher.connect(ENCRYPTED_DB)
-    safe_key = SQLCIPHER_KEY.replace('"', '""')
-    dest_conn.execute(f'PRAGMA key = "{safe_key}"')
+    # Key and cipher profile (page size, KDF iterations) from config
+    models.key_connection(dest_conn, SQLCIPHER_KEY)
 
     # Get schema and data from source
     cursor = source_conn.cursor()
@@ -158,5 +175,120 @@ def migrate():
         print("\nManual steps required. See instructions above.")
 
 
+def _table_counts(conn):
+    """Row count of every table, for verifying a re-keyed copy."""
+    names = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()]
+    return {name: conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0] for name in names}
+
+
+def rekey_database(path, new_key, from_page_size, from_kdf_iter):
+    """Export one encrypted database into a new file with the new key and profile.
+
+    Args:
+        path: Database file
+        new_key: New passphrase or raw key
+        from_page_size, from_kdf_iter: Profile the database is encrypted with now
+
+    Returns:
+        Path of the verified re-keyed copy
+    """
+    rekeyed_path = path + '.rekey'
+    if os.path.exists(rekeyed_path):
+        os.remove(rekeyed_path)
+
+    conn = sqlcipher.connect(path)
+    models.key_connection(conn, SQLCIPHER_KEY, page_size=from_page_size, kdf_iter=from_kdf_iter)
+    try:
+        counts = _table_counts(conn)
+    except sqlcipher.DatabaseError as e:
+        print(f"ERROR: Cannot open {path} with SQLCIPHER_KEY and the --from-* profile: {e}")
+        sys.exit(1)
+
+    # Fold the WAL into the file so the export sees every committed row
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    user_version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+    conn.execute("ATTACH DATABASE ? AS rekeyed KEY ?", (rekeyed_path, new_key))
+    conn.execute(f"PRAGMA rekeyed.cipher_page_size = {config.SQLCIPHER_PAGE_SIZE}")
+    if not models.is_raw_key(new_key):
+        conn.execute(f"PRAGMA rekeyed.kdf_iter = {config.SQLCIPHER_KDF_ITER}")
+    conn.execute("SELECT sqlcipher_export('rekeyed')")
+    conn.execute(f"PRAGMA rekeyed.user_version = {int(user_version)}")
+    conn.execute("DETACH DATABASE rekeyed")
+    conn.close()
+
+    # Verify the copy with exactly the settings the app will use
+    check = sqlcipher.connect(rekeyed_path)
+    models.key_connection(check, new_key)
+    integrity = check.execute("PRAGMA integrity_check").fetchone()[0]
+    rekeyed_counts = _table_counts(check)
+    check.close()
+    if integrity != 'ok' or rekeyed_counts != counts:
+        print(f"ERROR: Verification of {rekeyed_path} failed (integrity: {integrity}).")
+        print(f"The original {path} is unchanged.")
+        sys.exit(1)
+
+    print(f"  {path}: {sum(counts.values())} rows in {len(counts)} tables re-keyed and verified")
+    return rekeyed_path
+
+
+def rekey(from_page_size, from_kdf_iter):
+    """Re-key the main and the analytics database to SQLCIPHER_NEW_KEY and the configured profile."""
+    new_key = os.environ.get('SQLCIPHER_NEW_KEY')
+    if not new_key:
+        new_key = "x'" + secrets.token_hex(32) + "'"
+        print("SQLCIPHER_NEW_KEY not set, generated a new raw key.")
+
+    paths = [path for path in (config.DATABASE, config.ANALYTICS_DATABASE) if os.path.exists(path)]
+    if not paths:
+        print(f"ERROR: Database not found: {config.DATABASE}")
+        sys.exit(1)
+
+    print("Re-keying to profile:")
+    print(f"  Key:        {'raw (no key derivation)' if models.is_raw_key(new_key) else 'passphrase'}")
+    print(f"  Page size:  {config.SQLCIPHER_PAGE_SIZE}")
+    if not models.is_raw_key(new_key):
+        print(f"  KDF iter:   {config.SQLCIPHER_KDF_ITER}")
+
+    response = input("\nIs the app stopped (systemctl stop lernmanager)? (y/N): ").strip().lower()
+    if response != 'y':
+        print("Aborted.")
+        sys.exit(0)
+
+    # Both files must be re-keyed together: analytics is attached with the main key
+    rekeyed = [(path, rekey_database(path, new_key, from_page_size, from_kdf_iter)) for path in paths]
+
+    for path, rekeyed_path in rekeyed:
+        backup_path = path.replace('.db', '_before_rekey.db')
+        shutil.move(path, backup_path)
+        # WAL/SHM files belong to the old encryption (empty after the checkpoint)
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        shutil.move(rekeyed_path, path)
+        print(f"  {path} replaced (old file: {backup_path})")
+
+    print("\nRe-key complete! Update your environment/systemd service before starting the app:")
+    print(f"  SQLCIPHER_KEY=\"{new_key}\"")
+    print(f"  SQLCIPHER_PAGE_SIZE={config.SQLCIPHER_PAGE_SIZE}")
+    if not models.is_raw_key(new_key):
+        print(f"  SQLCIPHER_KDF_ITER={config.SQLCIPHER_KDF_ITER}")
+    print("Delete the *_before_rekey.db files once the app runs with the new key.")
+
+
 if __name__ == '__main__':
-    migrate()
+    parser = argparse.ArgumentParser(description='Encrypt or re-key the Lernmanager databases')
+    parser.add_argument('--rekey', action='store_true',
+                        help='Re-key an encrypted database to SQLCIPHER_NEW_KEY and the configured profile')
+    parser.add_argument('--from-page-size', type=int, default=4096,
+                        help='Current cipher_page_size of the database (default: 4096)')
+    parser.add_argument('--from-kdf-iter', type=int, default=256000,
+                        help='Current kdf_iter of the database (default: 256000)')
+    args = parser.parse_args()
+
+    if args.rekey:
+        rekey(args.from_page_size, args.from_kdf_iter)
+    else:
+        migrate()
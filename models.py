@@ -1,11 +1,20 @@
+import base64
 import json
 import os
+import re
 import sys
+import threading
+import time
 from hashlib import sha256
 from contextlib import contextmanager
 from datetime import datetime, timedelta
+from flask import g, has_request_context
 from werkzeug.security import generate_password_hash, check_password_hash
 import config
+import quiz_cache
+import markdown_render
+import reference_cache
+import password_hasher
 
 # SQLCipher support: Use encrypted database if SQLCIPHER_KEY is set
 SQLCIPHER_KEY = os.environ.get('SQLCIPHER_KEY')
@@ -50,14 +59,52 @@ def verify_password(stored_hash, password):
     return False, False
 
 
+# Raw 256-bit key (optionally followed by the 128-bit salt), as SQLCipher expects it
+_RAW_KEY_PATTERN = re.compile(r"^x'([0-9A-Fa-f]{64}|[0-9A-Fa-f]{96})'$")
+
+
+def is_raw_key(key):
+    """Check whether a SQLCipher key is a raw hex key (x'...') rather than a passphrase."""
+    return bool(key and _RAW_KEY_PATTERN.match(key))
+
+
+def key_connection(conn, key=None, page_size=None, kdf_iter=None, memory_security=None):
+    """Key a SQLCipher connection and apply the cipher profile.
+
+    Must run before the first statement that reads the database. A
+    passphrase runs PBKDF2 with kdf_iter iterations on every connection
+    open; a raw key skips that derivation.
+
+    Args:
+        conn: New SQLCipher connection
+        key: Passphrase or raw key (default: SQLCIPHER_KEY)
+        page_size, kdf_iter, memory_security: Profile overrides (default: config)
+    """
+    key = key or SQLCIPHER_KEY
+    # Escape any double quotes in the key
+    safe_key = key.replace('"', '""')
+    conn.execute(f'PRAGMA key = "{safe_key}"')
+    conn.execute(f"PRAGMA cipher_page_size = {int(page_size or config.SQLCIPHER_PAGE_SIZE)}")
+    if not is_raw_key(key):
+        conn.execute(f"PRAGMA kdf_iter = {int(kdf_iter or config.SQLCIPHER_KDF_ITER)}")
+    if memory_security is None:
+        memory_security = config.SQLCIPHER_MEMORY_SECURITY
+    conn.execute(f"PRAGMA cipher_memory_security = {'ON' if memory_security else 'OFF'}")
+
+
 def get_db():
-    """Get database connection with optimized performance settings."""
+    """Open a new database connection with optimized performance settings.
+
+    The analytics database is attached as schema "analytics"; its tables
+    (analytics_events, rollups, error_log) are addressed unqualified.
+
+    Model code should use db_session(), which reuses the calling thread's
+    pooled connection instead of paying the key/PRAGMA setup every time.
+    """
     conn = sqlite3.connect(config.DATABASE)
     conn.row_factory = sqlite3.Row
     if USE_SQLCIPHER and SQLCIPHER_KEY:
-        # Set encryption key - escape any double quotes in key
-        safe_key = SQLCIPHER_KEY.replace('"', '""')
-        conn.execute(f'PRAGMA key = "{safe_key}"')
+        key_connection(conn)
 
     # Performance optimizations for analytics logging
     # WAL mode: Write-Ahead Logging improves write concurrency and reduces fsync calls
@@ -66,13 +113,167 @@ def get_db():
     conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA synchronous=NORMAL")
 
+    conn.execute(f"PRAGMA cache_size = {int(config.SQLITE_CACHE_SIZE)}")
+
+    if USE_SQLCIPHER and SQLCIPHER_KEY:
+        # The analytics database has its own salt, so it needs the key passed
+        # explicitly; ATTACH reads it right away with the default profile
+        conn.execute(f"PRAGMA cipher_default_page_size = {int(config.SQLCIPHER_PAGE_SIZE)}")
+        conn.execute(f"PRAGMA cipher_default_kdf_iter = {int(config.SQLCIPHER_KDF_ITER)}")
+        conn.execute("ATTACH DATABASE ? AS analytics KEY ?", (config.ANALYTICS_DATABASE, SQLCIPHER_KEY))
+    else:
+        conn.execute("ATTACH DATABASE ? AS analytics", (config.ANALYTICS_DATABASE,))
+    conn.execute("PRAGMA analytics.journal_mode=WAL")
+    conn.execute("PRAGMA analytics.synchronous=NORMAL")
+    conn.execute(f"PRAGMA analytics.cache_size = {int(config.SQLITE_CACHE_SIZE)}")
+
     conn.execute("PRAGMA foreign_keys = ON")
     return conn
 
 
+def get_analytics_db():
+    """Open a connection directly to the analytics database.
+
+    Used by the analytics worker, which only ever touches analytics tables.
+    """
+    conn = sqlite3.connect(config.ANALYTICS_DATABASE, timeout=20)
+    if USE_SQLCIPHER and SQLCIPHER_KEY:
+        key_connection(conn)
+
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size = {int(config.SQLITE_CACHE_SIZE)}")
+    return conn
+
+
+# Per-thread connection pool: every waitress worker thread keeps one open,
+# already keyed and configured connection. With SQLCipher this avoids running
+# the key derivation for every query (see aes_ni_investigation.md).
+_pool = threading.local()
+
+
+def _connection_is_healthy(conn):
+    """Cheap liveness check for a pooled connection."""
+    try:
+        conn.execute("SELECT 1").fetchone()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def close_db_connection():
+    """Close the calling thread's pooled connection (if any)."""
+    conn = getattr(_pool, 'conn', None)
+    _pool.conn = None
+    if conn is not None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+def _acquire_connection():
+    """Return the calling thread's pooled connection, reconnecting if needed.
+
+    The connection is replaced when it is older than DB_CONNECTION_MAX_AGE,
+    fails the health check, or a database path in config was pointed elsewhere.
+    """
+    conn = getattr(_pool, 'conn', None)
+    if conn is not None:
+        expired = time.monotonic() - _pool.created_at > config.DB_CONNECTION_MAX_AGE
+        moved = _pool.database != (config.DATABASE, config.ANALYTICS_DATABASE)
+        if expired or moved or not _connection_is_healthy(conn):
+            close_db_connection()
+            conn = None
+
+    if conn is None:
+        conn = get_db()
+        _pool.conn = conn
+        _pool.created_at = time.monotonic()
+        _pool.database = (config.DATABASE, config.ANALYTICS_DATABASE)
+    return conn
+
+
+def _request_scope():
+    """Return the unit-of-work state of the current Flask request, if any."""
+    if not has_request_context():
+        return None
+    return g.get('db_scope')
+
+
+def begin_request_scope(read_only=False):
+    """Make the current Flask request a single unit of work.
+
+    Nothing is opened here: the first db_session() inside the request checks
+    out the pooled connection and every later session reuses it without
+    committing. end_request_scope() commits or rolls back at teardown.
+
+    Args:
+        read_only: Start an explicit transaction on first use so all reads
+                   of the request see one consistent snapshot (GET requests).
+
+    Raises:
+        RuntimeError: If the request's transaction is already open; replacing
+                      it would leave it uncommitted on the pooled connection
+    """
+    scope = g.get('db_scope')
+    if scope is not None and scope['open']:
+        raise RuntimeError("Request transaction is already open")
+    g.db_scope = {'read_only': read_only, 'open': False}
+
+
+def _open_request_scope(scope):
+    """Check out the pooled connection for the request transaction."""
+    conn = _acquire_connection()
+    if scope['read_only']:
+        conn.execute("BEGIN")
+    scope['open'] = True
+    _pool.depth = 1
+    return conn
+
+
+def rollback_request_scope():
+    """Discard everything the current request wrote so far.
+
+    Later db_session() calls in the same request start a fresh transaction.
+    """
+    scope = _request_scope()
+    if not scope or not scope['open']:
+        return
+    scope['open'] = False
+    _pool.depth = 0
+    try:
+        _pool.conn.rollback()
+    except sqlite3.Error:
+        close_db_connection()
+    reference_cache.transaction_finished()
+
+
+def end_request_scope(error=None):
+    """Commit (or roll back on error) the current request's transaction."""
+    scope = _request_scope()
+    if not scope or not scope['open']:
+        return
+    if error is not None:
+        rollback_request_scope()
+        return
+    scope['open'] = False
+    _pool.depth = 0
+    try:
+        _pool.conn.commit()
+    except sqlite3.Error:
+        try:
+            _pool.conn.rollback()
+        except sqlite3.Error:
+            close_db_connection()
+        raise
+    finally:
+        reference_cache.transaction_finished()
+
+
 @contextmanager
-def db_session():
-    """Context manager for database operations."""
+def _standalone_session():
+    """Session on a private connection that commits independently."""
     conn = get_db()
     try:
         yield conn
@@ -84,377 +285,819 @@ def db_session():
         conn.close()
 
 
+@contextmanager
+def db_session(request_scoped=True):
+    """Context manager for database operations.
+
+    Uses the calling thread's pooled connection. Nested sessions (model
+    functions calling other model functions) share the outer transaction;
+    only the outermost session commits or rolls back. Inside a Flask request
+    that called begin_request_scope(), the request itself is the outermost
+    session; a failing session directly inside it only rolls back its own
+    writes (savepoint), so a route that handles the error keeps the others.
+
+    Args:
+        request_scoped: Set to False for writes that must be committed on
+                        their own even if the surrounding request fails
+                        (e.g. error logging).
+    """
+    depth = getattr(_pool, 'depth', 0)
+    if not request_scoped and depth > 0:
+        # The pooled connection belongs to the surrounding transaction
+        with _standalone_session() as conn:
+            yield conn
+        return
+
+    if depth == 0 and request_scoped:
+        scope = _request_scope()
+        if scope is not None and not scope['open']:
+            _open_request_scope(scope)
+            depth = 1
+
+    conn = _acquire_connection() if depth == 0 else _pool.conn
+
+    # A session directly inside the request transaction gets a savepoint, so
+    # its failure only undoes its own writes, not the earlier ones of the
+    # request. Without an open transaction there is nothing earlier to keep.
+    savepoint = (depth == 1 and _request_scope() is not None and _request_scope()['open']
+                 and conn.in_transaction)
+    if savepoint:
+        conn.execute("SAVEPOINT request_session")
+
+    _pool.depth = depth + 1
+    try:
+        yield conn
+        if depth == 0:
+            conn.commit()
+        elif savepoint:
+            conn.execute("RELEASE request_session")
+    except Exception:
+        _pool.depth = depth
+        if depth == 0:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                # Connection is unusable - drop it so the next session reconnects
+                close_db_connection()
+        elif depth == 1 and _request_scope() and _request_scope()['open']:
+            if savepoint:
+                try:
+                    conn.execute("ROLLBACK TO request_session")
+                    conn.execute("RELEASE request_session")
+                except sqlite3.Error:
+                    rollback_request_scope()
+            else:
+                rollback_request_scope()
+        raise
+    finally:
+        if _pool.depth > depth:
+            _pool.depth = depth
+        if depth == 0:
+            reference_cache.transaction_finished()
+
+
+# Tables stored in the analytics database (config.ANALYTICS_DATABASE)
+ANALYTICS_SCHEMA = '''
+    -- ============ Error Logging ============
+
+    -- Error log for tracking application errors
+    CREATE TABLE IF NOT EXISTS error_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        level TEXT NOT NULL,  -- ERROR, WARNING, CRITICAL
+        message TEXT NOT NULL,
+        traceback TEXT,
+        user_id INTEGER,
+        user_type TEXT,  -- 'admin' or 'student'
+        route TEXT,
+        method TEXT,
+        url TEXT
+    );
+
+    -- Index for efficient log retrieval and cleanup
+    CREATE INDEX IF NOT EXISTS idx_error_log_timestamp
+    ON error_log(timestamp DESC);
+
+    -- ============ Analytics & Activity Logging ============
+
+    -- Analytics events for both usage statistics and student activity logs
+    CREATE TABLE IF NOT EXISTS analytics_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        event_type TEXT NOT NULL,  -- 'login', 'page_view', 'file_download', 'task_start', 'subtask_complete', 'task_complete', 'quiz_attempt', 'self_eval'
+        user_id INTEGER,
+        user_type TEXT,  -- 'admin' or 'student'
+        metadata TEXT    -- JSON format for flexible event data
+    );
+
+    -- Indexes for efficient querying
+    CREATE INDEX IF NOT EXISTS idx_analytics_timestamp
+    ON analytics_events(timestamp DESC);
+
+    CREATE INDEX IF NOT EXISTS idx_analytics_user
+    ON analytics_events(user_id, user_type, timestamp DESC);
+
+    CREATE INDEX IF NOT EXISTS idx_analytics_type
+    ON analytics_events(event_type, timestamp DESC);
+
+    -- Per-day rollups, maintained by the analytics worker as it writes
+    -- batches (rebuild with backfill_analytics_rollups.py)
+    CREATE TABLE IF NOT EXISTS analytics_daily (
+        day TEXT NOT NULL,              -- YYYY-MM-DD (UTC, like timestamp)
+        event_type TEXT NOT NULL,
+        user_type TEXT NOT NULL DEFAULT '',
+        route TEXT NOT NULL DEFAULT '', -- page_view route, '' otherwise
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, event_type, user_type, route)
+    );
+
+    CREATE TABLE IF NOT EXISTS analytics_user_daily (
+        day TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        user_type TEXT NOT NULL DEFAULT '',
+        event_type TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, user_id, user_type, event_type)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_analytics_user_daily_user
+    ON analytics_user_daily(user_id, user_type, day);
+'''
+
+
+# Schema of a new main database, created by migration 1. It already has the
+# columns later MIGRATIONS steps add, so those find nothing to do on a new
+# database; a schema change needs a new step (and goes here for new ones).
+# Analytics and error log tables are not part of it: they live in their own
+# file (ANALYTICS_SCHEMA), and migration 14 moves them out of databases from
+# before that split.
+BASE_SCHEMA = '''
+    -- Admin user
+    CREATE TABLE IF NOT EXISTS admin (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL
+    );
+
+    -- Classes (Klassen)
+    CREATE TABLE IF NOT EXISTS klasse (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL
+    );
+
+    -- Students (Schüler)
+    CREATE TABLE IF NOT EXISTS student (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nachname TEXT NOT NULL,
+        vorname TEXT NOT NULL,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL
+    );
+
+    -- Student-Class relationship (many-to-many)
+    CREATE TABLE IF NOT EXISTS student_klasse (
+        student_id INTEGER NOT NULL,
+        klasse_id INTEGER NOT NULL,
+        PRIMARY KEY (student_id, klasse_id),
+        FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE,
+        FOREIGN KEY (klasse_id) REFERENCES klasse(id) ON DELETE CASCADE
+    );
+
+    -- Class schedule (day of week each class meets)
+    CREATE TABLE IF NOT EXISTS class_schedule (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        klasse_id INTEGER NOT NULL UNIQUE,
+        weekday INTEGER NOT NULL,  -- 0=Monday, 1=Tuesday, ..., 6=Sunday (ISO 8601)
+        FOREIGN KEY (klasse_id) REFERENCES klasse(id) ON DELETE CASCADE
+    );
+
+    -- Tasks (Aufgaben)
+    CREATE TABLE IF NOT EXISTS task (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        number INTEGER DEFAULT 0,
+        beschreibung TEXT,
+        lernziel TEXT,
+        fach TEXT NOT NULL,
+        stufe TEXT NOT NULL,
+        kategorie TEXT NOT NULL DEFAULT 'pflicht',  -- pflicht/bonus
+        quiz_json TEXT,  -- JSON format for quiz questions
+        -- Markdown fields rendered at save time (see markdown_render.py)
+        beschreibung_html TEXT,
+        lernziel_html TEXT
+    );
+
+    -- Task prerequisites (many-to-many)
+    CREATE TABLE IF NOT EXISTS task_voraussetzung (
+        task_id INTEGER NOT NULL,
+        voraussetzung_task_id INTEGER NOT NULL,
+        PRIMARY KEY (task_id, voraussetzung_task_id),
+        FOREIGN KEY (task_id) REFERENCES task(id) ON DELETE CASCADE,
+        FOREIGN KEY (voraussetzung_task_id) REFERENCES task(id) ON DELETE CASCADE
+    );
+
+    -- Follow-up tasks (Folgeaufgaben)
+    CREATE TABLE IF NOT EXISTS task_folge (
+        task_id INTEGER NOT NULL,
+        folge_task_id INTEGER NOT NULL,
+        PRIMARY KEY (task_id, folge_task_id),
+        FOREIGN KEY (task_id) REFERENCES task(id) ON DELETE CASCADE,
+        FOREIGN KEY (folge_task_id) REFERENCES task(id) ON DELETE CASCADE
+    );
+
+    -- Elective task groups (Wahlpflicht)
+    -- Students must complete ONE task from the group
+    CREATE TABLE IF NOT EXISTS wahlpflicht_gruppe (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        beschreibung TEXT,
+        fach TEXT NOT NULL,
+        stufe TEXT NOT NULL
+    );
+
+    -- Tasks belonging to an elective group
+    CREATE TABLE IF NOT EXISTS wahlpflicht_task (
+        gruppe_id INTEGER NOT NULL,
+        task_id INTEGER NOT NULL,
+        PRIMARY KEY (gruppe_id, task_id),
+        FOREIGN KEY (gruppe_id) REFERENCES wahlpflicht_gruppe(id) ON DELETE CASCADE,
+        FOREIGN KEY (task_id) REFERENCES task(id) ON DELETE CASCADE
+    );
+
+    -- Sub-tasks (Teilaufgaben)
+    CREATE TABLE IF NOT EXISTS subtask (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER NOT NULL,
+        beschreibung TEXT NOT NULL,
+        reihenfolge INTEGER NOT NULL DEFAULT 0,
+        beschreibung_html TEXT,  -- Rendered at save time (see markdown_render.py)
+        FOREIGN KEY (task_id) REFERENCES task(id) ON DELETE CASCADE
+    );
+
+    -- Materials (Materialien)
+    CREATE TABLE IF NOT EXISTS material (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER NOT NULL,
+        typ TEXT NOT NULL,  -- 'link' or 'datei'
+        pfad TEXT NOT NULL,  -- URL or file path
+        beschreibung TEXT,
+        FOREIGN KEY (task_id) REFERENCES task(id) ON DELETE CASCADE
+    );
+
+    -- Student task assignment (per class)
+    CREATE TABLE IF NOT EXISTS student_task (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER NOT NULL,
+        klasse_id INTEGER NOT NULL,
+        task_id INTEGER NOT NULL,
+        abgeschlossen INTEGER NOT NULL DEFAULT 0,
+        manuell_abgeschlossen INTEGER NOT NULL DEFAULT 0,
+        current_subtask_id INTEGER,
+        -- Completion counters, see refresh_task_completion_counters()
+        visible_subtasks INTEGER NOT NULL DEFAULT 0,
+        completed_subtasks INTEGER NOT NULL DEFAULT 0,
+        quiz_passed INTEGER NOT NULL DEFAULT 0,
+        UNIQUE(student_id, klasse_id),
+        FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE,
+        FOREIGN KEY (klasse_id) REFERENCES klasse(id) ON DELETE CASCADE,
+        FOREIGN KEY (task_id) REFERENCES task(id) ON DELETE CASCADE,
+        FOREIGN KEY (current_subtask_id) REFERENCES subtask(id) ON DELETE SET NULL
+    );
+
+    -- Student sub-task completion
+    CREATE TABLE IF NOT EXISTS student_subtask (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_task_id INTEGER NOT NULL,
+        subtask_id INTEGER NOT NULL,
+        erledigt INTEGER NOT NULL DEFAULT 0,
+        UNIQUE(student_task_id, subtask_id),
+        FOREIGN KEY (student_task_id) REFERENCES student_task(id) ON DELETE CASCADE,
+        FOREIGN KEY (subtask_id) REFERENCES subtask(id) ON DELETE CASCADE
+    );
+
+    -- Quiz attempts
+    CREATE TABLE IF NOT EXISTS quiz_attempt (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_task_id INTEGER NOT NULL,
+        punkte INTEGER NOT NULL,
+        max_punkte INTEGER NOT NULL,
+        bestanden INTEGER NOT NULL,
+        antworten_json TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (student_task_id) REFERENCES student_task(id) ON DELETE CASCADE
+    );
+
+    -- Lessons (Unterricht)
+    CREATE TABLE IF NOT EXISTS unterricht (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        klasse_id INTEGER NOT NULL,
+        datum DATE NOT NULL,
+        kommentar TEXT,
+        UNIQUE(klasse_id, datum),
+        FOREIGN KEY (klasse_id) REFERENCES klasse(id) ON DELETE CASCADE
+    );
+
+    -- Lesson attendance and evaluation
+    CREATE TABLE IF NOT EXISTS unterricht_student (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        unterricht_id INTEGER NOT NULL,
+        student_id INTEGER NOT NULL,
+        anwesend INTEGER NOT NULL DEFAULT 1,
+        -- Admin evaluation (ratings: '-', 'ok', '+')
+        admin_selbststaendigkeit TEXT DEFAULT 'ok',
+        admin_respekt TEXT DEFAULT 'ok',
+        admin_fortschritt TEXT DEFAULT 'ok',
+        admin_kommentar TEXT,
+        has_been_saved INTEGER DEFAULT 0,
+        -- Student self-evaluation
+        selbst_selbststaendigkeit INTEGER,
+        selbst_respekt INTEGER,
+        UNIQUE(unterricht_id, student_id),
+        FOREIGN KEY (unterricht_id) REFERENCES unterricht(id) ON DELETE CASCADE,
+        FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE
+    );
+
+    -- ============ Game Mode Tables ============
+
+    -- Game character state for each student
+    CREATE TABLE IF NOT EXISTS game_character (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER UNIQUE NOT NULL,
+        fach TEXT NOT NULL,
+        hp INTEGER NOT NULL DEFAULT 100,
+        max_hp INTEGER NOT NULL DEFAULT 100,
+        xp INTEGER NOT NULL DEFAULT 0,
+        level INTEGER NOT NULL DEFAULT 1,
+        current_area TEXT DEFAULT 'village',
+        position_x INTEGER DEFAULT 0,
+        position_y INTEGER DEFAULT 0,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE
+    );
+
+    -- Question pool extracted from tasks for game encounters
+    CREATE TABLE IF NOT EXISTS game_question_pool (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER NOT NULL,
+        question_index INTEGER NOT NULL,
+        question_text TEXT NOT NULL,
+        answers_json TEXT NOT NULL,
+        correct_indices_json TEXT NOT NULL,
+        difficulty INTEGER DEFAULT 1,
+        fach TEXT NOT NULL,
+        UNIQUE(task_id, question_index),
+        FOREIGN KEY (task_id) REFERENCES task(id) ON DELETE CASCADE
+    );
+
+    -- Track which questions student has answered (for spaced repetition)
+    CREATE TABLE IF NOT EXISTS game_question_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER NOT NULL,
+        question_pool_id INTEGER NOT NULL,
+        times_answered INTEGER DEFAULT 0,
+        times_correct INTEGER DEFAULT 0,
+        last_answered DATETIME,
+        next_review DATETIME,
+        UNIQUE(student_id, question_pool_id),
+        FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE,
+        FOREIGN KEY (question_pool_id) REFERENCES game_question_pool(id) ON DELETE CASCADE
+    );
+
+    -- Track game answers that count toward real task completion
+    CREATE TABLE IF NOT EXISTS game_task_progress (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER NOT NULL,
+        student_task_id INTEGER NOT NULL,
+        question_index INTEGER NOT NULL,
+        answered_correctly INTEGER NOT NULL DEFAULT 0,
+        answered_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(student_id, student_task_id, question_index),
+        FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE,
+        FOREIGN KEY (student_task_id) REFERENCES student_task(id) ON DELETE CASCADE
+    );
+
+    -- Index for efficient question selection
+    CREATE INDEX IF NOT EXISTS idx_question_pool_fach_difficulty
+    ON game_question_pool(fach, difficulty);
+
+    CREATE INDEX IF NOT EXISTS idx_question_history_review
+    ON game_question_history(student_id, next_review);
+
+    -- ============ App Settings ============
+
+    -- Global application settings (key-value store)
+    CREATE TABLE IF NOT EXISTS app_settings (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Generation counters of reference_cache.py namespaces
+    CREATE TABLE IF NOT EXISTS cache_generation (
+        namespace TEXT PRIMARY KEY,
+        generation INTEGER NOT NULL DEFAULT 0
+    );
+
+    -- ============ Saved Reports ============
+
+    -- Stored PDF reports for historical comparison
+    CREATE TABLE IF NOT EXISTS saved_reports (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        report_type TEXT NOT NULL,  -- 'class_simple', 'student_summary', 'student_complete'
+        klasse_id INTEGER,
+        student_id INTEGER,
+        date_generated DATETIME DEFAULT CURRENT_TIMESTAMP,
+        date_from DATE,
+        date_to DATE,
+        filename TEXT NOT NULL
+    );
+
+    -- Index for efficient retrieval by class
+    CREATE INDEX IF NOT EXISTS idx_saved_reports_klasse
+    ON saved_reports(klasse_id, date_generated DESC);
+
+    -- Index for efficient retrieval by student
+    CREATE INDEX IF NOT EXISTS idx_saved_reports_student
+    ON saved_reports(student_id, date_generated DESC);
+'''
+
+
+# ============ Schema Migrations ============
+#
+# The schema version of each database file is stored in PRAGMA user_version.
+# Startup compares it with the last entry of MIGRATIONS and only runs the
+# missing steps, each in its own transaction together with the version bump,
+# so an up-to-date database is not touched. Steps must also work on
+# databases from before this runner (user_version 0), which may already
+# contain some of their changes; hence the "if missing" checks.
+
+
+def _execute_schema(conn, script):
+    """Run a schema script statement by statement in the open transaction.
+
+    Unlike executescript(), which commits first, this keeps the DDL in the
+    migration's transaction.
+    """
+    for statement in script.split(';'):
+        if statement.strip():
+            conn.execute(statement)
+
+
+def _columns(conn, table):
+    """Column name -> declared type of a main database table."""
+    return {row[1]: row[2] for row in conn.execute(f"PRAGMA main.table_info({table})").fetchall()}
+
+
+def _table_exists(conn, table):
+    return conn.execute(
+        "SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def _add_column(conn, table, column, definition):
+    """Add a column unless it exists. Returns True if it was added."""
+    if column in _columns(conn, table):
+        return False
+    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
+
+
+def _migrate_base_schema(conn):
+    _execute_schema(conn, BASE_SCHEMA)
+
+
+def _migrate_unterricht_saved_state(conn):
+    _add_column(conn, 'unterricht_student', 'has_been_saved', 'INTEGER DEFAULT 0')
+
+
+def _migrate_unterricht_rating_system(conn):
+    """Lesson comment and text ratings ('-', 'ok', '+') instead of 1-3."""
+    _add_column(conn, 'unterricht', 'kommentar', 'TEXT')
+
+    rating_types = [
+        column_type for name, column_type in _columns(conn, 'unterricht_student').items()
+        if name in ('admin_selbststaendigkeit', 'admin_respekt', 'admin_fortschritt')
+    ]
+    if 'INTEGER' not in rating_types:
+        return
+
+    # Rebuild the table (SQLite cannot change a column type), converting in one statement
+    conn.execute('ALTER TABLE unterricht_student RENAME TO unterricht_student_old')
+    _execute_schema(conn, BASE_SCHEMA)  # Only unterricht_student is missing now
+    conn.execute('''
+        INSERT INTO unterricht_student
+            (id, unterricht_id, student_id, anwesend,
+             admin_selbststaendigkeit, admin_respekt, admin_fortschritt, admin_kommentar,
+             has_been_saved, selbst_selbststaendigkeit, selbst_respekt)
+        SELECT id, unterricht_id, student_id, anwesend,
+               CASE admin_selbststaendigkeit WHEN 1 THEN '-' WHEN 3 THEN '+' ELSE 'ok' END,
+               CASE admin_respekt WHEN 1 THEN '-' WHEN 3 THEN '+' ELSE 'ok' END,
+               CASE admin_fortschritt WHEN 1 THEN '-' WHEN 3 THEN '+' ELSE 'ok' END,
+               admin_kommentar, has_been_saved, selbst_selbststaendigkeit, selbst_respekt
+        FROM unterricht_student_old
+    ''')
+    conn.execute('DROP TABLE unterricht_student_old')
+
+
+def _first_number(name):
+    match = re.search(r'\d+', name or '')
+    return int(match.group()) if match else 0
+
+
+def _migrate_task_numbers(conn):
+    """Task number column, filled from the first number in the task name."""
+    if _add_column(conn, 'task', 'number', 'INTEGER DEFAULT 0'):
+        conn.create_function('first_number', 1, _first_number)
+        conn.execute("UPDATE task SET number = first_number(name) WHERE first_number(name) > 0")
+
+
+def _migrate_drop_password_plain(conn):
+    if 'password_plain' in _columns(conn, 'student'):
+        conn.execute("ALTER TABLE student DROP COLUMN password_plain")
+
+
+def _migrate_subtask_visibility(conn):
+    _execute_schema(conn, '''
+        CREATE TABLE IF NOT EXISTS subtask_visibility (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            subtask_id INTEGER NOT NULL,
+
+            -- Context: either class-wide OR individual student
+            klasse_id INTEGER,
+            student_id INTEGER,
+
+            -- Visibility flag (1 = enabled/visible, 0 = disabled/hidden)
+            enabled INTEGER DEFAULT 1,
+
+            -- Audit trail
+            set_by_admin_id INTEGER,
+            set_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+            FOREIGN KEY (subtask_id) REFERENCES subtask(id) ON DELETE CASCADE,
+            FOREIGN KEY (klasse_id) REFERENCES klasse(id) ON DELETE CASCADE,
+            FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE,
+            FOREIGN KEY (set_by_admin_id) REFERENCES admin(id),
+
+            -- Either class-wide OR individual, not both
+            CHECK (
+                (klasse_id IS NOT NULL AND student_id IS NULL) OR
+                (klasse_id IS NULL AND student_id IS NOT NULL)
+            )
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_sv_subtask
+        ON subtask_visibility(subtask_id);
+
+        CREATE INDEX IF NOT EXISTS idx_sv_klasse
+        ON subtask_visibility(klasse_id)
+        WHERE klasse_id IS NOT NULL;
+
+        CREATE INDEX IF NOT EXISTS idx_sv_student
+        ON subtask_visibility(student_id)
+        WHERE student_id IS NOT NULL;
+
+        CREATE INDEX IF NOT EXISTS idx_sv_context
+        ON subtask_visibility(subtask_id, klasse_id, student_id)
+    ''')
+
+
+def _migrate_why_learn_this(conn):
+    _add_column(conn, 'task', 'why_learn_this', 'TEXT')
+
+
+def _migrate_time_estimates(conn):
+    _add_column(conn, 'subtask', 'estimated_minutes', 'INTEGER NULL')
+
+
+def _migrate_easy_reading_mode(conn):
+    _add_column(conn, 'student', 'easy_reading_mode', 'INTEGER DEFAULT 0')
+
+
+def _migrate_current_subtask(conn):
+    """current_subtask_id: first unfinished subtask, else the first subtask."""
+    if not _add_column(conn, 'student_task', 'current_subtask_id', 'INTEGER'):
+        return
+    conn.execute('''
+        UPDATE student_task SET current_subtask_id = COALESCE(
+            (SELECT s.id FROM subtask s
+             LEFT JOIN student_subtask ss
+                 ON ss.subtask_id = s.id AND ss.student_task_id = student_task.id
+             WHERE s.task_id = student_task.task_id AND COALESCE(ss.erledigt, 0) = 0
+             ORDER BY s.reihenfolge, s.id LIMIT 1),
+            (SELECT s.id FROM subtask s
+             WHERE s.task_id = student_task.task_id
+             ORDER BY s.reihenfolge, s.id LIMIT 1)
+        )
+    ''')
+
+
+def _migrate_task_completion_counters(conn):
+    """Completion counter columns of student_task (filled with effective visibility)."""
+    added = False
+    for column in ('visible_subtasks', 'completed_subtasks', 'quiz_passed'):
+        added = _add_column(conn, 'student_task', column, 'INTEGER NOT NULL DEFAULT 0') or added
+    if added and _table_exists(conn, 'effective_subtask_visibility'):
+        refresh_task_completion_counters(conn)
+
+
+def _migrate_effective_subtask_visibility(conn):
+    """One row per (student, class, subtask) visible under the rules in subtask_visibility.
+
+    Kept up to date by every function that changes rules or class membership.
+    """
+    if _table_exists(conn, 'effective_subtask_visibility'):
+        return
+    _execute_schema(conn, '''
+        CREATE TABLE effective_subtask_visibility (
+            student_id INTEGER NOT NULL,
+            klasse_id INTEGER NOT NULL,
+            subtask_id INTEGER NOT NULL,
+            PRIMARY KEY (student_id, klasse_id, subtask_id),
+            FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE,
+            FOREIGN KEY (klasse_id) REFERENCES klasse(id) ON DELETE CASCADE,
+            FOREIGN KEY (subtask_id) REFERENCES subtask(id) ON DELETE CASCADE
+        ) WITHOUT ROWID;
+
+        -- For cascading deletes of classes and subtasks
+        CREATE INDEX idx_esv_klasse ON effective_subtask_visibility(klasse_id);
+        CREATE INDEX idx_esv_subtask ON effective_subtask_visibility(subtask_id)
+    ''')
+    # Also fills the completion counters
+    refresh_effective_subtask_visibility(conn)
+
+
+def _migrate_rendered_markdown_columns(conn):
+    """*_html columns of task and subtask (filled by render_stored_markdown())."""
+    _add_column(conn, 'task', 'beschreibung_html', 'TEXT')
+    _add_column(conn, 'task', 'lernziel_html', 'TEXT')
+    _add_column(conn, 'subtask', 'beschreibung_html', 'TEXT')
+
+
+def _migrate_analytics_tables(conn):
+    """Move analytics and error log tables into the analytics database.
+
+    Installations from before the split keep these tables in the main
+    database, where they would shadow the attached ones. Rows are copied
+    with their ids and the old tables are dropped.
+    """
+    for table in ('error_log', 'analytics_events', 'analytics_daily', 'analytics_user_daily'):
+        if not _table_exists(conn, table):
+            continue
+        columns = ', '.join(_columns(conn, table))
+        cursor = conn.execute(
+            f"INSERT OR IGNORE INTO analytics.{table} ({columns}) SELECT {columns} FROM main.{table}"
+        )
+        print(f"Moved {cursor.rowcount} rows of {table} into {config.ANALYTICS_DATABASE}", file=sys.stderr)
+        conn.execute(f"DROP TABLE main.{table}")
+
+
+# (version, description, step) of the main database, in order. Append only:
+# never renumber or change a step that has been deployed.
+MIGRATIONS = [
+    (1, 'Base schema', _migrate_base_schema),
+    (2, 'unterricht_student.has_been_saved', _migrate_unterricht_saved_state),
+    (3, 'Lesson comment and text ratings', _migrate_unterricht_rating_system),
+    (4, 'task.number', _migrate_task_numbers),
+    (5, 'Drop student.password_plain', _migrate_drop_password_plain),
+    (6, 'subtask_visibility', _migrate_subtask_visibility),
+    (7, 'task.why_learn_this', _migrate_why_learn_this),
+    (8, 'subtask.estimated_minutes', _migrate_time_estimates),
+    (9, 'student.easy_reading_mode', _migrate_easy_reading_mode),
+    (10, 'student_task.current_subtask_id', _migrate_current_subtask),
+    (11, 'Task completion counters', _migrate_task_completion_counters),
+    (12, 'effective_subtask_visibility', _migrate_effective_subtask_visibility),
+    (13, 'Rendered Markdown columns', _migrate_rendered_markdown_columns),
+    (14, 'Move analytics tables to the analytics database', _migrate_analytics_tables),
+]
+
+# (version, description, schema script) of the analytics database
+ANALYTICS_MIGRATIONS = [
+    (1, 'Analytics schema', ANALYTICS_SCHEMA),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+ANALYTICS_SCHEMA_VERSION = ANALYTICS_MIGRATIONS[-1][0]
+
+
+def get_schema_versions():
+    """Get the schema versions stored in the database files.
+
+    Returns:
+        Tuple (main version, analytics version)
+    """
+    with db_session() as conn:
+        return (conn.execute("PRAGMA main.user_version").fetchone()[0],
+                conn.execute("PRAGMA analytics.user_version").fetchone()[0])
+
+
+def _check_version(version, latest, database):
+    if version > latest:
+        raise RuntimeError(
+            f"{database} has schema version {version}, this code only knows up to {latest}. "
+            "Deploy the matching version of the application."
+        )
+
+
+def _migrate_analytics_db():
+    """Apply pending analytics database migrations on a direct connection.
+
+    Returns:
+        List of descriptions of the applied migrations
+    """
+    applied = []
+    conn = get_analytics_db()
+    try:
+        for version, description, script in ANALYTICS_MIGRATIONS:
+            conn.execute("BEGIN IMMEDIATE")
+            current = conn.execute("PRAGMA user_version").fetchone()[0]
+            _check_version(current, ANALYTICS_SCHEMA_VERSION, config.ANALYTICS_DATABASE)
+            if current >= version:
+                conn.rollback()
+                continue
+            _execute_schema(conn, script)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+            applied.append(f"analytics {version}: {description}")
+    finally:
+        conn.close()
+    return applied
+
+
 def init_db():
-    """Initialize database schema."""
-    with db_session() as conn:
-        conn.executescript('''
-            -- Admin user
-            CREATE TABLE IF NOT EXISTS admin (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL
-            );
-
-            -- Classes (Klassen)
-            CREATE TABLE IF NOT EXISTS klasse (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL
-            );
-
-            -- Students (Schüler)
-            CREATE TABLE IF NOT EXISTS student (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nachname TEXT NOT NULL,
-                vorname TEXT NOT NULL,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL
-            );
-
-            -- Student-Class relationship (many-to-many)
-            CREATE TABLE IF NOT EXISTS student_klasse (
-                student_id INTEGER NOT NULL,
-                klasse_id INTEGER NOT NULL,
-                PRIMARY KEY (student_id, klasse_id),
-                FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE,
-                FOREIGN KEY (klasse_id) REFERENCES klasse(id) ON DELETE CASCADE
-            );
-
-            -- Class schedule (day of week each class meets)
-            CREATE TABLE IF NOT EXISTS class_schedule (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                klasse_id INTEGER NOT NULL UNIQUE,
-                weekday INTEGER NOT NULL,  -- 0=Monday, 1=Tuesday, ..., 6=Sunday (ISO 8601)
-                FOREIGN KEY (klasse_id) REFERENCES klasse(id) ON DELETE CASCADE
-            );
-
-            -- Tasks (Aufgaben)
-            CREATE TABLE IF NOT EXISTS task (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                number INTEGER DEFAULT 0,
-                beschreibung TEXT,
-                lernziel TEXT,
-                fach TEXT NOT NULL,
-                stufe TEXT NOT NULL,
-                kategorie TEXT NOT NULL DEFAULT 'pflicht',  -- pflicht/bonus
-                quiz_json TEXT  -- JSON format for quiz questions
-            );
-
-            -- Task prerequisites (many-to-many)
-            CREATE TABLE IF NOT EXISTS task_voraussetzung (
-                task_id INTEGER NOT NULL,
-                voraussetzung_task_id INTEGER NOT NULL,
-                PRIMARY KEY (task_id, voraussetzung_task_id),
-                FOREIGN KEY (task_id) REFERENCES task(id) ON DELETE CASCADE,
-                FOREIGN KEY (voraussetzung_task_id) REFERENCES task(id) ON DELETE CASCADE
-            );
-
-            -- Follow-up tasks (Folgeaufgaben)
-            CREATE TABLE IF NOT EXISTS task_folge (
-                task_id INTEGER NOT NULL,
-                folge_task_id INTEGER NOT NULL,
-                PRIMARY KEY (task_id, folge_task_id),
-                FOREIGN KEY (task_id) REFERENCES task(id) ON DELETE CASCADE,
-                FOREIGN KEY (folge_task_id) REFERENCES task(id) ON DELETE CASCADE
-            );
-
-            -- Elective task groups (Wahlpflicht)
-            -- Students must complete ONE task from the group
-            CREATE TABLE IF NOT EXISTS wahlpflicht_gruppe (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                beschreibung TEXT,
-                fach TEXT NOT NULL,
-                stufe TEXT NOT NULL
-            );
-
-            -- Tasks belonging to an elective group
-            CREATE TABLE IF NOT EXISTS wahlpflicht_task (
-                gruppe_id INTEGER NOT NULL,
-                task_id INTEGER NOT NULL,
-                PRIMARY KEY (gruppe_id, task_id),
-                FOREIGN KEY (gruppe_id) REFERENCES wahlpflicht_gruppe(id) ON DELETE CASCADE,
-                FOREIGN KEY (task_id) REFERENCES task(id) ON DELETE CASCADE
-            );
-
-            -- Sub-tasks (Teilaufgaben)
-            CREATE TABLE IF NOT EXISTS subtask (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                task_id INTEGER NOT NULL,
-                beschreibung TEXT NOT NULL,
-                reihenfolge INTEGER NOT NULL DEFAULT 0,
-                FOREIGN KEY (task_id) REFERENCES task(id) ON DELETE CASCADE
-            );
-
-            -- Materials (Materialien)
-            CREATE TABLE IF NOT EXISTS material (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                task_id INTEGER NOT NULL,
-                typ TEXT NOT NULL,  -- 'link' or 'datei'
-                pfad TEXT NOT NULL,  -- URL or file path
-                beschreibung TEXT,
-                FOREIGN KEY (task_id) REFERENCES task(id) ON DELETE CASCADE
-            );
-
-            -- Student task assignment (per class)
-            CREATE TABLE IF NOT EXISTS student_task (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER NOT NULL,
-                klasse_id INTEGER NOT NULL,
-                task_id INTEGER NOT NULL,
-                abgeschlossen INTEGER NOT NULL DEFAULT 0,
-                manuell_abgeschlossen INTEGER NOT NULL DEFAULT 0,
-                current_subtask_id INTEGER,
-                UNIQUE(student_id, klasse_id),
-                FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE,
-                FOREIGN KEY (klasse_id) REFERENCES klasse(id) ON DELETE CASCADE,
-                FOREIGN KEY (task_id) REFERENCES task(id) ON DELETE CASCADE,
-                FOREIGN KEY (current_subtask_id) REFERENCES subtask(id) ON DELETE SET NULL
-            );
-
-            -- Student sub-task completion
-            CREATE TABLE IF NOT EXISTS student_subtask (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_task_id INTEGER NOT NULL,
-                subtask_id INTEGER NOT NULL,
-                erledigt INTEGER NOT NULL DEFAULT 0,
-                UNIQUE(student_task_id, subtask_id),
-                FOREIGN KEY (student_task_id) REFERENCES student_task(id) ON DELETE CASCADE,
-                FOREIGN KEY (subtask_id) REFERENCES subtask(id) ON DELETE CASCADE
-            );
-
-            -- Quiz attempts
-            CREATE TABLE IF NOT EXISTS quiz_attempt (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_task_id INTEGER NOT NULL,
-                punkte INTEGER NOT NULL,
-                max_punkte INTEGER NOT NULL,
-                bestanden INTEGER NOT NULL,
-                antworten_json TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (student_task_id) REFERENCES student_task(id) ON DELETE CASCADE
-            );
-
-            -- Lessons (Unterricht)
-            CREATE TABLE IF NOT EXISTS unterricht (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                klasse_id INTEGER NOT NULL,
-                datum DATE NOT NULL,
-                kommentar TEXT,
-                UNIQUE(klasse_id, datum),
-                FOREIGN KEY (klasse_id) REFERENCES klasse(id) ON DELETE CASCADE
-            );
-
-            -- Lesson attendance and evaluation
-            CREATE TABLE IF NOT EXISTS unterricht_student (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                unterricht_id INTEGER NOT NULL,
-                student_id INTEGER NOT NULL,
-                anwesend INTEGER NOT NULL DEFAULT 1,
-                -- Admin evaluation (ratings: '-', 'ok', '+')
-                admin_selbststaendigkeit TEXT DEFAULT 'ok',
-                admin_respekt TEXT DEFAULT 'ok',
-                admin_fortschritt TEXT DEFAULT 'ok',
-                admin_kommentar TEXT,
-                has_been_saved INTEGER DEFAULT 0,
-                -- Student self-evaluation
-                selbst_selbststaendigkeit INTEGER,
-                selbst_respekt INTEGER,
-                UNIQUE(unterricht_id, student_id),
-                FOREIGN KEY (unterricht_id) REFERENCES unterricht(id) ON DELETE CASCADE,
-                FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE
-            );
-
-            -- ============ Game Mode Tables ============
-
-            -- Game character state for each student
-            CREATE TABLE IF NOT EXISTS game_character (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER UNIQUE NOT NULL,
-                fach TEXT NOT NULL,
-                hp INTEGER NOT NULL DEFAULT 100,
-                max_hp INTEGER NOT NULL DEFAULT 100,
-                xp INTEGER NOT NULL DEFAULT 0,
-                level INTEGER NOT NULL DEFAULT 1,
-                current_area TEXT DEFAULT 'village',
-                position_x INTEGER DEFAULT 0,
-                position_y INTEGER DEFAULT 0,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE
-            );
-
-            -- Question pool extracted from tasks for game encounters
-            CREATE TABLE IF NOT EXISTS game_question_pool (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                task_id INTEGER NOT NULL,
-                question_index INTEGER NOT NULL,
-                question_text TEXT NOT NULL,
-                answers_json TEXT NOT NULL,
-                correct_indices_json TEXT NOT NULL,
-                difficulty INTEGER DEFAULT 1,
-                fach TEXT NOT NULL,
-                UNIQUE(task_id, question_index),
-                FOREIGN KEY (task_id) REFERENCES task(id) ON DELETE CASCADE
-            );
-
-            -- Track which questions student has answered (for spaced repetition)
-            CREATE TABLE IF NOT EXISTS game_question_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER NOT NULL,
-                question_pool_id INTEGER NOT NULL,
-                times_answered INTEGER DEFAULT 0,
-                times_correct INTEGER DEFAULT 0,
-                last_answered DATETIME,
-                next_review DATETIME,
-                UNIQUE(student_id, question_pool_id),
-                FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE,
-                FOREIGN KEY (question_pool_id) REFERENCES game_question_pool(id) ON DELETE CASCADE
-            );
-
-            -- Track game answers that count toward real task completion
-            CREATE TABLE IF NOT EXISTS game_task_progress (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER NOT NULL,
-                student_task_id INTEGER NOT NULL,
-                question_index INTEGER NOT NULL,
-                answered_correctly INTEGER NOT NULL DEFAULT 0,
-                answered_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(student_id, student_task_id, question_index),
-                FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE,
-                FOREIGN KEY (student_task_id) REFERENCES student_task(id) ON DELETE CASCADE
-            );
-
-            -- Index for efficient question selection
-            CREATE INDEX IF NOT EXISTS idx_question_pool_fach_difficulty
-            ON game_question_pool(fach, difficulty);
-
-            CREATE INDEX IF NOT EXISTS idx_question_history_review
-            ON game_question_history(student_id, next_review);
-
-            -- ============ Error Logging ============
-
-            -- Error log for tracking application errors
-            CREATE TABLE IF NOT EXISTS error_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                level TEXT NOT NULL,  -- ERROR, WARNING, CRITICAL
-                message TEXT NOT NULL,
-                traceback TEXT,
-                user_id INTEGER,
-                user_type TEXT,  -- 'admin' or 'student'
-                route TEXT,
-                method TEXT,
-                url TEXT
-            );
-
-            -- Index for efficient log retrieval and cleanup
-            CREATE INDEX IF NOT EXISTS idx_error_log_timestamp
-            ON error_log(timestamp DESC);
-
-            -- ============ Analytics & Activity Logging ============
-
-            -- Analytics events for both usage statistics and student activity logs
-            CREATE TABLE IF NOT EXISTS analytics_events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                event_type TEXT NOT NULL,  -- 'login', 'page_view', 'file_download', 'task_start', 'subtask_complete', 'task_complete', 'quiz_attempt', 'self_eval'
-                user_id INTEGER,
-                user_type TEXT,  -- 'admin' or 'student'
-                metadata TEXT    -- JSON format for flexible event data
-            );
-
-            -- Indexes for efficient querying
-            CREATE INDEX IF NOT EXISTS idx_analytics_timestamp
-            ON analytics_events(timestamp DESC);
-
-            CREATE INDEX IF NOT EXISTS idx_analytics_user
-            ON analytics_events(user_id, user_type, timestamp DESC);
-
-            CREATE INDEX IF NOT EXISTS idx_analytics_type
-            ON analytics_events(event_type, timestamp DESC);
-
-            -- ============ App Settings ============
-
-            -- Global application settings (key-value store)
-            CREATE TABLE IF NOT EXISTS app_settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            );
-
-            -- ============ Saved Reports ============
-
-            -- Stored PDF reports for historical comparison
-            CREATE TABLE IF NOT EXISTS saved_reports (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                report_type TEXT NOT NULL,  -- 'class_simple', 'student_summary', 'student_complete'
-                klasse_id INTEGER,
-                student_id INTEGER,
-                date_generated DATETIME DEFAULT CURRENT_TIMESTAMP,
-                date_from DATE,
-                date_to DATE,
-                filename TEXT NOT NULL
-            );
-
-            -- Index for efficient retrieval by class
-            CREATE INDEX IF NOT EXISTS idx_saved_reports_klasse
-            ON saved_reports(klasse_id, date_generated DESC);
-
-            -- Index for efficient retrieval by student
-            CREATE INDEX IF NOT EXISTS idx_saved_reports_student
-            ON saved_reports(student_id, date_generated DESC);
-        ''')
-
-
-def migrate_add_current_subtask():
-    """Migration: Add current_subtask_id column to student_task table if it doesn't exist."""
-    with db_session() as conn:
-        # Check if column already exists
-        cursor = conn.execute("PRAGMA table_info(student_task)")
-        columns = [row[1] for row in cursor.fetchall()]
-
-        if 'current_subtask_id' not in columns:
-            # Add the column
-            conn.execute("ALTER TABLE student_task ADD COLUMN current_subtask_id INTEGER")
-
-            # For existing student_task records, set current_subtask_id to the first incomplete subtask
-            # or the first subtask if all are complete or none exist
-            student_tasks = conn.execute("SELECT id, task_id FROM student_task").fetchall()
-
-            for st in student_tasks:
-                student_task_id = st['id']
-                task_id = st['task_id']
-
-                # Get all subtasks for this task, ordered by reihenfolge
-                subtasks = conn.execute(
-                    "SELECT id FROM subtask WHERE task_id = ? ORDER BY reihenfolge",
-                    (task_id,)
-                ).fetchall()
-
-                if not subtasks:
-                    # No subtasks, leave current_subtask_id as NULL
-                    continue
-
-                # Find first incomplete subtask
-                first_incomplete = None
-                for sub in subtasks:
-                    subtask_id = sub['id']
-                    completed = conn.execute(
-                        "SELECT erledigt FROM student_subtask WHERE student_task_id = ? AND subtask_id = ?",
-                        (student_task_id, subtask_id)
-                    ).fetchone()
-
-                    if not completed or not completed['erledigt']:
-                        first_incomplete = subtask_id
-                        break
-
-                # If all complete or none started, use first subtask
-                current_subtask = first_incomplete if first_incomplete else subtasks[0]['id']
-
-                conn.execute(
-                    "UPDATE student_task SET current_subtask_id = ? WHERE id = ?",
-                    (current_subtask, student_task_id)
-                )
+    """Create or upgrade the main and analytics database schema.
+
+    Reads both schema versions and returns right away, without any DDL, if
+    they are current; otherwise applies the pending MIGRATIONS steps.
+
+    Returns:
+        List of descriptions of the applied migrations (empty if up to date)
+    """
+    os.makedirs(os.path.dirname(config.DATABASE), exist_ok=True)
+    os.makedirs(os.path.dirname(config.ANALYTICS_DATABASE), exist_ok=True)
+
+    main_version, analytics_version = get_schema_versions()
+    _check_version(main_version, SCHEMA_VERSION, config.DATABASE)
+    _check_version(analytics_version, ANALYTICS_SCHEMA_VERSION, config.ANALYTICS_DATABASE)
+    if main_version == SCHEMA_VERSION and analytics_version == ANALYTICS_SCHEMA_VERSION:
+        return []
+
+    # Analytics first: moving old analytics tables needs their new home
+    applied = _migrate_analytics_db()
+
+    for version, description, step in MIGRATIONS:
+        if version <= main_version:
+            continue
+        with db_session() as conn:
+            # Lock before re-reading the version, so concurrent starts run each step once
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("PRAGMA main.user_version").fetchone()[0] >= version:
+                continue
+            step(conn)
+            conn.execute(f"PRAGMA main.user_version = {int(version)}")
+        applied.append(f"{version}: {description}")
+
+    # Schema changes may invalidate anything cached from before
+    reference_cache.clear()
+    return applied
+
+
+def render_stored_markdown():
+    """Fill the stored HTML of task and subtask Markdown fields.
+
+    Rows without stored HTML are always rendered. All rows are re-rendered
+    when the stored markdown_render_version differs from
+    markdown_render.RENDER_VERSION, i.e. after the Markdown configuration
+    changed.
+    """
+    with db_session() as conn:
+        version = conn.execute(
+            "SELECT value FROM app_settings WHERE key = 'markdown_render_version'"
+        ).fetchone()
+        current = version and version['value'] == str(markdown_render.RENDER_VERSION)
+
+        tasks = conn.execute(
+            "SELECT id, beschreibung, lernziel FROM task"
+            + (" WHERE beschreibung_html IS NULL OR lernziel_html IS NULL" if current else "")
+        ).fetchall()
+        conn.executemany(
+            "UPDATE task SET beschreibung_html = ?, lernziel_html = ? WHERE id = ?",
+            [(markdown_render.convert(t['beschreibung']) if t['beschreibung'] else '',
+              markdown_render.convert(t['lernziel']) if t['lernziel'] else '', t['id'])
+             for t in tasks]
+        )
+        subtasks = conn.execute(
+            "SELECT id, beschreibung FROM subtask"
+            + (" WHERE beschreibung_html IS NULL" if current else "")
+        ).fetchall()
+        conn.executemany(
+            "UPDATE subtask SET beschreibung_html = ? WHERE id = ?",
+            [(markdown_render.convert(sub['beschreibung']) if sub['beschreibung'] else '', sub['id'])
+             for sub in subtasks]
+        )
+        if tasks or subtasks:
+            reference_cache.bump(conn, 'tasks', 'subtasks')
+        if not current:
+            set_setting('markdown_render_version', markdown_render.RENDER_VERSION)
 
 
 def create_admin(username, password):
@@ -473,27 +1116,38 @@ def create_admin(username, password):
 
 
 def verify_admin(username, password):
-    """Verify admin credentials."""
+    """Verify admin credentials.
+
+    The hash is checked on the password_hasher pool after the lookup, which
+    is a plain read, so no transaction is held while hashing. A legacy hash
+    is replaced after a successful check; inside a request that UPDATE joins
+    the request transaction and is committed with it when the request ends.
+
+    Raises:
+        password_hasher.Overloaded: If too many logins are being verified
+    """
     with db_session() as conn:
         admin = conn.execute(
             "SELECT * FROM admin WHERE username = ?",
             (username,)
         ).fetchone()
-        if not admin:
-            return None
+    if not admin:
+        return None
 
-        is_valid, needs_rehash = verify_password(admin['password_hash'], password)
-        if not is_valid:
-            return None
+    is_valid, needs_rehash = password_hasher.run(verify_password, admin['password_hash'], password)
+    if not is_valid:
+        return None
 
-        # Upgrade legacy hash to modern hash on successful login
-        if needs_rehash:
+    # Upgrade legacy hash to modern hash on successful login
+    if needs_rehash:
+        new_hash = password_hasher.run(hash_password, password)
+        with db_session() as conn:
             conn.execute(
                 "UPDATE admin SET password_hash = ? WHERE id = ?",
-                (hash_password(password), admin['id'])
+                (new_hash, admin['id'])
             )
 
-        return dict(admin)
+    return dict(admin)
 
 
 def update_admin_password(admin_id, new_password):
@@ -506,31 +1160,43 @@ def update_admin_password(admin_id, new_password):
 
 
 def verify_student(username, password):
-    """Verify student credentials."""
+    """Verify student credentials.
+
+    The hash is checked on the password_hasher pool after the lookup, which
+    is a plain read, so no transaction is held while hashing. A legacy hash
+    is replaced after a successful check; inside a request that UPDATE joins
+    the request transaction and is committed with it when the request ends.
+
+    Raises:
+        password_hasher.Overloaded: If too many logins are being verified
+    """
     with db_session() as conn:
         student = conn.execute(
             "SELECT * FROM student WHERE username = ?",
             (username,)
         ).fetchone()
-        if not student:
-            return None
+    if not student:
+        return None
 
-        is_valid, needs_rehash = verify_password(student['password_hash'], password)
-        if not is_valid:
-            return None
+    is_valid, needs_rehash = password_hasher.run(verify_password, student['password_hash'], password)
+    if not is_valid:
+        return None
 
-        # Upgrade legacy hash to modern hash on successful login
-        if needs_rehash:
+    # Upgrade legacy hash to modern hash on successful login
+    if needs_rehash:
+        new_hash = password_hasher.run(hash_password, password)
+        with db_session() as conn:
             conn.execute(
                 "UPDATE student SET password_hash = ? WHERE id = ?",
-                (hash_password(password), student['id'])
+                (new_hash, student['id'])
             )
 
-        return dict(student)
+    return dict(student)
 
 
 # ============ Class functions ============
 
+@reference_cache.cached('klassen')
 def get_all_klassen():
     """Get all classes."""
     with db_session() as conn:
@@ -543,6 +1209,7 @@ def create_klasse(name):
     """Create a new class."""
     with db_session() as conn:
         cursor = conn.execute("INSERT INTO klasse (name) VALUES (?)", (name,))
+        reference_cache.bump(conn, 'klassen')
         return cursor.lastrowid
 
 
@@ -550,8 +1217,10 @@ def delete_klasse(klasse_id):
     """Delete a class."""
     with db_session() as conn:
         conn.execute("DELETE FROM klasse WHERE id = ?", (klasse_id,))
+        reference_cache.bump(conn, 'klassen', 'schedules')
 
 
+@reference_cache.cached('klassen')
 def get_klasse(klasse_id):
     """Get a class by ID."""
     with db_session() as conn:
@@ -562,6 +1231,7 @@ def get_klasse(klasse_id):
 
 # ============ Class Schedule functions ============
 
+@reference_cache.cached('schedules')
 def get_class_schedule(klasse_id):
     """Get the scheduled weekday for a class."""
     with db_session() as conn:
@@ -579,12 +1249,14 @@ def set_class_schedule(klasse_id, weekday):
             "INSERT OR REPLACE INTO class_schedule (klasse_id, weekday) VALUES (?, ?)",
             (klasse_id, weekday)
         )
+        reference_cache.bump(conn, 'schedules')
 
 
 def delete_class_schedule(klasse_id):
     """Delete the schedule for a class."""
     with db_session() as conn:
         conn.execute("DELETE FROM class_schedule WHERE klasse_id = ?", (klasse_id,))
+        reference_cache.bump(conn, 'schedules')
 
 
 def get_next_class_date(klasse_id, current_date):
@@ -663,6 +1335,49 @@ def get_previous_class_date(klasse_id, current_date):
     return previous_date.isoformat()
 
 
+def get_admin_dashboard_data(today):
+    """Get everything the admin dashboard shows in one query.
+
+    Args:
+        today: date object for "Unterricht heute"
+
+    Returns:
+        dict with:
+            klassen: list of class dicts with weekday (None if unscheduled),
+                     student_count, task_count (distinct assigned tasks) and
+                     unterricht_heute_id (today's lesson, if recorded)
+            klassen_heute: the classes scheduled for today's weekday
+            task_count: number of tasks overall
+    """
+    with db_session() as conn:
+        # The one-row totals drive the query so it also works without classes
+        rows = conn.execute('''
+            SELECT totals.task_count AS total_tasks, k.*, cs.weekday,
+                   (SELECT COUNT(*) FROM student_klasse sk WHERE sk.klasse_id = k.id) AS student_count,
+                   (SELECT COUNT(DISTINCT st.task_id) FROM student_task st WHERE st.klasse_id = k.id) AS task_count,
+                   u.id AS unterricht_heute_id
+            FROM (SELECT COUNT(*) AS task_count FROM task) totals
+            LEFT JOIN klasse k ON 1 = 1
+            LEFT JOIN class_schedule cs ON cs.klasse_id = k.id
+            LEFT JOIN unterricht u ON u.klasse_id = k.id AND u.datum = ?
+            ORDER BY k.name
+        ''', (today.isoformat(),)).fetchall()
+
+    klassen = []
+    for row in rows:
+        if row['id'] is None:
+            continue
+        klasse = dict(row)
+        del klasse['total_tasks']
+        klassen.append(klasse)
+
+    return {
+        'klassen': klassen,
+        'klassen_heute': [k for k in klassen if k['weekday'] == today.weekday()],
+        'task_count': rows[0]['total_tasks'],
+    }
+
+
 # ============ Student functions ============
 
 def get_existing_usernames():
@@ -682,6 +1397,40 @@ def create_student(nachname, vorname, username, password):
         return cursor.lastrowid
 
 
+def create_students_in_klasse(klasse_id, students):
+    """Create many students and add them to a class in one transaction.
+
+    Passwords are hashed in parallel before any row is written. Inside a
+    request the inserts join the request transaction, which keeps the write
+    lock until the request ends, so callers do slow work (like rendering the
+    credentials PDF) before calling this.
+
+    Args:
+        klasse_id: The class ID
+        students: List of dicts with nachname, vorname, username, password
+
+    Returns:
+        Number of students created
+    """
+    if not students:
+        return 0
+
+    hashes = password_hasher.run_many(hash_password, [s['password'] for s in students])
+
+    with db_session() as conn:
+        conn.executemany(
+            "INSERT INTO student (nachname, vorname, username, password_hash) VALUES (?, ?, ?, ?)",
+            [(s['nachname'], s['vorname'], s['username'], h) for s, h in zip(students, hashes)]
+        )
+        conn.executemany('''
+            INSERT OR IGNORE INTO student_klasse (student_id, klasse_id)
+            SELECT id, ? FROM student WHERE username = ?
+        ''', [(klasse_id, s['username']) for s in students])
+        refresh_effective_subtask_visibility(conn, klasse_id=klasse_id)
+
+    return len(students)
+
+
 def add_student_to_klasse(student_id, klasse_id):
     """Add student to a class."""
     with db_session() as conn:
@@ -689,6 +1438,7 @@ def add_student_to_klasse(student_id, klasse_id):
             "INSERT OR IGNORE INTO student_klasse (student_id, klasse_id) VALUES (?, ?)",
             (student_id, klasse_id)
         )
+        refresh_effective_subtask_visibility(conn, student_id=student_id, klasse_id=klasse_id)
 
 
 def remove_student_from_klasse(student_id, klasse_id):
@@ -703,6 +1453,7 @@ def remove_student_from_klasse(student_id, klasse_id):
             "DELETE FROM student_task WHERE student_id = ? AND klasse_id = ?",
             (student_id, klasse_id)
         )
+        refresh_effective_subtask_visibility(conn, student_id=student_id, klasse_id=klasse_id)
 
 
 def move_student_to_klasse(student_id, from_klasse_id, to_klasse_id):
@@ -791,6 +1542,7 @@ def is_student_task_owner(student_id, student_task_id):
 
 # ============ Task functions ============
 
+@reference_cache.cached('tasks')
 def get_all_tasks():
     """Get all tasks."""
     with db_session() as conn:
@@ -802,6 +1554,7 @@ def get_all_tasks():
     return result
 
 
+@reference_cache.cached('tasks')
 def get_task(task_id):
     """Get a task by ID."""
     with db_session() as conn:
@@ -810,28 +1563,45 @@ def get_task(task_id):
 
 
 def create_task(name, beschreibung, lernziel, fach, stufe, kategorie, quiz_json=None, number=0, why_learn_this=None):
-    """Create a new task."""
+    """Create a new task.
+
+    The Markdown fields are rendered to HTML here and stored alongside the
+    source, so student pages do not convert Markdown per request.
+    """
     with db_session() as conn:
         cursor = conn.execute(
-            "INSERT INTO task (name, number, beschreibung, lernziel, fach, stufe, kategorie, quiz_json, why_learn_this) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (name, number, beschreibung, lernziel, fach, stufe, kategorie, quiz_json, why_learn_this)
+            """INSERT INTO task (name, number, beschreibung, lernziel, fach, stufe, kategorie, quiz_json, why_learn_this,
+                                 beschreibung_html, lernziel_html)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (name, number, beschreibung, lernziel, fach, stufe, kategorie, quiz_json, why_learn_this,
+             markdown_render.render(beschreibung), markdown_render.render(lernziel))
         )
+        reference_cache.bump(conn, 'tasks')
         return cursor.lastrowid
 
 
 def update_task(task_id, name, beschreibung, lernziel, fach, stufe, kategorie, quiz_json=None, number=0, why_learn_this=None):
-    """Update a task."""
+    """Update a task (re-renders the stored HTML of the Markdown fields)."""
     with db_session() as conn:
         conn.execute('''
             UPDATE task SET name=?, number=?, beschreibung=?, lernziel=?, fach=?, stufe=?,
-            kategorie=?, quiz_json=?, why_learn_this=? WHERE id=?
-        ''', (name, number, beschreibung, lernziel, fach, stufe, kategorie, quiz_json, why_learn_this, task_id))
+            kategorie=?, quiz_json=?, why_learn_this=?, beschreibung_html=?, lernziel_html=? WHERE id=?
+        ''', (name, number, beschreibung, lernziel, fach, stufe, kategorie, quiz_json, why_learn_this,
+              markdown_render.render(beschreibung), markdown_render.render(lernziel), task_id))
+
+        reference_cache.bump(conn, 'tasks')
+
+        # The quiz may have been added or removed
+        refresh_task_completion_counters(conn, task_ids=[task_id])
+    quiz_cache.invalidate(task_id)
 
 
 def delete_task(task_id):
     """Delete a task."""
     with db_session() as conn:
         conn.execute("DELETE FROM task WHERE id = ?", (task_id,))
+        reference_cache.bump(conn, 'tasks', 'subtasks', 'materials')
+    quiz_cache.invalidate(task_id)
 
 
 # ============ Task Prerequisites ============
@@ -1070,6 +1840,7 @@ def check_wahlpflicht_erfuellt(student_id, klasse_id, gruppe_id):
 
 # ============ Subtask functions ============
 
+@reference_cache.cached('subtasks')
 def get_subtasks(task_id):
     """Get subtasks for a task."""
     with db_session() as conn:
@@ -1081,24 +1852,31 @@ def get_subtasks(task_id):
 
 
 def create_subtask(task_id, beschreibung, reihenfolge=0, estimated_minutes=None):
-    """Create a subtask."""
+    """Create a subtask (with its description rendered to HTML)."""
     with db_session() as conn:
         cursor = conn.execute(
-            "INSERT INTO subtask (task_id, beschreibung, reihenfolge, estimated_minutes) VALUES (?, ?, ?, ?)",
-            (task_id, beschreibung, reihenfolge, estimated_minutes)
+            "INSERT INTO subtask (task_id, beschreibung, reihenfolge, estimated_minutes, beschreibung_html) VALUES (?, ?, ?, ?, ?)",
+            (task_id, beschreibung, reihenfolge, estimated_minutes, markdown_render.render(beschreibung))
         )
+        reference_cache.bump(conn, 'subtasks')
         return cursor.lastrowid
 
 
 def delete_subtask(subtask_id):
-    """Delete a subtask."""
+    """Delete a subtask (its effective visibility rows cascade away)."""
     with db_session() as conn:
+        row = conn.execute("SELECT task_id FROM subtask WHERE id = ?", (subtask_id,)).fetchone()
         conn.execute("DELETE FROM subtask WHERE id = ?", (subtask_id,))
+        if row:
+            refresh_task_completion_counters(conn, task_ids=[row['task_id']])
+        reference_cache.bump(conn, 'subtasks')
 
 
 def update_subtasks(task_id, subtasks_list, estimated_minutes_list=None):
     """Replace all subtasks for a task (UX Tier 1: now includes time estimates).
 
+    Descriptions are stored together with their rendered HTML.
+
     Preserves visibility settings by matching subtask order/position.
     """
     with db_session() as conn:
@@ -1123,6 +1901,7 @@ def update_subtasks(task_id, subtasks_list, estimated_minutes_list=None):
             WHERE subtask_id IN (SELECT id FROM subtask WHERE task_id = ?)
         """, (task_id,))
         conn.execute("DELETE FROM subtask WHERE task_id = ?", (task_id,))
+        reference_cache.bump(conn, 'subtasks')
 
         # Step 3: Create new subtasks and track their IDs by position
         first_new_subtask_id = None
@@ -1140,8 +1919,8 @@ def update_subtasks(task_id, subtasks_list, estimated_minutes_list=None):
                         estimated_minutes = None
 
                 cursor = conn.execute(
-                    "INSERT INTO subtask (task_id, beschreibung, reihenfolge, estimated_minutes) VALUES (?, ?, ?, ?)",
-                    (task_id, beschreibung.strip(), i, estimated_minutes)
+                    "INSERT INTO subtask (task_id, beschreibung, reihenfolge, estimated_minutes, beschreibung_html) VALUES (?, ?, ?, ?, ?)",
+                    (task_id, beschreibung.strip(), i, estimated_minutes, markdown_render.render(beschreibung.strip()))
                 )
                 new_subtask_id = cursor.lastrowid
                 new_subtask_ids_by_position[i] = new_subtask_id
@@ -1158,6 +1937,9 @@ def update_subtasks(task_id, subtasks_list, estimated_minutes_list=None):
                     VALUES (?, ?, ?, ?, ?)
                 """, (new_subtask_id, klasse_id, student_id, enabled, admin_id))
 
+        refresh_effective_subtask_visibility(conn, subtask_ids=new_subtask_ids_by_position.values())
+        refresh_task_completion_counters(conn, task_ids=[task_id])
+
         # Step 5: Fix orphaned current_subtask_id references
         if first_new_subtask_id is not None:
             conn.execute(
@@ -1168,6 +1950,7 @@ def update_subtasks(task_id, subtasks_list, estimated_minutes_list=None):
 
 # ============ Material functions ============
 
+@reference_cache.cached('materials')
 def get_materials(task_id):
     """Get materials for a task."""
     with db_session() as conn:
@@ -1195,6 +1978,7 @@ def create_material(task_id, typ, pfad, beschreibung=''):
             "INSERT INTO material (task_id, typ, pfad, beschreibung) VALUES (?, ?, ?, ?)",
             (task_id, typ, pfad, beschreibung)
         )
+        reference_cache.bump(conn, 'materials')
         return cursor.lastrowid
 
 
@@ -1202,10 +1986,111 @@ def delete_material(material_id):
     """Delete a material."""
     with db_session() as conn:
         conn.execute("DELETE FROM material WHERE id = ?", (material_id,))
+        reference_cache.bump(conn, 'materials')
 
 
 # ============ Student Task functions ============
 
+def assign_tasks(assignments, admin_id=None):
+    """Assign tasks to whole classes and/or single students in one transaction.
+
+    All student_task rows and visibility rules are written with executemany,
+    so assigning a topic to several classes costs one commit.
+
+    Args:
+        assignments: Iterable of dicts with 'klasse_id' and 'task_id', plus
+            optional 'student_id' (default: every student of the class) and
+            'subtask_id' (current subtask, default: first subtask of the task)
+        admin_id: Admin making the assignment (for visibility audit trail)
+
+    Returns:
+        Number of student_task rows written
+    """
+    assignments = list(assignments)
+    if not assignments:
+        return 0
+
+    with db_session() as conn:
+        task_ids = sorted({a['task_id'] for a in assignments})
+        subtasks_by_task = {task_id: [] for task_id in task_ids}
+        for row in conn.execute(f'''
+            SELECT id, task_id FROM subtask
+            WHERE task_id IN ({','.join('?' * len(task_ids))})
+            ORDER BY reihenfolge
+        ''', task_ids).fetchall():
+            subtasks_by_task[row['task_id']].append(row['id'])
+
+        class_ids = sorted({a['klasse_id'] for a in assignments if a.get('student_id') is None})
+        members = {klasse_id: [] for klasse_id in class_ids}
+        if class_ids:
+            for row in conn.execute(f'''
+                SELECT student_id, klasse_id FROM student_klasse
+                WHERE klasse_id IN ({','.join('?' * len(class_ids))})
+            ''', class_ids).fetchall():
+                members[row['klasse_id']].append(row['student_id'])
+
+        student_tasks = []
+        class_rules = []
+        student_rules = []
+        for a in assignments:
+            subtask_ids = subtasks_by_task[a['task_id']]
+            current = a.get('subtask_id')
+            if current is None and subtask_ids:
+                current = subtask_ids[0]
+
+            if a.get('student_id') is None:
+                students = members[a['klasse_id']]
+                # Auto-enable all subtasks for the whole class
+                class_rules.extend((a['klasse_id'], sub_id) for sub_id in subtask_ids)
+            else:
+                students = [a['student_id']]
+                # Auto-enable all subtasks so the student can see them
+                student_rules.extend((a['student_id'], sub_id) for sub_id in subtask_ids)
+
+            student_tasks.extend(
+                (student_id, a['klasse_id'], a['task_id'], current) for student_id in students
+            )
+
+        # The same rule can come from several assignments - write it once
+        class_rules = list(dict.fromkeys(class_rules))
+        student_rules = list(dict.fromkeys(student_rules))
+
+        # INSERT OR REPLACE resets an existing assignment for the class
+        conn.executemany('''
+            INSERT OR REPLACE INTO student_task (student_id, klasse_id, task_id, abgeschlossen, manuell_abgeschlossen, current_subtask_id)
+            VALUES (?, ?, ?, 0, 0, ?)
+        ''', student_tasks)
+
+        conn.executemany(
+            "DELETE FROM subtask_visibility WHERE klasse_id = ? AND subtask_id = ?",
+            class_rules
+        )
+        conn.executemany('''
+            INSERT INTO subtask_visibility (klasse_id, subtask_id, enabled, set_by_admin_id)
+            VALUES (?, ?, 1, ?)
+        ''', [rule + (admin_id,) for rule in class_rules])
+        conn.executemany(
+            "DELETE FROM subtask_visibility WHERE student_id = ? AND subtask_id = ?",
+            student_rules
+        )
+        conn.executemany('''
+            INSERT INTO subtask_visibility (student_id, subtask_id, enabled, set_by_admin_id)
+            VALUES (?, ?, 1, ?)
+        ''', [rule + (admin_id,) for rule in student_rules])
+
+        for a in assignments:
+            subtask_ids = subtasks_by_task[a['task_id']]
+            if a.get('student_id') is None:
+                refresh_effective_subtask_visibility(conn, klasse_id=a['klasse_id'], subtask_ids=subtask_ids)
+            else:
+                refresh_effective_subtask_visibility(conn, student_id=a['student_id'], subtask_ids=subtask_ids)
+            if not subtask_ids:
+                # Nothing to refresh above, but the counters of the new rows still need the quiz flag
+                refresh_task_completion_counters(conn, klasse_id=a['klasse_id'], task_ids=[a['task_id']])
+
+        return len(student_tasks)
+
+
 def assign_task_to_student(student_id, klasse_id, task_id, subtask_id=None, admin_id=None):
     """Assign a task to a student in a class.
 
@@ -1216,25 +2101,9 @@ def assign_task_to_student(student_id, klasse_id, task_id, subtask_id=None, admi
         subtask_id: Optional specific subtask to set as current (default: first subtask)
         admin_id: Admin making the assignment (for visibility audit trail)
     """
-    with db_session() as conn:
-        # Get first subtask if subtask_id not provided
-        if subtask_id is None:
-            first_subtask = conn.execute(
-                "SELECT id FROM subtask WHERE task_id = ? ORDER BY reihenfolge LIMIT 1",
-                (task_id,)
-            ).fetchone()
-            subtask_id = first_subtask['id'] if first_subtask else None
-
-        # Use INSERT OR REPLACE to update existing assignment
-        conn.execute('''
-            INSERT OR REPLACE INTO student_task (student_id, klasse_id, task_id, abgeschlossen, manuell_abgeschlossen, current_subtask_id)
-            VALUES (?, ?, ?, 0, 0, ?)
-        ''', (student_id, klasse_id, task_id, subtask_id))
+    assign_tasks([{'student_id': student_id, 'klasse_id': klasse_id,
+                   'task_id': task_id, 'subtask_id': subtask_id}], admin_id)
 
-    # Auto-enable all subtasks so the student can see them
-    subtasks = get_subtasks(task_id)
-    for subtask in subtasks:
-        set_subtask_visibility_for_student(student_id, subtask['id'], True, admin_id)
 
 def assign_task_to_klasse(klasse_id, task_id, subtask_id=None, admin_id=None):
     """Assign a task to all students in a class.
@@ -1245,73 +2114,204 @@ def assign_task_to_klasse(klasse_id, task_id, subtask_id=None, admin_id=None):
         subtask_id: Optional specific subtask to set as current for all students (default: first subtask)
         admin_id: Admin making the assignment (for visibility audit trail)
     """
-    with db_session() as conn:
-        # Get first subtask if subtask_id not provided
-        if subtask_id is None:
-            first_subtask = conn.execute(
-                "SELECT id FROM subtask WHERE task_id = ? ORDER BY reihenfolge LIMIT 1",
-                (task_id,)
-            ).fetchone()
-            subtask_id = first_subtask['id'] if first_subtask else None
-
-        students = conn.execute(
-            "SELECT student_id FROM student_klasse WHERE klasse_id = ?",
-            (klasse_id,)
-        ).fetchall()
-        for s in students:
-            conn.execute('''
-                INSERT OR REPLACE INTO student_task (student_id, klasse_id, task_id, abgeschlossen, manuell_abgeschlossen, current_subtask_id)
-                VALUES (?, ?, ?, 0, 0, ?)
-            ''', (s['student_id'], klasse_id, task_id, subtask_id))
-
-    # Auto-enable all subtasks for the whole class
-    subtasks = get_subtasks(task_id)
-    for subtask in subtasks:
-        set_subtask_visibility_for_class(klasse_id, subtask['id'], True, admin_id)
+    assign_tasks([{'klasse_id': klasse_id, 'task_id': task_id, 'subtask_id': subtask_id}], admin_id)
 
 
 # ============================================================================
 # Subtask Visibility Management
 # ============================================================================
 
-def get_visible_subtasks_for_student(student_id, klasse_id, task_id):
-    """Get list of subtasks visible to a student based on visibility rules.
+def refresh_effective_subtask_visibility(conn, student_id=None, klasse_id=None, subtask_ids=None):
+    """Recompute effective_subtask_visibility for the given slice.
 
-    Rules priority:
+    This is the only place that implements the rule priority:
     1. Student-specific rules (if they exist)
     2. Class-wide rules (if no student rule exists)
     3. Default: NO subtasks visible (admin must explicitly enable)
 
+    Must run in the same transaction as the change it reflects. Arguments
+    narrow the recomputed slice; with none, the whole table is rebuilt.
+
     Args:
-        student_id: The student ID
-        klasse_id: The class ID the student is viewing the task in
-        task_id: The task ID
+        conn: Open database connection
+        student_id: Only rows of this student
+        klasse_id: Only rows of this class
+        subtask_ids: Only rows of these subtasks
+    """
+    scope = "1=1"
+    params = []
+    if student_id is not None:
+        scope += " AND student_id = ?"
+        params.append(student_id)
+    if klasse_id is not None:
+        scope += " AND klasse_id = ?"
+        params.append(klasse_id)
+    if subtask_ids is not None:
+        subtask_ids = list(subtask_ids)
+        if not subtask_ids:
+            return
+        scope += f" AND subtask_id IN ({','.join('?' * len(subtask_ids))})"
+        params.extend(subtask_ids)
+
+    conn.execute(f"DELETE FROM effective_subtask_visibility WHERE {scope}", params)
+
+    # Candidates are the memberships that any rule mentions
+    conn.execute(f'''
+        INSERT OR IGNORE INTO effective_subtask_visibility (student_id, klasse_id, subtask_id)
+        SELECT student_id, klasse_id, subtask_id FROM (
+            SELECT sk.student_id, sk.klasse_id, sv.subtask_id
+            FROM subtask_visibility sv
+            JOIN student_klasse sk ON sk.student_id = sv.student_id
+            UNION
+            SELECT sk.student_id, sk.klasse_id, sv.subtask_id
+            FROM subtask_visibility sv
+            JOIN student_klasse sk ON sk.klasse_id = sv.klasse_id
+        ) c
+        WHERE {scope}
+        AND (
+            EXISTS (
+                SELECT 1 FROM subtask_visibility sv
+                WHERE sv.subtask_id = c.subtask_id AND sv.student_id = c.student_id AND sv.enabled = 1
+            )
+            OR (
+                NOT EXISTS (
+                    SELECT 1 FROM subtask_visibility sv
+                    WHERE sv.subtask_id = c.subtask_id AND sv.student_id = c.student_id
+                )
+                AND EXISTS (
+                    SELECT 1 FROM subtask_visibility sv
+                    WHERE sv.subtask_id = c.subtask_id AND sv.klasse_id = c.klasse_id AND sv.enabled = 1
+                )
+            )
+        )
+    ''', params)
+
+    refresh_task_completion_counters(conn, student_id=student_id, klasse_id=klasse_id,
+                                     subtask_ids=subtask_ids)
+
+
+def refresh_task_completion_counters(conn, student_id=None, klasse_id=None, task_ids=None, subtask_ids=None):
+    """Recompute the completion counters of student_task for the given slice.
+
+    visible_subtasks and completed_subtasks count the student's visible
+    subtasks of the task and how many of them are done; quiz_passed is 1
+    when the task has no quiz or the quiz was passed (directly or via game
+    mode). toggle_student_subtask() and save_quiz_attempt() update the
+    counters incrementally; this recomputes them from scratch after
+    visibility, membership or task changes. With no arguments every
+    student_task is recomputed.
+
+    Args:
+        conn: Open database connection
+        student_id: Only tasks of this student
+        klasse_id: Only tasks in this class
+        task_ids: Only assignments of these tasks
+        subtask_ids: Only assignments of the tasks these subtasks belong to
+    """
+    scope = "1=1"
+    params = []
+    if student_id is not None:
+        scope += " AND student_id = ?"
+        params.append(student_id)
+    if klasse_id is not None:
+        scope += " AND klasse_id = ?"
+        params.append(klasse_id)
+    if task_ids is not None:
+        task_ids = list(task_ids)
+        if not task_ids:
+            return
+        scope += f" AND task_id IN ({','.join('?' * len(task_ids))})"
+        params.extend(task_ids)
+    if subtask_ids is not None:
+        subtask_ids = list(subtask_ids)
+        if not subtask_ids:
+            return
+        scope += f" AND task_id IN (SELECT task_id FROM subtask WHERE id IN ({','.join('?' * len(subtask_ids))}))"
+        params.extend(subtask_ids)
+
+    conn.execute(f'''
+        UPDATE student_task SET
+            visible_subtasks = (
+                SELECT COUNT(*) FROM effective_subtask_visibility esv
+                JOIN subtask sub ON sub.id = esv.subtask_id
+                WHERE esv.student_id = student_task.student_id
+                AND esv.klasse_id = student_task.klasse_id
+                AND sub.task_id = student_task.task_id
+            ),
+            completed_subtasks = (
+                SELECT COUNT(*) FROM effective_subtask_visibility esv
+                JOIN subtask sub ON sub.id = esv.subtask_id
+                JOIN student_subtask ss ON ss.subtask_id = esv.subtask_id
+                    AND ss.student_task_id = student_task.id AND ss.erledigt = 1
+                WHERE esv.student_id = student_task.student_id
+                AND esv.klasse_id = student_task.klasse_id
+                AND sub.task_id = student_task.task_id
+            ),
+            quiz_passed = (
+                SELECT CASE
+                    WHEN t.quiz_json IS NULL OR t.quiz_json = '' THEN 1
+                    WHEN EXISTS (
+                        SELECT 1 FROM quiz_attempt qa
+                        WHERE qa.student_task_id = student_task.id AND qa.bestanden = 1
+                    ) THEN 1
+                    WHEN NOT json_valid(t.quiz_json) THEN 0
+                    WHEN (
+                        SELECT COUNT(*) FROM game_task_progress g
+                        WHERE g.student_task_id = student_task.id AND g.answered_correctly = 1
+                    ) >= COALESCE(json_array_length(t.quiz_json, '$.questions'), 0) THEN 1
+                    ELSE 0
+                END
+                FROM task t WHERE t.id = student_task.task_id
+            )
+        WHERE {scope}
+    ''', params)
+
+
+def _complete_task_if_done(conn, student_task_id):
+    """Mark a task complete if its counters say so.
+
+    Args:
+        conn: Open database connection
+        student_task_id: The student_task ID
+
+    Returns:
+        True if all visible subtasks are done and the quiz requirement is met
+    """
+    row = conn.execute('''
+        SELECT abgeschlossen,
+               completed_subtasks >= visible_subtasks AND quiz_passed = 1 AS done
+        FROM student_task WHERE id = ?
+    ''', (student_task_id,)).fetchone()
+
+    if not row:
+        return False
+    if row['done'] and not row['abgeschlossen']:
+        conn.execute("UPDATE student_task SET abgeschlossen = 1 WHERE id = ?", (student_task_id,))
+    return bool(row['done'])
+
+
+def get_visible_subtasks_for_student(student_id, klasse_id, task_id):
+    """Get list of subtasks visible to a student based on visibility rules.
+
+    Reads the precomputed effective_subtask_visibility table (see
+    refresh_effective_subtask_visibility for the rule priority).
+
+    Args:
+        student_id: The student ID
+        klasse_id: The class ID the student is viewing the task in
+        task_id: The task ID
 
     Returns:
         List of subtask dicts that are visible to this student
     """
     with db_session() as conn:
         rows = conn.execute('''
-            SELECT s.* FROM subtask s
-            WHERE s.task_id = ?
-            AND s.id IN (
-                -- Student-specific rules (highest priority)
-                SELECT sv.subtask_id FROM subtask_visibility sv
-                WHERE sv.student_id = ? AND sv.enabled = 1
-
-                UNION
-
-                -- Class rules (if no student-specific rule exists)
-                SELECT sv.subtask_id FROM subtask_visibility sv
-                WHERE sv.klasse_id = ? AND sv.enabled = 1
-                AND NOT EXISTS (
-                    SELECT 1 FROM subtask_visibility sv2
-                    WHERE sv2.subtask_id = sv.subtask_id
-                    AND sv2.student_id = ?
-                )
-            )
+            SELECT s.* FROM effective_subtask_visibility esv
+            JOIN subtask s ON s.id = esv.subtask_id
+            WHERE esv.student_id = ? AND esv.klasse_id = ?
+            AND s.task_id = ?
             ORDER BY s.reihenfolge
-        ''', (task_id, student_id, klasse_id, student_id)).fetchall()
+        ''', (student_id, klasse_id, task_id)).fetchall()
         return [dict(r) for r in rows]
 
 
@@ -1371,6 +2371,62 @@ def get_subtask_visibility_settings(klasse_id=None, student_id=None, task_id=Non
         return result
 
 
+def _apply_visibility_rules(conn, owner_column, owner_id, desired, admin_id):
+    """Write the rules of one class or student, touching only changed rows.
+
+    Args:
+        conn: Open database connection
+        owner_column: 'klasse_id' or 'student_id'
+        owner_id: The class or student ID
+        desired: Dict subtask_id -> True/False (rule) or None (no rule)
+        admin_id: Admin making the change (for audit trail)
+
+    Returns:
+        Number of rules inserted, updated or removed
+    """
+    if owner_column not in ('klasse_id', 'student_id'):
+        raise ValueError(f"Invalid visibility owner: {owner_column}")
+    if not desired:
+        return 0
+
+    subtask_ids = list(desired)
+    current = {
+        row['subtask_id']: row['enabled']
+        for row in conn.execute(f'''
+            SELECT subtask_id, enabled FROM subtask_visibility
+            WHERE {owner_column} = ? AND subtask_id IN ({','.join('?' * len(subtask_ids))})
+        ''', [owner_id] + subtask_ids).fetchall()
+    }
+
+    inserts, updates, deletes = [], [], []
+    for subtask_id, enabled in desired.items():
+        if enabled is None:
+            if subtask_id in current:
+                deletes.append((owner_id, subtask_id))
+        elif subtask_id not in current:
+            inserts.append((subtask_id, owner_id, 1 if enabled else 0, admin_id))
+        elif current[subtask_id] != (1 if enabled else 0):
+            updates.append((1 if enabled else 0, admin_id, owner_id, subtask_id))
+
+    conn.executemany(
+        f"DELETE FROM subtask_visibility WHERE {owner_column} = ? AND subtask_id = ?",
+        deletes
+    )
+    conn.executemany(f'''
+        UPDATE subtask_visibility SET enabled = ?, set_by_admin_id = ?, set_at = CURRENT_TIMESTAMP
+        WHERE {owner_column} = ? AND subtask_id = ?
+    ''', updates)
+    conn.executemany(f'''
+        INSERT INTO subtask_visibility (subtask_id, {owner_column}, enabled, set_by_admin_id)
+        VALUES (?, ?, ?, ?)
+    ''', inserts)
+
+    changed = [row[-1] for row in deletes + updates] + [row[0] for row in inserts]
+    if changed:
+        refresh_effective_subtask_visibility(conn, subtask_ids=changed, **{owner_column: owner_id})
+    return len(changed)
+
+
 def set_subtask_visibility_for_class(klasse_id, subtask_id, enabled, admin_id):
     """Set visibility of a subtask for an entire class.
 
@@ -1381,17 +2437,7 @@ def set_subtask_visibility_for_class(klasse_id, subtask_id, enabled, admin_id):
         admin_id: Admin making the change (for audit trail)
     """
     with db_session() as conn:
-        # Delete existing rule for this class+subtask
-        conn.execute('''
-            DELETE FROM subtask_visibility
-            WHERE klasse_id = ? AND subtask_id = ?
-        ''', (klasse_id, subtask_id))
-
-        # Insert new rule
-        conn.execute('''
-            INSERT INTO subtask_visibility (subtask_id, klasse_id, enabled, set_by_admin_id)
-            VALUES (?, ?, ?, ?)
-        ''', (subtask_id, klasse_id, 1 if enabled else 0, admin_id))
+        _apply_visibility_rules(conn, 'klasse_id', klasse_id, {subtask_id: bool(enabled)}, admin_id)
 
 
 def set_subtask_visibility_for_student(student_id, subtask_id, enabled, admin_id):
@@ -1406,17 +2452,7 @@ def set_subtask_visibility_for_student(student_id, subtask_id, enabled, admin_id
         admin_id: Admin making the change (for audit trail)
     """
     with db_session() as conn:
-        # Delete existing rule for this student+subtask
-        conn.execute('''
-            DELETE FROM subtask_visibility
-            WHERE student_id = ? AND subtask_id = ?
-        ''', (student_id, subtask_id))
-
-        # Insert new rule
-        conn.execute('''
-            INSERT INTO subtask_visibility (subtask_id, student_id, enabled, set_by_admin_id)
-            VALUES (?, ?, ?, ?)
-        ''', (subtask_id, student_id, 1 if enabled else 0, admin_id))
+        _apply_visibility_rules(conn, 'student_id', student_id, {subtask_id: bool(enabled)}, admin_id)
 
 
 def bulk_set_subtask_visibility(klasse_id=None, student_id=None, subtask_ids=None, enabled=True, admin_id=None):
@@ -1432,12 +2468,67 @@ def bulk_set_subtask_visibility(klasse_id=None, student_id=None, subtask_ids=Non
     if not subtask_ids:
         return
 
+    desired = {subtask_id: bool(enabled) for subtask_id in subtask_ids}
+    with db_session() as conn:
+        if klasse_id:
+            _apply_visibility_rules(conn, 'klasse_id', klasse_id, desired, admin_id)
+        elif student_id:
+            _apply_visibility_rules(conn, 'student_id', student_id, desired, admin_id)
+
+
+def save_subtask_visibility(settings, admin_id, klasse_id, student_id=None):
+    """Save a submitted visibility grid for a class or a single student.
+
+    For a student, settings equal to the class default remove the student's
+    override; only differing settings are stored as overrides. Unchanged
+    rules are not rewritten.
+
+    Args:
+        settings: Dict subtask_id -> enabled (bool)
+        admin_id: Admin making the change
+        klasse_id: The class (for a student: the class whose defaults apply)
+        student_id: Set to save student overrides instead of class rules
+
+    Returns:
+        Dict with 'changed' (number of rules written or removed) and
+        'visibility' (subtask_id -> bool, the effective state after saving:
+        the class rule, or what the student now sees in this class)
+    """
+    settings = {int(subtask_id): bool(enabled) for subtask_id, enabled in settings.items()}
+    subtask_ids = list(settings)
+    if not subtask_ids:
+        return {'changed': 0, 'visibility': {}}
+    placeholders = ','.join('?' * len(subtask_ids))
+
     with db_session() as conn:
-        for subtask_id in subtask_ids:
-            if klasse_id:
-                set_subtask_visibility_for_class(klasse_id, subtask_id, enabled, admin_id)
-            elif student_id:
-                set_subtask_visibility_for_student(student_id, subtask_id, enabled, admin_id)
+        if student_id is None:
+            changed = _apply_visibility_rules(conn, 'klasse_id', klasse_id, settings, admin_id)
+            rows = conn.execute(f'''
+                SELECT subtask_id FROM subtask_visibility
+                WHERE klasse_id = ? AND enabled = 1 AND subtask_id IN ({placeholders})
+            ''', [klasse_id] + subtask_ids).fetchall()
+        else:
+            class_enabled = {
+                row['subtask_id'] for row in conn.execute(f'''
+                    SELECT subtask_id FROM subtask_visibility
+                    WHERE klasse_id = ? AND enabled = 1 AND subtask_id IN ({placeholders})
+                ''', [klasse_id] + subtask_ids).fetchall()
+            }
+            desired = {
+                subtask_id: None if enabled == (subtask_id in class_enabled) else enabled
+                for subtask_id, enabled in settings.items()
+            }
+            changed = _apply_visibility_rules(conn, 'student_id', student_id, desired, admin_id)
+            rows = conn.execute(f'''
+                SELECT subtask_id FROM effective_subtask_visibility
+                WHERE student_id = ? AND klasse_id = ? AND subtask_id IN ({placeholders})
+            ''', [student_id, klasse_id] + subtask_ids).fetchall()
+
+        visible = {row['subtask_id'] for row in rows}
+        return {
+            'changed': changed,
+            'visibility': {subtask_id: subtask_id in visible for subtask_id in subtask_ids}
+        }
 
 
 def reset_subtask_visibility_to_class_default(student_id, task_id):
@@ -1461,12 +2552,17 @@ def reset_subtask_visibility_to_class_default(student_id, task_id):
                 WHERE student_id = ? AND subtask_id = ?
             ''', (student_id, s['id']))
 
+        refresh_effective_subtask_visibility(
+            conn, student_id=student_id, subtask_ids=[s['id'] for s in subtasks]
+        )
+
 
 def get_student_task(student_id, klasse_id):
     """Get student's current task for a class."""
     with db_session() as conn:
         row = conn.execute('''
-            SELECT st.*, t.name, t.beschreibung, t.lernziel, t.fach, t.stufe, t.kategorie, t.quiz_json, t.why_learn_this
+            SELECT st.*, t.name, t.beschreibung, t.lernziel, t.fach, t.stufe, t.kategorie, t.quiz_json, t.why_learn_this,
+                   t.beschreibung_html, t.lernziel_html
             FROM student_task st
             JOIN task t ON st.task_id = t.id
             WHERE st.student_id = ? AND st.klasse_id = ?
@@ -1475,6 +2571,68 @@ def get_student_task(student_id, klasse_id):
     return result
 
 
+def get_student_dashboard_data(student_id):
+    """Get everything the student dashboard shows in two queries.
+
+    Replaces the per-class loop over get_student_task(),
+    get_visible_subtasks_for_student() and get_student_subtask_progress().
+
+    Returns:
+        Dict with:
+            'klassen': list of class dicts (ordered by name)
+            'tasks_by_klasse': klasse_id -> student task dict (or None) with
+                'subtasks' (visible subtasks incl. 'erledigt'),
+                'total_subtasks' and 'completed_subtasks'
+    """
+    with db_session() as conn:
+        rows = conn.execute('''
+            SELECT k.id AS k_id, k.name AS k_name,
+                   st.*, t.name, t.beschreibung, t.lernziel, t.fach, t.stufe, t.kategorie, t.quiz_json, t.why_learn_this,
+                   t.beschreibung_html, t.lernziel_html
+            FROM student_klasse sk
+            JOIN klasse k ON k.id = sk.klasse_id
+            LEFT JOIN student_task st ON st.student_id = sk.student_id AND st.klasse_id = sk.klasse_id
+            LEFT JOIN task t ON t.id = st.task_id
+            WHERE sk.student_id = ?
+            ORDER BY k.name
+        ''', (student_id,)).fetchall()
+
+        # Visible subtasks with progress for all tasks of the student at once
+        subtask_rows = conn.execute('''
+            SELECT st.klasse_id AS k_id, sub.*, COALESCE(ss.erledigt, 0) as erledigt
+            FROM student_task st
+            JOIN effective_subtask_visibility esv
+                ON esv.student_id = st.student_id AND esv.klasse_id = st.klasse_id
+            JOIN subtask sub ON sub.id = esv.subtask_id AND sub.task_id = st.task_id
+            LEFT JOIN student_subtask ss ON ss.student_task_id = st.id AND ss.subtask_id = sub.id
+            WHERE st.student_id = ?
+            ORDER BY sub.reihenfolge
+        ''', (student_id,)).fetchall()
+
+    subtasks_by_klasse = {}
+    for r in subtask_rows:
+        subtask = dict(r)
+        subtasks_by_klasse.setdefault(subtask.pop('k_id'), []).append(subtask)
+
+    klassen = []
+    tasks_by_klasse = {}
+    for r in rows:
+        row = dict(r)
+        klasse_id = row.pop('k_id')
+        klassen.append({'id': klasse_id, 'name': row.pop('k_name')})
+
+        task = None
+        if row['id'] is not None and row['name'] is not None:
+            task = row
+            subtasks = subtasks_by_klasse.get(klasse_id, [])
+            task['subtasks'] = subtasks
+            task['total_subtasks'] = len(subtasks)
+            task['completed_subtasks'] = sum(1 for s in subtasks if s['erledigt'])
+        tasks_by_klasse[klasse_id] = task
+
+    return {'klassen': klassen, 'tasks_by_klasse': tasks_by_klasse}
+
+
 def get_student_subtask_progress(student_task_id):
     """Get subtask completion status for a student's task."""
     with db_session() as conn:
@@ -1491,17 +2649,46 @@ def get_student_subtask_progress(student_task_id):
 
 
 def toggle_student_subtask(student_task_id, subtask_id, erledigt):
-    """Toggle a subtask completion for a student."""
+    """Toggle a subtask completion for a student.
+
+    Updates the completion counters of the student_task in the same
+    transaction and marks the task complete once all visible subtasks are
+    done and the quiz requirement is met.
+
+    Returns:
+        True if the task is complete after the toggle
+    """
+    erledigt = 1 if erledigt else 0
     with db_session() as conn:
+        previous = conn.execute(
+            "SELECT erledigt FROM student_subtask WHERE student_task_id = ? AND subtask_id = ?",
+            (student_task_id, subtask_id)
+        ).fetchone()
         conn.execute('''
             INSERT OR REPLACE INTO student_subtask (student_task_id, subtask_id, erledigt)
             VALUES (?, ?, ?)
-        ''', (student_task_id, subtask_id, 1 if erledigt else 0))
+        ''', (student_task_id, subtask_id, erledigt))
+
+        # Only visible subtasks of this task count towards completion
+        delta = erledigt - (previous['erledigt'] if previous else 0)
+        if delta:
+            conn.execute('''
+                UPDATE student_task SET completed_subtasks = completed_subtasks + ?
+                WHERE id = ? AND EXISTS (
+                    SELECT 1 FROM effective_subtask_visibility esv
+                    JOIN subtask sub ON sub.id = esv.subtask_id
+                    WHERE esv.student_id = student_task.student_id
+                    AND esv.klasse_id = student_task.klasse_id
+                    AND esv.subtask_id = ? AND sub.task_id = student_task.task_id
+                )
+            ''', (delta, student_task_id, subtask_id))
 
         # If marking as complete, advance to next subtask
         if erledigt:
             _advance_to_next_subtask_internal(conn, student_task_id, subtask_id)
 
+        return _complete_task_if_done(conn, student_task_id)
+
 
 def set_current_subtask(student_task_id, subtask_id):
     """Set the current subtask for a student's task.
@@ -1527,47 +2714,23 @@ def _advance_to_next_subtask_internal(conn, student_task_id, current_subtask_id)
         student_task_id: The student_task ID
         current_subtask_id: The subtask that was just completed
     """
-    # Get the task_id and current order
-    st = conn.execute(
-        "SELECT task_id, current_subtask_id FROM student_task WHERE id = ?",
-        (student_task_id,)
-    ).fetchone()
-
-    if not st:
-        return
-
-    task_id = st['task_id']
-
-    # Get all subtasks ordered by reihenfolge
-    subtasks = conn.execute(
-        "SELECT id, reihenfolge FROM subtask WHERE task_id = ? ORDER BY reihenfolge",
-        (task_id,)
-    ).fetchall()
-
-    if not subtasks:
-        return
-
-    # Find first incomplete subtask (from the beginning, not just after current)
-    for sub in subtasks:
-        subtask_id = sub['id']
-
-        # Check if this subtask is complete
-        completed = conn.execute(
-            "SELECT erledigt FROM student_subtask WHERE student_task_id = ? AND subtask_id = ?",
-            (student_task_id, subtask_id)
-        ).fetchone()
-
-        if not completed or not completed['erledigt']:
-            # Found first incomplete subtask
-            conn.execute(
-                "UPDATE student_task SET current_subtask_id = ? WHERE id = ?",
-                (subtask_id, student_task_id)
-            )
-            return
-
-    # If we get here, all subtasks are complete
-    # Check if task should be marked complete (all subtasks done + quiz passed or no quiz)
-    check_task_completion(student_task_id)
+    # First incomplete subtask (from the beginning, not just after current)
+    next_subtask = conn.execute('''
+        SELECT sub.id FROM student_task st
+        JOIN subtask sub ON sub.task_id = st.task_id
+        LEFT JOIN student_subtask ss ON ss.student_task_id = st.id AND ss.subtask_id = sub.id
+        WHERE st.id = ? AND COALESCE(ss.erledigt, 0) = 0
+        ORDER BY sub.reihenfolge
+        LIMIT 1
+    ''', (student_task_id,)).fetchone()
+
+    # If all subtasks are complete, the current subtask stays as it is;
+    # task completion is tracked by the counters on student_task
+    if next_subtask:
+        conn.execute(
+            "UPDATE student_task SET current_subtask_id = ? WHERE id = ?",
+            (next_subtask['id'], student_task_id)
+        )
 
 
 def advance_to_next_subtask(student_task_id, current_subtask_id):
@@ -1616,79 +2779,24 @@ def check_task_completion(student_task_id):
     """Check if task should be marked complete (all VISIBLE subtasks + quiz passed).
 
     Q5A Implementation: Only counts visible subtasks for completion.
+    Reads the counters kept by refresh_task_completion_counters().
     """
     with db_session() as conn:
-        # Get student_id, klasse_id, task_id for visibility check
-        student_task_info = conn.execute('''
-            SELECT student_id, klasse_id, task_id FROM student_task WHERE id = ?
-        ''', (student_task_id,)).fetchone()
-
-        if not student_task_info:
-            return False
-
-        student_id = student_task_info['student_id']
-        klasse_id = student_task_info['klasse_id']
-        task_id = student_task_info['task_id']
-
-        # Q5A: Get visible subtasks for this student
-        visible_subtasks = get_visible_subtasks_for_student(student_id, klasse_id, task_id)
-        visible_subtask_ids = [s['id'] for s in visible_subtasks]
-
-        if not visible_subtask_ids:
-            # No visible subtasks - consider complete if quiz passed (or no quiz)
-            pass
-        else:
-            # Check only VISIBLE subtasks completed
-            placeholders = ','.join('?' * len(visible_subtask_ids))
-            subtasks = conn.execute(f'''
-                SELECT COUNT(*) as total,
-                       SUM(CASE WHEN COALESCE(ss.erledigt, 0) = 1 THEN 1 ELSE 0 END) as completed
-                FROM subtask sub
-                LEFT JOIN student_subtask ss ON sub.id = ss.subtask_id AND ss.student_task_id = ?
-                WHERE sub.id IN ({placeholders})
-            ''', [student_task_id] + visible_subtask_ids).fetchone()
-
-            if subtasks['total'] > 0 and subtasks['total'] != subtasks['completed']:
-                return False
-
-        # Check quiz passed (traditional method)
-        quiz_passed = conn.execute('''
-            SELECT bestanden FROM quiz_attempt
-            WHERE student_task_id = ? AND bestanden = 1
-            LIMIT 1
-        ''', (student_task_id,)).fetchone()
-
-        # Get task to check if it has a quiz
-        task_info = conn.execute('''
-            SELECT t.quiz_json, st.student_id FROM task t
-            JOIN student_task st ON t.id = st.task_id
-            WHERE st.id = ?
+        row = conn.execute('''
+            SELECT completed_subtasks >= visible_subtasks AND quiz_passed = 1 AS done
+            FROM student_task WHERE id = ?
         ''', (student_task_id,)).fetchone()
-
-        has_quiz = task_info and task_info['quiz_json']
-
-        if has_quiz and not quiz_passed:
-            # Check if quiz passed via game mode
-            import json
-            quiz = json.loads(task_info['quiz_json'])
-            total_questions = len(quiz.get('questions', []))
-
-            if total_questions > 0:
-                game_correct = conn.execute('''
-                    SELECT COUNT(*) as count FROM game_task_progress
-                    WHERE student_task_id = ? AND answered_correctly = 1
-                ''', (student_task_id,)).fetchone()
-
-                if game_correct['count'] < total_questions:
-                    return False
-
-        return True
+        return bool(row and row['done'])
 
 
 # ============ Quiz functions ============
 
 def save_quiz_attempt(student_task_id, punkte, max_punkte, antworten_json):
-    """Save a quiz attempt."""
+    """Save a quiz attempt.
+
+    A passed attempt sets the quiz_passed counter and, if all visible
+    subtasks are done, marks the task complete in the same transaction.
+    """
     # UX Tier 1: Reduced threshold from 80% to 70% to reduce anxiety
     bestanden = (punkte / max_punkte) >= 0.7 if max_punkte > 0 else False
     with db_session() as conn:
@@ -1696,6 +2804,9 @@ def save_quiz_attempt(student_task_id, punkte, max_punkte, antworten_json):
             INSERT INTO quiz_attempt (student_task_id, punkte, max_punkte, bestanden, antworten_json)
             VALUES (?, ?, ?, ?, ?)
         ''', (student_task_id, punkte, max_punkte, 1 if bestanden else 0, antworten_json))
+        if bestanden:
+            conn.execute("UPDATE student_task SET quiz_passed = 1 WHERE id = ?", (student_task_id,))
+            _complete_task_if_done(conn, student_task_id)
         return cursor.lastrowid, bestanden
 
 
@@ -1799,12 +2910,98 @@ def get_student_unterricht(student_id, klasse_id):
         return [dict(r) for r in rows]
 
 
+# ============ Keyset Pagination ============
+
+def encode_page_token(direction, timestamp, row_id):
+    """Encode a cursor position as an opaque URL-safe token.
+
+    Args:
+        direction: 'next' (older rows) or 'prev' (newer rows)
+        timestamp, row_id: Sort key of the row the page starts after
+    """
+    raw = json.dumps([direction, timestamp, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_page_token(token):
+    """Decode a page token; returns (direction, timestamp, row_id) or None if invalid."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, timestamp, row_id = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if direction not in ('next', 'prev') or not isinstance(row_id, int):
+        return None
+    return direction, timestamp, row_id
+
+
+def fetch_keyset_page(conn, query, params, limit, page_token=None):
+    """Fetch one page of rows ordered newest first by (timestamp, id).
+
+    Instead of OFFSET, the page continues after the (timestamp, id) of the
+    last row shown, so every page costs the same index seek as the first.
+
+    Args:
+        conn: Open database connection
+        query: SELECT ... WHERE ... without ORDER BY/LIMIT; must select id and timestamp
+        params: Parameters for query
+        limit: Page size
+        page_token: Token from a previous page's next_token/prev_token
+
+    Returns:
+        Dict with 'items' (list of dicts, newest first), 'next_token' and
+        'prev_token' (None where there is no further page)
+    """
+    cursor = decode_page_token(page_token)
+    params = list(params)
+
+    if cursor is None:
+        direction = 'next'
+        order = "timestamp DESC, id DESC"
+    else:
+        direction, timestamp, row_id = cursor
+        if direction == 'next':
+            query += " AND timestamp <= ? AND (timestamp < ? OR id < ?)"
+            order = "timestamp DESC, id DESC"
+        else:
+            query += " AND timestamp >= ? AND (timestamp > ? OR id > ?)"
+            order = "timestamp ASC, id ASC"
+        params.extend([timestamp, timestamp, row_id])
+
+    query += f" ORDER BY {order} LIMIT ?"
+    params.append(limit + 1)
+
+    rows = [dict(r) for r in conn.execute(query, params).fetchall()]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == 'prev':
+        rows.reverse()
+
+    # Looking backwards, "more" means newer rows; there are always older
+    # ones, since that is where the token came from (and vice versa)
+    has_newer = has_more if direction == 'prev' else cursor is not None
+    has_older = has_more if direction == 'next' else True
+
+    next_token = prev_token = None
+    if rows and has_older:
+        next_token = encode_page_token('next', rows[-1]['timestamp'], rows[-1]['id'])
+    if rows and has_newer:
+        prev_token = encode_page_token('prev', rows[0]['timestamp'], rows[0]['id'])
+
+    return {'items': rows, 'next_token': next_token, 'prev_token': prev_token}
+
+
 # ============ Error Logging functions ============
 
 def log_error(level, message, traceback=None, user_id=None, user_type=None, route=None, method=None, url=None):
-    """Log an error to the database."""
+    """Log an error to the database.
+
+    Written on its own transaction so the entry survives a rolled-back request.
+    """
     try:
-        with db_session() as conn:
+        with db_session(request_scoped=False) as conn:
             conn.execute('''
                 INSERT INTO error_log (level, message, traceback, user_id, user_type, route, method, url)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
@@ -1831,6 +3028,23 @@ def get_error_logs(limit=100, offset=0, level_filter=None):
         return [dict(r) for r in rows]
 
 
+def get_error_logs_page(limit=50, page_token=None, level_filter=None):
+    """Get one page of error logs (newest first) using keyset pagination.
+
+    Returns:
+        Dict with 'items', 'next_token', 'prev_token' (see fetch_keyset_page)
+    """
+    with db_session() as conn:
+        query = "SELECT * FROM error_log WHERE 1=1"
+        params = []
+
+        if level_filter:
+            query += " AND level = ?"
+            params.append(level_filter)
+
+        return fetch_keyset_page(conn, query, params, limit, page_token)
+
+
 def get_error_log_count(level_filter=None):
     """Get total count of error logs."""
     with db_session() as conn:
@@ -1913,6 +3127,76 @@ def log_analytics_event(event_type, user_id=None, user_type=None, metadata=None)
     enqueue_event(event_type, user_id, user_type, metadata_json)
 
 
+def timestamp_range_filter(date_from=None, date_to=None, column='timestamp'):
+    """Build a half-open timestamp range for inclusive YYYY-MM-DD bounds.
+
+    Compares the bare column against constants (``timestamp >= ? AND
+    timestamp < date(?, '+1 day')``) instead of wrapping it in date(), so
+    SQLite can use the timestamp part of an index.
+
+    Returns:
+        Tuple (sql, params); sql is '1=1' if neither bound is given
+    """
+    clauses = []
+    params = []
+    if date_from:
+        clauses.append(f"{column} >= ?")
+        params.append(date_from)
+    if date_to:
+        clauses.append(f"{column} < date(?, '+1 day')")
+        params.append(date_to)
+    return ' AND '.join(clauses) or '1=1', params
+
+
+def analytics_events_query(select, event_type=None, user_id=None, user_type=None,
+                           date_from=None, date_to=None):
+    """Build a filtered query over analytics_events.
+
+    Pins the composite index matching the filters: per-user lookups use
+    idx_analytics_user, event type filters idx_analytics_type, a date range
+    alone idx_analytics_timestamp. The date range is always applied to the
+    trailing timestamp column of that index. Without any of these filters
+    (nothing or only user_type) there is nothing to seek, so the planner
+    picks the plan itself instead of walking an index for every row.
+
+    Args:
+        select: Column list, e.g. '*' or 'COUNT(*) as count'
+        event_type, user_id, user_type, date_from, date_to: Optional filters
+
+    Returns:
+        Tuple (sql, params) ready for further ORDER BY/LIMIT clauses
+    """
+    if user_id is not None:
+        hint = ' INDEXED BY idx_analytics_user'
+    elif event_type:
+        hint = ' INDEXED BY idx_analytics_type'
+    elif date_from or date_to:
+        hint = ' INDEXED BY idx_analytics_timestamp'
+    else:
+        hint = ''
+
+    query = f"SELECT {select} FROM analytics_events{hint} WHERE 1=1"
+    params = []
+
+    if event_type:
+        query += " AND event_type = ?"
+        params.append(event_type)
+
+    if user_id is not None:
+        query += " AND user_id = ?"
+        params.append(user_id)
+
+    if user_type:
+        query += " AND user_type = ?"
+        params.append(user_type)
+
+    range_sql, range_params = timestamp_range_filter(date_from, date_to)
+    query += f" AND {range_sql}"
+    params.extend(range_params)
+
+    return query, params
+
+
 def get_analytics_events(limit=100, offset=0, event_type=None, user_id=None, user_type=None, date_from=None, date_to=None):
     """Get analytics events with optional filtering.
 
@@ -1926,29 +3210,9 @@ def get_analytics_events(limit=100, offset=0, event_type=None, user_id=None, use
         date_to: Filter events until this date (YYYY-MM-DD)
     """
     with db_session() as conn:
-        query = "SELECT * FROM analytics_events WHERE 1=1"
-        params = []
-
-        if event_type:
-            query += " AND event_type = ?"
-            params.append(event_type)
-
-        if user_id is not None:
-            query += " AND user_id = ?"
-            params.append(user_id)
-
-        if user_type:
-            query += " AND user_type = ?"
-            params.append(user_type)
-
-        if date_from:
-            query += " AND date(timestamp) >= ?"
-            params.append(date_from)
-
-        if date_to:
-            query += " AND date(timestamp) <= ?"
-            params.append(date_to)
-
+        query, params = analytics_events_query(
+            '*', event_type, user_id, user_type, date_from, date_to
+        )
         query += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
         params.extend([limit, offset])
 
@@ -1970,10 +3234,52 @@ def get_analytics_events(limit=100, offset=0, event_type=None, user_id=None, use
         return events
 
 
+def get_analytics_events_page(limit=50, page_token=None, event_type=None, user_id=None,
+                              user_type=None, date_from=None, date_to=None):
+    """Get one page of analytics events (newest first) using keyset pagination.
+
+    Takes the same filters as get_analytics_events.
+
+    Returns:
+        Dict with 'items', 'next_token', 'prev_token' (see fetch_keyset_page);
+        item metadata is parsed from JSON
+    """
+    with db_session() as conn:
+        query, params = analytics_events_query(
+            '*', event_type, user_id, user_type, date_from, date_to
+        )
+        page = fetch_keyset_page(conn, query, params, limit, page_token)
+
+    for event in page['items']:
+        if event['metadata']:
+            try:
+                event['metadata'] = json.loads(event['metadata'])
+            except:
+                event['metadata'] = {}
+        else:
+            event['metadata'] = {}
+    return page
+
+
 def get_analytics_count(event_type=None, user_id=None, user_type=None, date_from=None, date_to=None):
     """Get count of analytics events with optional filtering."""
     with db_session() as conn:
-        query = "SELECT COUNT(*) as count FROM analytics_events WHERE 1=1"
+        query, params = analytics_events_query(
+            'COUNT(*) as count', event_type, user_id, user_type, date_from, date_to
+        )
+        row = conn.execute(query, params).fetchone()
+        return row['count'] if row else 0
+
+
+def estimate_analytics_count(event_type=None, user_id=None, user_type=None, date_from=None, date_to=None):
+    """Approximate count of analytics events, read from the per-day rollups.
+
+    Cheap regardless of volume; may differ from get_analytics_count by the
+    events still waiting in the analytics queue.
+    """
+    with db_session() as conn:
+        table = 'analytics_user_daily' if user_id is not None else 'analytics_daily'
+        query = f"SELECT COALESCE(SUM(count), 0) as count FROM {table} WHERE 1=1"
         params = []
 
         if event_type:
@@ -1989,120 +3295,162 @@ def get_analytics_count(event_type=None, user_id=None, user_type=None, date_from
             params.append(user_type)
 
         if date_from:
-            query += " AND date(timestamp) >= ?"
+            query += " AND day >= ?"
             params.append(date_from)
 
         if date_to:
-            query += " AND date(timestamp) <= ?"
+            query += " AND day <= ?"
             params.append(date_to)
 
-        row = conn.execute(query, params).fetchone()
-        return row['count'] if row else 0
+        return conn.execute(query, params).fetchone()['count']
 
 
-def get_analytics_overview():
-    """Get overview statistics for analytics dashboard."""
-    with db_session() as conn:
-        # Active users today (unique users who logged in or had activity)
-        active_today = conn.execute('''
-            SELECT COUNT(DISTINCT user_id) as count
-            FROM analytics_events
-            WHERE date(timestamp) = date('now')
-            AND user_id IS NOT NULL
-        ''').fetchone()
+def _analytics_route(event_type, metadata):
+    """Route stored in the rollup for an event ('' unless it is a page view)."""
+    if event_type != 'page_view' or not metadata:
+        return ''
+    try:
+        data = json.loads(metadata) if isinstance(metadata, str) else metadata
+    except (TypeError, ValueError):
+        return ''
+    route = data.get('route') if isinstance(data, dict) else None
+    return str(route) if route else ''
 
-        # Active users this week
-        active_week = conn.execute('''
-            SELECT COUNT(DISTINCT user_id) as count
-            FROM analytics_events
-            WHERE timestamp >= datetime('now', '-7 days')
-            AND user_id IS NOT NULL
-        ''').fetchone()
 
-        # Page views today
-        views_today = conn.execute('''
-            SELECT COUNT(*) as count
-            FROM analytics_events
-            WHERE event_type = 'page_view'
-            AND date(timestamp) = date('now')
-        ''').fetchone()
+def update_analytics_rollups(conn, events):
+    """Add a batch of newly written events to the per-day rollup tables.
 
-        # Page views this week
-        views_week = conn.execute('''
-            SELECT COUNT(*) as count
-            FROM analytics_events
-            WHERE event_type = 'page_view'
-            AND timestamp >= datetime('now', '-7 days')
-        ''').fetchone()
+    Called by the analytics worker inside the transaction that inserts the
+    events, so raw events and rollups never drift apart. Any other code that
+    inserts into analytics_events must call it the same way; otherwise the
+    overview and count estimates drift until backfill_analytics_rollups.py
+    is run again.
 
-        # Tasks completed today
-        tasks_today = conn.execute('''
-            SELECT COUNT(*) as count
-            FROM analytics_events
-            WHERE event_type = 'task_complete'
-            AND date(timestamp) = date('now')
-        ''').fetchone()
+    Args:
+        conn: Open database connection (caller commits)
+        events: Iterable of dicts with timestamp ('YYYY-MM-DD HH:MM:SS'),
+            event_type, user_id, user_type and metadata (JSON string)
+    """
+    daily = {}
+    user_daily = {}
+    for e in events:
+        day = e['timestamp'][:10]
+        user_type = e['user_type'] or ''
+        key = (day, e['event_type'], user_type, _analytics_route(e['event_type'], e['metadata']))
+        daily[key] = daily.get(key, 0) + 1
+        if e['user_id'] is not None:
+            key = (day, e['user_id'], user_type, e['event_type'])
+            user_daily[key] = user_daily.get(key, 0) + 1
+
+    conn.executemany('''
+        INSERT INTO analytics_daily (day, event_type, user_type, route, count)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (day, event_type, user_type, route)
+        DO UPDATE SET count = count + excluded.count
+    ''', [key + (count,) for key, count in daily.items()])
+    conn.executemany('''
+        INSERT INTO analytics_user_daily (day, user_id, user_type, event_type, count)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (day, user_id, user_type, event_type)
+        DO UPDATE SET count = count + excluded.count
+    ''', [key + (count,) for key, count in user_daily.items()])
+
+
+def rebuild_analytics_rollups():
+    """Recompute both rollup tables from analytics_events.
+
+    Used for the initial backfill and to repair the rollups after events
+    were written or deleted outside the analytics worker.
 
-        # Tasks completed this week
-        tasks_week = conn.execute('''
-            SELECT COUNT(*) as count
+    Returns:
+        Tuple (daily_rows, user_daily_rows) of rows written
+    """
+    with db_session() as conn:
+        conn.execute("DELETE FROM analytics_daily")
+        conn.execute("DELETE FROM analytics_user_daily")
+        daily = conn.execute('''
+            INSERT INTO analytics_daily (day, event_type, user_type, route, count)
+            SELECT date(timestamp), event_type, COALESCE(user_type, ''),
+                   CASE WHEN event_type = 'page_view' AND json_valid(metadata)
+                        THEN COALESCE(json_extract(metadata, '$.route'), '')
+                        ELSE '' END AS route,
+                   COUNT(*)
             FROM analytics_events
-            WHERE event_type = 'task_complete'
-            AND timestamp >= datetime('now', '-7 days')
-        ''').fetchone()
-
-        # Logins today
-        logins_today = conn.execute('''
-            SELECT COUNT(*) as count
+            GROUP BY 1, 2, 3, 4
+        ''').rowcount
+        user_daily = conn.execute('''
+            INSERT INTO analytics_user_daily (day, user_id, user_type, event_type, count)
+            SELECT date(timestamp), user_id, COALESCE(user_type, ''), event_type, COUNT(*)
             FROM analytics_events
-            WHERE event_type = 'login'
-            AND date(timestamp) = date('now')
-        ''').fetchone()
+            WHERE user_id IS NOT NULL
+            GROUP BY 1, 2, 3, 4
+        ''').rowcount
+        return daily, user_daily
+
+
+def get_analytics_overview():
+    """Get overview statistics for analytics dashboard.
+
+    Reads the per-day rollup tables; "this week" means the last seven
+    calendar days including today.
+    """
+    with db_session() as conn:
+        today = conn.execute("SELECT date('now') as day").fetchone()['day']
+        week_start = conn.execute("SELECT date('now', '-6 days') as day").fetchone()['day']
+
+        # Active users today and this week (unique users with any activity)
+        active = conn.execute('''
+            SELECT COUNT(DISTINCT CASE WHEN day = ? THEN user_id END) as today,
+                   COUNT(DISTINCT user_id) as week
+            FROM analytics_user_daily
+            WHERE day >= ?
+        ''', (today, week_start)).fetchone()
 
-        # Event type breakdown
+        # Event type breakdown this week, plus today's counts per type
         by_type = conn.execute('''
-            SELECT event_type, COUNT(*) as count
-            FROM analytics_events
-            WHERE timestamp >= datetime('now', '-7 days')
+            SELECT event_type,
+                   SUM(count) as count,
+                   SUM(CASE WHEN day = ? THEN count ELSE 0 END) as today
+            FROM analytics_daily
+            WHERE day >= ?
             GROUP BY event_type
             ORDER BY count DESC
-        ''').fetchall()
+        ''', (today, week_start)).fetchall()
+        week_counts = {row['event_type']: row['count'] for row in by_type}
+        today_counts = {row['event_type']: row['today'] for row in by_type}
 
         # Most active students this week
         active_students = conn.execute('''
-            SELECT ae.user_id, s.vorname, s.nachname, COUNT(*) as event_count
-            FROM analytics_events ae
-            JOIN student s ON ae.user_id = s.id
-            WHERE ae.user_type = 'student'
-            AND ae.timestamp >= datetime('now', '-7 days')
-            GROUP BY ae.user_id, s.vorname, s.nachname
+            SELECT aud.user_id, s.vorname, s.nachname, SUM(aud.count) as event_count
+            FROM analytics_user_daily aud
+            JOIN student s ON aud.user_id = s.id
+            WHERE aud.user_type = 'student'
+            AND aud.day >= ?
+            GROUP BY aud.user_id, s.vorname, s.nachname
             ORDER BY event_count DESC
             LIMIT 10
-        ''').fetchall()
+        ''', (week_start,)).fetchall()
 
         # Popular routes this week
         popular_routes = conn.execute('''
-            SELECT
-                json_extract(metadata, '$.route') as route,
-                COUNT(*) as count
-            FROM analytics_events
+            SELECT NULLIF(route, '') as route, SUM(count) as count
+            FROM analytics_daily
             WHERE event_type = 'page_view'
-            AND timestamp >= datetime('now', '-7 days')
-            AND metadata IS NOT NULL
+            AND day >= ?
             GROUP BY route
             ORDER BY count DESC
             LIMIT 10
-        ''').fetchall()
+        ''', (week_start,)).fetchall()
 
         return {
-            'active_today': active_today['count'] if active_today else 0,
-            'active_week': active_week['count'] if active_week else 0,
-            'views_today': views_today['count'] if views_today else 0,
-            'views_week': views_week['count'] if views_week else 0,
-            'tasks_today': tasks_today['count'] if tasks_today else 0,
-            'tasks_week': tasks_week['count'] if tasks_week else 0,
-            'logins_today': logins_today['count'] if logins_today else 0,
-            'by_type': {row['event_type']: row['count'] for row in by_type},
+            'active_today': active['today'] if active else 0,
+            'active_week': active['week'] if active else 0,
+            'views_today': today_counts.get('page_view', 0),
+            'views_week': week_counts.get('page_view', 0),
+            'tasks_today': today_counts.get('task_complete', 0),
+            'tasks_week': week_counts.get('task_complete', 0),
+            'logins_today': today_counts.get('login', 0),
+            'by_type': week_counts,
             'active_students': [dict(r) for r in active_students],
             'popular_routes': [dict(r) for r in popular_routes]
         }
@@ -2121,45 +3469,31 @@ def get_student_activity_log(student_id, limit=100, offset=0):
 def get_student_activity_summary(student_id, date_from=None, date_to=None):
     """Get activity summary for a student (for reports)."""
     with db_session() as conn:
-        # Build date filter
-        date_filter = "1=1"
-        params = [student_id]
-
+        # Rollup days are plain YYYY-MM-DD strings, so inclusive bounds work as-is
+        day_filter = "1=1"
+        day_params = []
         if date_from:
-            date_filter += " AND date(timestamp) >= ?"
-            params.append(date_from)
-
+            day_filter += " AND day >= ?"
+            day_params.append(date_from)
         if date_to:
-            date_filter += " AND date(timestamp) <= ?"
-            params.append(date_to)
+            day_filter += " AND day <= ?"
+            day_params.append(date_to)
 
-        # Count by event type
+        # Count by event type and unique login days
         event_counts = conn.execute(f'''
-            SELECT event_type, COUNT(*) as count
-            FROM analytics_events
+            SELECT event_type, SUM(count) as count, COUNT(DISTINCT day) as days
+            FROM analytics_user_daily
             WHERE user_id = ? AND user_type = 'student'
-            AND {date_filter}
+            AND {day_filter}
             GROUP BY event_type
-        ''', params).fetchall()
-
-        # Unique login days
-        login_days = conn.execute(f'''
-            SELECT COUNT(DISTINCT date(timestamp)) as count
-            FROM analytics_events
-            WHERE user_id = ? AND user_type = 'student'
-            AND event_type = 'login'
-            AND {date_filter}
-        ''', params).fetchone()
+        ''', [student_id] + day_params).fetchall()
+        login_days = next((row['days'] for row in event_counts if row['event_type'] == 'login'), 0)
 
         # Tasks completed with details
-        tasks_completed = conn.execute(f'''
-            SELECT metadata, timestamp
-            FROM analytics_events
-            WHERE user_id = ? AND user_type = 'student'
-            AND event_type = 'task_complete'
-            AND {date_filter}
-            ORDER BY timestamp DESC
-        ''', params).fetchall()
+        query, params = analytics_events_query(
+            'metadata, timestamp', 'task_complete', student_id, 'student', date_from, date_to
+        )
+        tasks_completed = conn.execute(query + " ORDER BY timestamp DESC", params).fetchall()
 
         # Parse tasks
         tasks = []
@@ -2174,18 +3508,22 @@ def get_student_activity_summary(student_id, date_from=None, date_to=None):
 
         return {
             'event_counts': {row['event_type']: row['count'] for row in event_counts},
-            'login_days': login_days['count'] if login_days else 0,
+            'login_days': login_days,
             'tasks_completed': tasks
         }
 
 
 def cleanup_old_analytics_events(days=210):
-    """Delete analytics events older than specified days."""
+    """Delete analytics events (and their rollup days) older than specified days.
+
+    Events and rollups are cut at the same day boundary, so no day keeps
+    rollup counts whose raw events are gone (or the other way round).
+    """
     with db_session() as conn:
-        cursor = conn.execute(
-            "DELETE FROM analytics_events WHERE timestamp < datetime('now', ? || ' days')",
-            (f'-{days}',)
-        )
+        cutoff_day = conn.execute("SELECT date('now', ? || ' days')", (f'-{days}',)).fetchone()[0]
+        cursor = conn.execute("DELETE FROM analytics_events WHERE timestamp < ?", (cutoff_day,))
+        for table in ('analytics_daily', 'analytics_user_daily'):
+            conn.execute(f"DELETE FROM {table} WHERE day < ?", (cutoff_day,))
         return cursor.rowcount
 
 
@@ -2193,6 +3531,8 @@ def clear_all_analytics_events():
     """Clear all analytics events."""
     with db_session() as conn:
         cursor = conn.execute("DELETE FROM analytics_events")
+        conn.execute("DELETE FROM analytics_daily")
+        conn.execute("DELETE FROM analytics_user_daily")
         return cursor.rowcount
 
 
@@ -2246,7 +3586,11 @@ def delete_old_saved_reports(days=365):
 
 
 def get_report_data_for_class(klasse_id, date_from=None, date_to=None):
-    """Get all data needed for class report generation."""
+    """Get all data needed for class report generation.
+
+    Uses a fixed number of grouped queries for the whole class instead of
+    per-student lookups, so the cost grows with classes, not students.
+    """
     with db_session() as conn:
         # Get class info
         klasse = conn.execute(
@@ -2257,43 +3601,101 @@ def get_report_data_for_class(klasse_id, date_from=None, date_to=None):
         if not klasse:
             return None
 
-        # Get all students in class with their task status
-        students = get_students_in_klasse(klasse_id)
+        # All students in class with their current task
+        students = conn.execute('''
+            SELECT s.id, s.nachname, s.vorname, s.username,
+                   st.id AS student_task_id, st.abgeschlossen, t.name AS task_name
+            FROM student s
+            JOIN student_klasse sk ON s.id = sk.student_id
+            LEFT JOIN student_task st ON s.id = st.student_id AND st.klasse_id = sk.klasse_id
+            LEFT JOIN task t ON st.task_id = t.id
+            WHERE sk.klasse_id = ?
+        ''', (klasse_id,)).fetchall()
 
-        # For each student, get activity summary and task progress
-        student_data = []
-        for student in students:
-            summary = get_student_activity_summary(
-                student['id'],
-                date_from=date_from,
-                date_to=date_to
+        # Subtask progress per student task
+        progress_rows = conn.execute('''
+            SELECT st.id AS student_task_id,
+                   COUNT(sub.id) AS total,
+                   SUM(COALESCE(ss.erledigt, 0)) AS completed
+            FROM student_task st
+            JOIN subtask sub ON sub.task_id = st.task_id
+            LEFT JOIN student_subtask ss ON ss.subtask_id = sub.id AND ss.student_task_id = st.id
+            WHERE st.klasse_id = ?
+            GROUP BY st.id
+        ''', (klasse_id,)).fetchall()
+        progress = {r['student_task_id']: r for r in progress_rows}
+
+        # Quiz status per student task: result of the oldest attempt, which is
+        # what get_quiz_attempts(...)[-1] returned for the previous per-student loop
+        quiz_rows = conn.execute('''
+            SELECT qa.student_task_id, qa.bestanden
+            FROM quiz_attempt qa
+            JOIN student_task st ON qa.student_task_id = st.id
+            WHERE st.klasse_id = ?
+            AND qa.id = (
+                SELECT qa2.id FROM quiz_attempt qa2
+                WHERE qa2.student_task_id = qa.student_task_id
+                ORDER BY qa2.timestamp, qa2.id
+                LIMIT 1
             )
+        ''', (klasse_id,)).fetchall()
+        quiz_passed_by_task = {r['student_task_id']: bool(r['bestanden']) for r in quiz_rows}
 
-            # Get current task info
-            current_task = get_student_task(student['id'], klasse_id)
-
-            # Get last activity date
-            last_activity = conn.execute(
-                """SELECT MAX(timestamp) as last_seen
-                   FROM analytics_events
-                   WHERE user_id = ? AND user_type = 'student'""",
-                (student['id'],)
-            ).fetchone()
+        # Activity for all students of the class
+        class_students = "user_id IN (SELECT student_id FROM student_klasse WHERE klasse_id = ?)"
+        day_filter = "1=1"
+        day_params = []
+        if date_from:
+            day_filter += " AND day >= ?"
+            day_params.append(date_from)
+        if date_to:
+            day_filter += " AND day <= ?"
+            day_params.append(date_to)
+        date_filter, date_params = timestamp_range_filter(date_from, date_to)
+
+        login_days = {r['user_id']: r['count'] for r in conn.execute(f'''
+            SELECT user_id, COUNT(DISTINCT day) as count
+            FROM analytics_user_daily
+            WHERE {class_students} AND user_type = 'student'
+            AND event_type = 'login'
+            AND {day_filter}
+            GROUP BY user_id
+        ''', [klasse_id] + day_params).fetchall()}
 
-            # Compute task progress
-            if current_task:
-                task_name = current_task['name']
-                # Get subtask progress
-                subtasks = get_student_subtask_progress(current_task['id'])
-                completed = sum(1 for s in subtasks if s['erledigt'])
-                total = len(subtasks)
+        tasks_completed = {}
+        for row in conn.execute(f'''
+            SELECT user_id, metadata, timestamp
+            FROM analytics_events
+            WHERE {class_students} AND user_type = 'student'
+            AND event_type = 'task_complete'
+            AND {date_filter}
+            ORDER BY timestamp DESC
+        ''', [klasse_id] + date_params).fetchall():
+            task_data = {'timestamp': row['timestamp']}
+            if row['metadata']:
+                try:
+                    task_data.update(json.loads(row['metadata']))
+                except:
+                    pass
+            tasks_completed.setdefault(row['user_id'], []).append(task_data)
 
-                # Get quiz status
-                quiz_attempts = get_quiz_attempts(current_task['id'])
-                quiz_passed = bool(quiz_attempts and quiz_attempts[-1]['bestanden']) if quiz_attempts else False
+        last_activity = {r['user_id']: r['last_seen'] for r in conn.execute(f'''
+            SELECT user_id, MAX(timestamp) as last_seen
+            FROM analytics_events
+            WHERE {class_students} AND user_type = 'student'
+            GROUP BY user_id
+        ''', (klasse_id,)).fetchall()}
 
-                # Check if task is completed
-                is_completed = bool(current_task['abgeschlossen'])
+        student_data = []
+        for student in students:
+            student_task_id = student['student_task_id']
+            if student_task_id is not None and student['task_name'] is not None:
+                task_name = student['task_name']
+                task_progress = progress.get(student_task_id)
+                completed = task_progress['completed'] if task_progress else 0
+                total = task_progress['total'] if task_progress else 0
+                quiz_passed = quiz_passed_by_task.get(student_task_id, False)
+                is_completed = bool(student['abgeschlossen'])
             else:
                 task_name = 'Keine Aufgabe'
                 completed = 0
@@ -2311,9 +3713,9 @@ def get_report_data_for_class(klasse_id, date_from=None, date_to=None):
                 'progress_percent': int((completed / total * 100) if total > 0 else 0),
                 'quiz_passed': quiz_passed,
                 'is_completed': is_completed,
-                'login_days': summary['login_days'],
-                'tasks_completed': summary['tasks_completed'],
-                'last_activity': last_activity['last_seen'] if last_activity and last_activity['last_seen'] else None
+                'login_days': login_days.get(student['id'], 0),
+                'tasks_completed': tasks_completed.get(student['id'], []),
+                'last_activity': last_activity.get(student['id'])
             })
 
         return {
@@ -2426,9 +3828,65 @@ def get_report_data_for_student(student_id, report_type='summary', date_from=Non
 
 # ============ App Settings ============
 
+# All app_settings rows as (checked_at, generation, {key: value}). The tuple
+# is replaced as a whole, so reads need neither a query nor a lock.
+# set_setting() bumps the 'settings' generation in cache_generation; every
+# process compares it at most every SETTINGS_REFRESH_INTERVAL seconds.
+_settings_snapshot = None
+_settings_refresh_lock = threading.Lock()
+_settings_invalidations = 0  # Bumped when a settings change of this process ends
+
+
+def _invalidate_settings():
+    """Drop the snapshot once a transaction that changed settings has ended."""
+    global _settings_snapshot, _settings_invalidations
+    _settings_invalidations += 1
+    _settings_snapshot = None
+
+
+reference_cache.on_transaction_finished('settings', _invalidate_settings)
+
+
+def _current_settings():
+    """Return the in-memory settings, reloading them if another process changed them."""
+    global _settings_snapshot
+    snapshot = _settings_snapshot
+    now = time.monotonic()
+    if snapshot is not None and now - snapshot[0] < config.SETTINGS_REFRESH_INTERVAL:
+        return snapshot[2]
+
+    # While one thread refreshes, the others keep using the old snapshot
+    if not _settings_refresh_lock.acquire(blocking=snapshot is None):
+        return snapshot[2]
+    invalidations = _settings_invalidations
+    try:
+        # Never the first statement of the request transaction: a refresh in
+        # a before_request hook would open it before the view chose its mode.
+        # An already open transaction (depth > 0) is simply reused.
+        with db_session(request_scoped=getattr(_pool, 'depth', 0) > 0) as conn:
+            row = conn.execute(
+                "SELECT generation FROM cache_generation WHERE namespace = 'settings'"
+            ).fetchone()
+            generation = row['generation'] if row else 0
+            if snapshot is not None and snapshot[1] == generation:
+                values = snapshot[2]
+            else:
+                values = {r['key']: r['value'] for r in conn.execute("SELECT key, value FROM app_settings")}
+        # A change that committed while this was loading may be missing from
+        # values: keep them for this call but check again on the next one
+        checked_at = now if invalidations == _settings_invalidations else float('-inf')
+        _settings_snapshot = (checked_at, generation, values)
+        return values
+    finally:
+        _settings_refresh_lock.release()
+
+
 def get_setting(key, default=None):
     """Get an application setting value.
 
+    Served from memory; changes made by other processes become visible
+    within config.SETTINGS_REFRESH_INTERVAL seconds.
+
     Args:
         key: Setting key name
         default: Default value if setting doesn't exist
@@ -2436,12 +3894,7 @@ def get_setting(key, default=None):
     Returns:
         Setting value as string, or default if not found
     """
-    with db_session() as conn:
-        row = conn.execute(
-            "SELECT value FROM app_settings WHERE key = ?",
-            (key,)
-        ).fetchone()
-        return row['value'] if row else default
+    return _current_settings().get(key, default)
 
 
 def set_setting(key, value):
@@ -2460,6 +3913,9 @@ def set_setting(key, value):
                    updated_at = CURRENT_TIMESTAMP""",
             (key, str(value))
         )
+        # Every process reloads after the commit (this one right away, via
+        # _invalidate_settings), never while the change is uncommitted
+        reference_cache.bump(conn, 'settings')
 
 
 def get_bool_setting(key, default=False):
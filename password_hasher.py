@@ -0,0 +1,162 @@
+"""
+Bounded executor for password hashing.
+
+scrypt takes tens of milliseconds of CPU per call. When a whole class logs in
+at once, running it directly on the waitress threads lets a login burst
+occupy every thread. Password work therefore runs on a small dedicated pool
+(config.PASSWORD_HASH_WORKERS threads; hashlib's scrypt releases the GIL, so
+they really run in parallel). At most config.PASSWORD_HASH_QUEUE_SIZE
+further calls may wait for a free worker. Anything beyond that is rejected
+immediately with Overloaded, which the login route answers with
+503 + Retry-After, so the remaining waitress threads stay free for
+everybody else.
+
+Usage:
+    import password_hasher
+
+    try:
+        is_valid, needs_rehash = password_hasher.run(models.verify_password, stored_hash, password)
+    except password_hasher.Overloaded:
+        ...  # 503, retry after config.PASSWORD_HASH_RETRY_AFTER seconds
+
+    # Bulk jobs (admin actions) use a separate pool without admission control
+    hashes = password_hasher.run_many(models.hash_password, passwords)
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import config
+
+
+class Overloaded(Exception):
+    """Raised when the hashing pool is full or a call waited too long."""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(config.PASSWORD_HASH_WORKERS + config.PASSWORD_HASH_QUEUE_SIZE)
+
+_stats_lock = threading.Lock()
+_stats = {
+    'completed': 0,
+    'rejected': 0,
+    'timeouts': 0,
+    'in_flight': 0,
+}
+_latencies_ms = deque(maxlen=500)  # Recent (wait + hash) times of completed calls
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=config.PASSWORD_HASH_WORKERS,
+                                               thread_name_prefix='password-hash')
+    return _executor
+
+
+def _release_slot(future):
+    _slots.release()
+    with _stats_lock:
+        _stats['in_flight'] -= 1
+
+
+def run(fn, *args):
+    """Run a password hashing/verification function on the hashing pool.
+
+    Blocks the caller until the result is ready. Do not hold an open
+    database transaction while calling this.
+
+    Args:
+        fn: Function to run (e.g. models.verify_password, models.hash_password)
+        args: Its arguments
+
+    Returns:
+        Whatever fn returns
+
+    Raises:
+        Overloaded: If all workers and queue slots are taken, or the result
+                    did not arrive within config.PASSWORD_HASH_TIMEOUT seconds
+    """
+    if not _slots.acquire(blocking=False):
+        with _stats_lock:
+            _stats['rejected'] += 1
+        raise Overloaded()
+
+    start = time.monotonic()
+    with _stats_lock:
+        _stats['in_flight'] += 1
+    try:
+        future = _get_executor().submit(fn, *args)
+    except BaseException:
+        _release_slot(None)
+        raise
+    # The slot is freed when the work is done, even if the caller gave up waiting
+    future.add_done_callback(_release_slot)
+
+    try:
+        result = future.result(timeout=config.PASSWORD_HASH_TIMEOUT)
+    except TimeoutError:
+        future.cancel()
+        with _stats_lock:
+            _stats['timeouts'] += 1
+        raise Overloaded()
+
+    with _stats_lock:
+        _stats['completed'] += 1
+        _latencies_ms.append((time.monotonic() - start) * 1000)
+    return result
+
+
+def run_many(fn, items):
+    """Run fn over many items in parallel, for bulk jobs like roster imports.
+
+    Uses its own short-lived pool of config.PASSWORD_HASH_BULK_WORKERS
+    threads, so bulk work is neither counted against nor rejected by the
+    login admission limit.
+
+    Args:
+        fn: Function taking one item (e.g. models.hash_password)
+        items: Iterable of arguments
+
+    Returns:
+        List of results in the order of items
+    """
+    with ThreadPoolExecutor(max_workers=config.PASSWORD_HASH_BULK_WORKERS,
+                            thread_name_prefix='password-hash-bulk') as executor:
+        return list(executor.map(fn, items))
+
+
+def get_stats():
+    """Get pool statistics for monitoring.
+
+    Returns:
+        Dict with completed, rejected, timeouts, in_flight, the configured
+        workers/queue_size, and avg/p95/max latency in ms (wait + hash) of
+        the last 500 calls
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+        latencies = sorted(_latencies_ms)
+    stats['workers'] = config.PASSWORD_HASH_WORKERS
+    stats['queue_size'] = config.PASSWORD_HASH_QUEUE_SIZE
+    if latencies:
+        stats['avg_latency_ms'] = round(sum(latencies) / len(latencies), 1)
+        stats['p95_latency_ms'] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1)
+        stats['max_latency_ms'] = round(latencies[-1], 1)
+    else:
+        stats['avg_latency_ms'] = stats['p95_latency_ms'] = stats['max_latency_ms'] = 0
+    return stats
+
+
+def shutdown():
+    """Stop the pool's threads (waits for running calls)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
@@ -0,0 +1,136 @@
+"""
+Process-wide cache of parsed quizzes.
+
+task.quiz_json is parsed and validated once per task and kept in a small LRU
+cache together with everything grading needs (correct-answer sets, question
+count) and the structure the result page displays. Entries are keyed by task
+id and guarded by a hash of the JSON text, so a quiz changed by another
+process (or directly in the database) is re-parsed on its next use.
+
+Usage:
+    import quiz_cache
+
+    quiz = quiz_cache.get_quiz(task['task_id'], task['quiz_json'])
+    quiz['question_count'], quiz['correct_sets'][0]
+
+    # After changing or deleting a task
+    quiz_cache.invalidate(task_id)
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from hashlib import sha256
+
+import config
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # task_id -> (content hash, parsed quiz)
+_stats = {'hits': 0, 'misses': 0}
+
+
+def parse_quiz(quiz_json):
+    """Parse and validate quiz JSON.
+
+    Args:
+        quiz_json: JSON string in the import format ({'questions': [{'text',
+            'options', 'correct'}, ...]})
+
+    Returns:
+        Dict with:
+            questions: Tuple of question dicts as stored ('text', 'options', 'correct')
+            correct_sets: Tuple of frozensets of correct option indices, per question
+            question_count: Number of questions
+            display: Dict for the result page ('question', 'answers', 'correct')
+
+    Raises:
+        ValueError: If the JSON is malformed or a question lacks text, options or correct
+    """
+    try:
+        quiz = json.loads(quiz_json)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Quiz JSON is malformed: {e}")
+
+    questions = quiz.get('questions') if isinstance(quiz, dict) else None
+    if not isinstance(questions, list):
+        raise ValueError("Quiz JSON has no 'questions' list")
+
+    for i, q in enumerate(questions):
+        if not (isinstance(q, dict) and isinstance(q.get('text'), str)
+                and isinstance(q.get('options'), list) and isinstance(q.get('correct'), list)):
+            raise ValueError(f"Question {i + 1} needs 'text', 'options' and 'correct'")
+
+    return {
+        'questions': tuple(questions),
+        'correct_sets': tuple(frozenset(q['correct']) for q in questions),
+        'question_count': len(questions),
+        # JSON uses 'text'/'options', the result template expects 'question'/'answers'
+        'display': {
+            'questions': [
+                {'question': q['text'], 'answers': q['options'], 'correct': q['correct']}
+                for q in questions
+            ]
+        },
+    }
+
+
+def get_quiz(task_id, quiz_json):
+    """Get the parsed quiz of a task, parsing it only if not cached.
+
+    The returned dict is shared between requests and must not be modified.
+
+    Args:
+        task_id: The task ID
+        quiz_json: The task's current quiz_json (None or '' for no quiz)
+
+    Returns:
+        Parsed quiz (see parse_quiz), or None if the task has no quiz
+
+    Raises:
+        ValueError: If the quiz JSON is invalid
+    """
+    if not quiz_json:
+        return None
+
+    digest = sha256(quiz_json.encode('utf-8')).digest()
+    with _lock:
+        entry = _cache.get(task_id)
+        if entry and entry[0] == digest:
+            _cache.move_to_end(task_id)
+            _stats['hits'] += 1
+            return entry[1]
+        _stats['misses'] += 1
+
+    # Parse outside the lock; a concurrent miss for the same task just parses twice
+    quiz = parse_quiz(quiz_json)
+
+    with _lock:
+        _cache[task_id] = (digest, quiz)
+        _cache.move_to_end(task_id)
+        while len(_cache) > config.QUIZ_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return quiz
+
+
+def invalidate(task_id=None):
+    """Drop a task's cached quiz, or all cached quizzes if task_id is None."""
+    with _lock:
+        if task_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(task_id, None)
+
+
+def get_cache_stats():
+    """Get cache statistics for monitoring.
+
+    Returns:
+        Dict with size, max_size, hits and misses
+    """
+    with _lock:
+        return {
+            'size': len(_cache),
+            'max_size': config.QUIZ_CACHE_SIZE,
+            'hits': _stats['hits'],
+            'misses': _stats['misses'],
+        }
@@ -0,0 +1,179 @@
+"""
+In-process cache for read-mostly reference data (tasks, classes, schedules,
+subtasks, materials).
+
+Cached model functions are decorated with @cached(namespace). Every write
+function in models.py that changes a namespace calls bump(conn, namespace)
+inside its transaction, which increments the namespace's row in the
+cache_generation table. A cached value is only served while the generation
+it was loaded under is still current, so a change committed by any worker
+process invalidates the caches of all processes. Entries also expire after
+config.REFERENCE_CACHE_TTL seconds as a fallback for writes that bypass
+models.py (e.g. migration scripts).
+
+Generations are read with one query per Flask request (outside a request:
+per call). A thread whose open transaction has bumped a namespace bypasses
+the cache for it until the transaction ends, so uncommitted data is never
+cached.
+
+Usage:
+    @reference_cache.cached('tasks')
+    def get_task(task_id):
+        ...
+
+    with db_session() as conn:
+        conn.execute("UPDATE task ...")
+        reference_cache.bump(conn, 'tasks')
+"""
+
+import threading
+import time
+from functools import wraps
+
+from flask import g, has_request_context
+
+import config
+
+# 'settings' only has a generation; the values are cached by models.get_setting()
+NAMESPACES = ('tasks', 'klassen', 'schedules', 'subtasks', 'materials', 'settings')
+
+_lock = threading.Lock()
+_entries = {}  # (namespace, function name, args) -> (generation, expires_at, value)
+_stats = {namespace: {'hits': 0, 'misses': 0, 'bypasses': 0} for namespace in NAMESPACES}
+_local = threading.local()  # .dirty: namespaces bumped in the thread's open transaction
+_finish_hooks = {}  # namespace -> callables run when a transaction that bumped it ends
+
+
+def _dirty():
+    dirty = getattr(_local, 'dirty', None)
+    if dirty is None:
+        dirty = _local.dirty = set()
+    return dirty
+
+
+def _read_generations():
+    """Read all namespace generations from the database (None if unavailable)."""
+    import models
+    try:
+        with models.db_session() as conn:
+            rows = conn.execute("SELECT namespace, generation FROM cache_generation").fetchall()
+    except models.sqlite3.OperationalError:
+        # Table not created yet (init_db has not run)
+        return None
+    return {row['namespace']: row['generation'] for row in rows}
+
+
+def _generations():
+    """Current generations, read once per request."""
+    if not has_request_context():
+        return _read_generations()
+    if 'cache_generations' not in g:
+        g.cache_generations = _read_generations()
+    return g.cache_generations
+
+
+def _copy(value):
+    """Copy a cached value so callers can modify what they get."""
+    if isinstance(value, list):
+        return [dict(item) if isinstance(item, dict) else item for item in value]
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+def cached(namespace):
+    """Decorator: cache a model function's result in the given namespace.
+
+    The function's positional arguments form the cache key. Results must be
+    None, a dict or a list of dicts (callers receive copies).
+    """
+    if namespace not in NAMESPACES:
+        raise ValueError(f"Unknown cache namespace: {namespace}")
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args):
+            stats = _stats[namespace]
+            generations = None if namespace in _dirty() else _generations()
+            if generations is None:
+                with _lock:
+                    stats['bypasses'] += 1
+                return f(*args)
+
+            generation = generations.get(namespace, 0)
+            key = (namespace, f.__name__, args)
+            now = time.monotonic()
+            with _lock:
+                entry = _entries.get(key)
+                if entry and entry[0] == generation and entry[1] > now:
+                    stats['hits'] += 1
+                    return _copy(entry[2])
+                stats['misses'] += 1
+
+            value = f(*args)
+            with _lock:
+                _entries[key] = (generation, now + config.REFERENCE_CACHE_TTL, value)
+            return _copy(value)
+        return wrapper
+    return decorator
+
+
+def bump(conn, *namespaces):
+    """Invalidate namespaces in all processes (call inside the writing transaction).
+
+    Args:
+        conn: The connection of the transaction that changes the data
+        namespaces: Names from NAMESPACES
+    """
+    conn.executemany('''
+        INSERT INTO cache_generation (namespace, generation) VALUES (?, 1)
+        ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1
+    ''', [(namespace,) for namespace in namespaces])
+    _dirty().update(namespaces)
+
+
+def on_transaction_finished(namespace, fn):
+    """Register fn() to run after a transaction that bumped namespace ends.
+
+    For values cached outside this module (e.g. the settings snapshot in
+    models.py) that must only be dropped once the change is committed.
+    """
+    if namespace not in NAMESPACES:
+        raise ValueError(f"Unknown cache namespace: {namespace}")
+    _finish_hooks.setdefault(namespace, []).append(fn)
+
+
+def transaction_finished():
+    """Called by models.py when the thread's outermost transaction commits or rolls back."""
+    dirty = getattr(_local, 'dirty', None)
+    if dirty:
+        namespaces = set(dirty)
+        dirty.clear()
+        # Re-read generations on the next lookup so this request sees its own writes
+        if has_request_context():
+            g.pop('cache_generations', None)
+        for namespace in namespaces:
+            for fn in _finish_hooks.get(namespace, ()):
+                fn()
+
+
+def clear():
+    """Drop all cached entries of this process."""
+    with _lock:
+        _entries.clear()
+
+
+def get_cache_stats():
+    """Get cache statistics for monitoring.
+
+    Returns:
+        Dict namespace -> {'size', 'hits', 'misses', 'bypasses'}
+    """
+    with _lock:
+        sizes = {namespace: 0 for namespace in NAMESPACES}
+        for namespace, _, _ in _entries:
+            sizes[namespace] += 1
+        return {
+            namespace: dict(_stats[namespace], size=sizes[namespace])
+            for namespace in NAMESPACES
+        }
@@ -2,7 +2,8 @@
 #
 # Helper script to run benchmark with SQLCipher support
 #
-# This script extracts only SQLCIPHER_KEY from .env (if present)
+# This script extracts only SQLCIPHER_KEY and the SQLCipher profile
+# settings from .env (if present)
 # and runs the benchmark with encryption support enabled.
 #
 # Usage:
@@ -12,6 +13,7 @@
 #   ./run_benchmark.sh                      # Run with defaults
 #   ./run_benchmark.sh --iterations 50      # Run 50 iterations
 #   ./run_benchmark.sh --db-only            # Only database benchmarks
+#   ./run_benchmark.sh --cipher-profiles    # Compare SQLCipher profiles
 #
 
 set -e  # Exit on error
@@ -19,18 +21,32 @@ set -e  # Exit on error
 # Determine script directory
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 
-# Extract only SQLCIPHER_KEY from .env if it exists
-# (We only extract this specific variable, not all .env contents)
+# Extract only SQLCIPHER_KEY and the cipher profile from .env if it exists
+# (We only extract these specific variables, not all .env contents)
 ENV_FILE="$SCRIPT_DIR/.env"
+
+# Value of one variable from .env, without surrounding quotes
+# (inner quotes are kept: a raw key looks like x'...')
+env_value() {
+    grep "^$1=" "$ENV_FILE" 2>/dev/null | cut -d= -f2- | sed -e 's/^"\(.*\)"$/\1/' -e "s/^'\(.*\)'$/\1/"
+}
+
 if [ -f "$ENV_FILE" ]; then
     # Securely extract only SQLCIPHER_KEY (doesn't expose other secrets)
-    SQLCIPHER_KEY=$(grep '^SQLCIPHER_KEY=' "$ENV_FILE" 2>/dev/null | cut -d= -f2- | tr -d '"' | tr -d "'")
+    SQLCIPHER_KEY=$(env_value SQLCIPHER_KEY)
     if [ -n "$SQLCIPHER_KEY" ]; then
         export SQLCIPHER_KEY
         echo "SQLCipher encryption: enabled"
     else
         echo "Note: SQLCIPHER_KEY not found in .env"
     fi
+
+    for VAR in SQLCIPHER_PAGE_SIZE SQLCIPHER_KDF_ITER SQLCIPHER_MEMORY_SECURITY SQLITE_CACHE_SIZE; do
+        VALUE=$(env_value "$VAR")
+        if [ -n "$VALUE" ]; then
+            export "$VAR=$VALUE"
+        fi
+    done
 else
     echo "Note: No .env file found at $ENV_FILE"
 fi
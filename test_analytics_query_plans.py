@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test script for analytics query plans.
+
+Runs EXPLAIN QUERY PLAN for every filter combination the analytics query
+builder supports and checks that every combination with a seekable filter
+(user, event type or date range) searches the matching index. Uses a
+throwaway database, never data/.
+"""
+
+import itertools
+import os
+import sys
+import tempfile
+
+import config
+
+_tmp_dir = tempfile.mkdtemp()
+config.DATABASE = os.path.join(_tmp_dir, 'query_plans.db')
+config.ANALYTICS_DATABASE = os.path.join(_tmp_dir, 'query_plans_analytics.db')
+
+import models
+
+FILTERS = {
+    'event_type': 'page_view',
+    'user_id': 1,
+    'user_type': 'student',
+    'date_from': '2026-01-05',
+    'date_to': '2026-01-06',
+}
+
+
+def query_plan(conn, query, params):
+    """Return the detail column of EXPLAIN QUERY PLAN for a query."""
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + query, params)]
+
+
+def expected_index(kwargs):
+    """Index the query builder should seek for these filters (None: no seek)."""
+    if kwargs.get('user_id') is not None:
+        return 'idx_analytics_user'
+    if kwargs.get('event_type'):
+        return 'idx_analytics_type'
+    if kwargs.get('date_from') or kwargs.get('date_to'):
+        return 'idx_analytics_timestamp'
+    return None
+
+
+def test_filter_combinations():
+    """Every combination with a seekable filter searches the matching index."""
+    print("=" * 60)
+    print("TEST 1: Filter combinations")
+    print("=" * 60)
+
+    passed = True
+    with models.db_session() as conn:
+        for size in range(len(FILTERS) + 1):
+            for names in itertools.combinations(FILTERS, size):
+                kwargs = {name: FILTERS[name] for name in names}
+                for select, suffix in (('*', ' ORDER BY timestamp DESC LIMIT 50'),
+                                       ('COUNT(*) as count', '')):
+                    query, params = models.analytics_events_query(select, **kwargs)
+                    plan = query_plan(conn, query + suffix, params)
+                    label = ', '.join(names) or '(no filter)'
+                    index = expected_index(kwargs)
+                    if index is None:
+                        if 'INDEXED BY' in query:
+                            print(f"✗ FAILED: {select} with {label} forces an index: {query}")
+                            passed = False
+                    elif not any(line.startswith('SEARCH') and index in line for line in plan):
+                        print(f"✗ FAILED: {select} with {label} does not seek {index}: {plan}")
+                        passed = False
+
+    if passed:
+        print(f"✓ Index seeks for all {2 ** len(FILTERS)} filter combinations that can seek")
+    return passed
+
+
+def test_date_range_bounds():
+    """date_to is inclusive for the whole day, date_from starts at midnight."""
+    print("\n" + "=" * 60)
+    print("TEST 2: Date range bounds")
+    print("=" * 60)
+
+    with models.db_session() as conn:
+        conn.execute("DELETE FROM analytics_events")
+        conn.executemany('''
+            INSERT INTO analytics_events (timestamp, event_type, user_id, user_type)
+            VALUES (?, 'login', 1, 'student')
+        ''', [('2026-01-04 23:59:59',), ('2026-01-05 00:00:00',),
+              ('2026-01-06 23:59:59',), ('2026-01-07 00:00:00',)])
+
+    count = models.get_analytics_count(user_id=1, user_type='student',
+                                       date_from='2026-01-05', date_to='2026-01-06')
+    if count != 2:
+        print(f"✗ FAILED: expected 2 events in range, got {count}")
+        return False
+
+    print("✓ Range includes both boundary days and nothing else")
+    return True
+
+
+def main():
+    print("\n" + "=" * 60)
+    print("ANALYTICS QUERY PLANS - TEST SUITE")
+    print("=" * 60 + "\n")
+
+    models.init_db()
+
+    results = []
+    results.append(("Filter Combinations", test_filter_combinations()))
+    results.append(("Date Range Bounds", test_date_range_bounds()))
+
+    print("\n" + "=" * 60)
+    print("TEST SUMMARY")
+    print("=" * 60)
+
+    for name, passed in results:
+        status = "✓ PASSED" if passed else "✗ FAILED"
+        print(f"{status}: {name}")
+
+    all_passed = all(r[1] for r in results)
+
+    print("\n" + "=" * 60)
+    if all_passed:
+        print("✅ ALL TESTS PASSED!")
+    else:
+        print("❌ SOME TESTS FAILED")
+    print("=" * 60 + "\n")
+
+    return 0 if all_passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-request database transaction.
+
+Drives the Flask app against a throwaway database (never data/) and checks
+that writes of GET views marked @read_write_request are committed, even
+when the settings snapshot is refreshed earlier in the same request.
+"""
+
+import os
+import sys
+import tempfile
+
+import config
+
+_tmp_dir = tempfile.mkdtemp()
+config.DATABASE = os.path.join(_tmp_dir, 'request_scope.db')
+config.ANALYTICS_DATABASE = os.path.join(_tmp_dir, 'request_scope_analytics.db')
+
+import models
+from app import app
+
+
+def count_rows(query, params=()):
+    """Count rows on a second connection, outside the app's pooled one."""
+    conn = models.get_db()
+    try:
+        return conn.execute(query, params).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_settings_refresh_and_write_in_one_request():
+    """A settings refresh in before_request does not swallow the view's writes."""
+    print("=" * 60)
+    print("TEST 1: Settings refresh + @read_write_request view")
+    print("=" * 60)
+
+    models.init_db()
+    klasse_id = models.create_klasse('Testklasse')
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['admin_id'] = 1
+
+    # Force log_analytics (before_request) to reload the settings
+    models._settings_snapshot = None
+    response = client.get(f'/admin/klasse/{klasse_id}/unterricht/2026-01-05')
+    assert response.status_code == 200, response.status_code
+
+    assert models._pool.depth == 0, "request left a transaction open"
+    assert count_rows("SELECT COUNT(*) FROM unterricht WHERE klasse_id = ? AND datum = ?",
+                      (klasse_id, '2026-01-05')) == 1, "lesson row not committed"
+
+    # Later writes on the same thread are committed as well
+    models.create_klasse('Nach dem Request')
+    assert count_rows("SELECT COUNT(*) FROM klasse WHERE name = ?", ('Nach dem Request',)) == 1
+
+    print("✓ Write is visible from a second connection")
+    return True
+
+
+def main():
+    print("\n" + "=" * 60)
+    print("REQUEST SCOPE - TEST SUITE")
+    print("=" * 60 + "\n")
+
+    try:
+        passed = test_settings_refresh_and_write_in_one_request()
+    except AssertionError as e:
+        print(f"✗ FAILED: {e}")
+        passed = False
+
+    print("\n" + "=" * 60)
+    print("✅ ALL TESTS PASSED!" if passed else "❌ SOME TESTS FAILED")
+    print("=" * 60 + "\n")
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import csv
 import random
 
 # English adjectives (at least one per letter A-Z)
@@ -191,6 +192,39 @@ def generate_password():
     return password
 
 
+def parse_roster(text):
+    """Parse a class roster with one student per line: "Nachname, Vorname".
+
+    Also accepts CSV exports (comma or semicolon separated, optionally with
+    a "Nachname;Vorname" header row). Extra columns are ignored.
+
+    Returns:
+        List of (nachname, vorname) tuples; lines without both names are skipped
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return []
+    delimiter = ';' if lines[0].count(';') > lines[0].count(',') else ','
+
+    roster = []
+    for fields in csv.reader(lines, delimiter=delimiter):
+        fields = [field.strip() for field in fields]
+        if len(fields) < 2 or not fields[0] or not fields[1]:
+            continue
+        if fields[0].lower() == 'nachname' and fields[1].lower() == 'vorname':
+            continue
+        roster.append((fields[0], fields[1]))
+    return roster
+
+
+def decode_upload(data):
+    """Decode an uploaded text file (UTF-8 with or without BOM, else Windows-1252 as saved by Excel)."""
+    try:
+        return data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return data.decode('cp1252', errors='replace')
+
+
 def allowed_file(filename):
     """Check if file extension is allowed."""
     return '.' in filename and \